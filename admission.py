@@ -0,0 +1,243 @@
+"""
+OpenGenNet AI - Admission Control
+Sheds load at the front door instead of letting requests pile up until they time
+out. Each lane (chat, batch, cheap) has an in-flight limit and optionally a latency
+target; once a lane is saturated new requests get 503 + Retry-After straight away,
+while the cheap lane (/search, /health) keeps serving monitoring and retrieval.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+import metrics
+
+# Admission configuration - override through environment variables
+ADMISSION_ENABLED = os.environ.get("ADMISSION_ENABLED", "true").lower() == "true"
+ADMISSION_CHAT_MAX_IN_FLIGHT = int(os.environ.get("ADMISSION_CHAT_MAX_IN_FLIGHT", 64))
+ADMISSION_CHAT_LATENCY_TARGET = float(os.environ.get("ADMISSION_CHAT_LATENCY_TARGET", 20))
+ADMISSION_BATCH_MAX_IN_FLIGHT = int(os.environ.get("ADMISSION_BATCH_MAX_IN_FLIGHT", 4))
+ADMISSION_CHEAP_MAX_IN_FLIGHT = int(os.environ.get("ADMISSION_CHEAP_MAX_IN_FLIGHT", 256))
+ADMISSION_MIN_IN_FLIGHT = int(os.environ.get("ADMISSION_MIN_IN_FLIGHT", 4))
+ADMISSION_MAX_QUEUE_WAIT = float(os.environ.get("ADMISSION_MAX_QUEUE_WAIT", 5))
+ADMISSION_EWMA_ALPHA = float(os.environ.get("ADMISSION_EWMA_ALPHA", 0.2))
+
+# Lane limits; latency_target None means the lane is only bounded by concurrency.
+# Batches stream for minutes by design, so they get their own lane rather than
+# inflating the chat lane's latency average
+LANES = {
+    "chat": {"max_in_flight": ADMISSION_CHAT_MAX_IN_FLIGHT, "latency_target": ADMISSION_CHAT_LATENCY_TARGET},
+    "batch": {"max_in_flight": ADMISSION_BATCH_MAX_IN_FLIGHT, "latency_target": None},
+    "cheap": {"max_in_flight": ADMISSION_CHEAP_MAX_IN_FLIGHT, "latency_target": None}
+}
+
+ADMITTED = metrics.counter("admission_admitted_total", "Requests admitted per lane")
+REJECTED = metrics.counter("admission_rejected_total", "Requests shed with 503 per lane and reason")
+IN_FLIGHT = metrics.gauge("admission_in_flight", "Admitted requests currently being served")
+QUEUE_WAIT = metrics.histogram(
+    "admission_queue_wait_seconds", "Time between the proxy accepting a request and the app seeing it"
+)
+
+
+class AdmissionController:
+    """In-flight and latency-based admission per lane."""
+
+    def __init__(self, lanes: Dict[str, Dict] = LANES):
+        self.lanes = lanes
+        self._in_flight = {lane: 0 for lane in lanes}
+        self._latency = {lane: None for lane in lanes}
+        self._lock = threading.Lock()
+
+    def try_admit(self, lane: str, queue_wait: float = 0.0) -> Optional[float]:
+        """
+        Admit a request to `lane`.
+
+        Returns None when admitted (the caller must release()), otherwise the number
+        of seconds the client should wait before retrying.
+        """
+        limits = self.lanes[lane]
+        QUEUE_WAIT.observe(queue_wait, lane=lane)
+
+        with self._lock:
+            in_flight = self._in_flight[lane]
+            latency = self._latency[lane]
+            retry_after = max(1.0, latency or 1.0)
+
+            if queue_wait > ADMISSION_MAX_QUEUE_WAIT:
+                reason = "queue_wait"
+            elif in_flight >= limits["max_in_flight"]:
+                reason = "concurrency"
+            elif (limits["latency_target"] is not None and latency is not None
+                  and latency > limits["latency_target"] and in_flight >= ADMISSION_MIN_IN_FLIGHT):
+                reason = "latency"
+            else:
+                self._in_flight[lane] = in_flight + 1
+                reason = None
+
+        if reason:
+            REJECTED.inc(lane=lane, reason=reason)
+            return retry_after
+
+        ADMITTED.inc(lane=lane)
+        IN_FLIGHT.inc(lane=lane)
+        return None
+
+    def release(self, lane: str, latency: float) -> None:
+        """Mark an admitted request finished, feeding its latency to the lane's EWMA."""
+        with self._lock:
+            self._in_flight[lane] -= 1
+            current = self._latency[lane]
+            self._latency[lane] = latency if current is None else (
+                ADMISSION_EWMA_ALPHA * latency + (1 - ADMISSION_EWMA_ALPHA) * current
+            )
+        IN_FLIGHT.dec(lane=lane)
+
+    def stats(self) -> Dict:
+        """Per-lane load, for /status."""
+        with self._lock:
+            return {
+                "enabled": ADMISSION_ENABLED,
+                "lanes": {
+                    lane: {
+                        "in_flight": self._in_flight[lane],
+                        "max_in_flight": limits["max_in_flight"],
+                        "ewma_latency": round(self._latency[lane], 3) if self._latency[lane] is not None else None,
+                        "latency_target": limits["latency_target"]
+                    }
+                    for lane, limits in self.lanes.items()
+                }
+            }
+
+
+def parse_request_start(value: Optional[str]) -> float:
+    """
+    Queue wait from an X-Request-Start header ("t=<epoch>" in s, ms or us) set by
+    the proxy/router in front of the app; 0 when absent or unparseable.
+    """
+    if not value:
+        return 0.0
+    try:
+        started = float(value.strip().lstrip("t="))
+    except ValueError:
+        return 0.0
+    if started > 1e14:
+        started /= 1e6
+    elif started > 1e11:
+        started /= 1e3
+    return max(0.0, time.time() - started)
+
+
+def overloaded_body(retry_after: float) -> bytes:
+    return json.dumps({
+        "error": {
+            "message": "Server overloaded, please retry later",
+            "type": "overloaded",
+            "retry_after": int(retry_after + 0.999)
+        }
+    }).encode("utf-8")
+
+
+class WSGIAdmissionMiddleware:
+    """Admission for a WSGI app; slots are held until the response body is closed."""
+
+    def __init__(self, app: Callable, controller: AdmissionController, routes: Dict[str, str]):
+        self.app = app
+        self.controller = controller
+        self.routes = routes
+
+    def __call__(self, environ, start_response):
+        lane = self.routes.get(environ.get("PATH_INFO", ""))
+        if lane is None or not ADMISSION_ENABLED or environ.get("REQUEST_METHOD") == "OPTIONS":
+            return self.app(environ, start_response)
+
+        retry_after = self.controller.try_admit(lane, parse_request_start(environ.get("HTTP_X_REQUEST_START")))
+        if retry_after is not None:
+            body = overloaded_body(retry_after)
+            start_response("503 Service Unavailable", [
+                ("Content-Type", "application/json"),
+                ("Access-Control-Allow-Origin", "*"),
+                ("Content-Length", str(len(body))),
+                ("Retry-After", str(int(retry_after + 0.999)))
+            ])
+            return [body]
+
+        start = time.perf_counter()
+        released = []
+
+        def release():
+            if not released:
+                released.append(True)
+                self.controller.release(lane, time.perf_counter() - start)
+
+        try:
+            body = self.app(environ, start_response)
+        except BaseException:
+            release()
+            raise
+        return ClosingIterator(body, release)
+
+
+class ClosingIterator:
+    """Wraps a WSGI body so `on_close` runs once the server has finished sending it."""
+
+    def __init__(self, body, on_close: Callable[[], None]):
+        self._body = body
+        self._iterator = iter(body)
+        self._on_close = on_close
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._iterator)
+
+    def close(self):
+        try:
+            if hasattr(self._body, "close"):
+                self._body.close()
+        finally:
+            self._on_close()
+
+
+class ASGIAdmissionMiddleware:
+    """Admission for an ASGI app; slots are held until the response has been sent."""
+
+    def __init__(self, app: Callable, controller: AdmissionController, routes: Dict[str, str]):
+        self.app = app
+        self.controller = controller
+        self.routes = routes
+
+    async def __call__(self, scope, receive, send):
+        lane = self.routes.get(scope.get("path", "")) if scope["type"] == "http" else None
+        if lane is None or not ADMISSION_ENABLED or scope.get("method") == "OPTIONS":
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope.get("headers") or [])
+        queue_wait = parse_request_start(headers.get(b"x-request-start", b"").decode("latin-1"))
+        retry_after = self.controller.try_admit(lane, queue_wait)
+        if retry_after is not None:
+            body = overloaded_body(retry_after)
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"access-control-allow-origin", b"*"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(int(retry_after + 0.999)).encode())
+                ]
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(lane, time.perf_counter() - start)
+
+
+# Global controller instance (one per process)
+admission_controller = AdmissionController()
@@ -5,10 +5,15 @@ Production-Ready Flask API with Expert Knowledge
 """
 
 import os
-import json
+import sys
 from datetime import datetime
+from functools import partial
 from flask import Flask, request, jsonify
-import requests
+
+# Shared modules live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from provider_gateway import Deadline, call_with_fallback, post_chat_completion
 
 app = Flask(__name__)
 
@@ -25,6 +30,10 @@ GROQ_FAST_KEY = os.getenv('GROQ_FAST_KEY', '')
 GROQ_CODING_KEY = os.getenv('GROQ_CODING_KEY', '')
 DEEPSEEK_KEY = os.getenv('DEEPSEEK_KEY', '')
 QWEN_KEY = os.getenv('QWEN_KEY', '')
+
+# Provider endpoints - overridable to point at a local simulator for load testing
+GROQ_BASE_URL = os.getenv('GROQ_BASE_URL', 'https://api.groq.com/openai/v1')
+OPENROUTER_BASE_URL = os.getenv('OPENROUTER_BASE_URL', 'https://openrouter.ai/api/v1')
 PORT = int(os.getenv('PORT', 8080))
 
 # Enhanced Expert Knowledge Base (21 cases)
@@ -92,8 +101,48 @@ def search_expert_knowledge(query):
     results.sort(key=lambda x: x['score'], reverse=True)
     return results[:5]  # Return top 5 results
 
-def call_ai_provider(message, provider="groq", use_expert_context=False):
-    """Call AI provider with optional expert context enhancement"""
+# Fallback order and endpoints for each provider
+AI_PROVIDERS = {
+    "groq": {
+        "key": GROQ_FAST_KEY,
+        "model": "llama-3.1-8b-instant",
+        "url": f"{GROQ_BASE_URL}/chat/completions"
+    },
+    "deepseek": {
+        "key": DEEPSEEK_KEY,
+        "model": "deepseek/deepseek-r1",
+        "url": f"{OPENROUTER_BASE_URL}/chat/completions"
+    },
+    "qwen": {
+        "key": QWEN_KEY,
+        "model": "qwen/qwen-2.5-72b-instruct",
+        "url": f"{OPENROUTER_BASE_URL}/chat/completions"
+    }
+}
+FALLBACK_ORDER = ["groq", "deepseek", "qwen"]
+
+def request_completion(provider, message, timeout):
+    """Single chat completion from one provider within `timeout` seconds"""
+    config = AI_PROVIDERS[provider]
+    headers = {
+        "Authorization": f"Bearer {config['key']}",
+        "Content-Type": "application/json"
+    }
+    data = {
+        "model": config["model"],
+        "messages": [{"role": "user", "content": message}],
+        "temperature": 0.7,
+        "max_tokens": 1024
+    }
+    result = post_chat_completion(config["url"], headers, data, timeout)
+    return result["choices"][0]["message"]["content"]
+
+def call_ai_provider(message, provider="groq", use_expert_context=False, deadline=None):
+    """
+    Call AI provider with optional expert context enhancement.
+    Falls back along FALLBACK_ORDER within one overall deadline and returns
+    the response, the provider that answered and every attempt made.
+    """
     
     # Enhance message with expert context if requested
     enhanced_message = message
@@ -105,83 +154,31 @@ def call_ai_provider(message, provider="groq", use_expert_context=False):
                 context += f"- {result['topic']}\n"
             enhanced_message = f"{context}\nUser Query: {message}"
     
-    try:
-        if provider == "groq" and GROQ_FAST_KEY:
-            headers = {
-                "Authorization": f"Bearer {GROQ_FAST_KEY}",
-                "Content-Type": "application/json"
-            }
-            data = {
-                "model": "llama-3.1-8b-instant",
-                "messages": [{"role": "user", "content": enhanced_message}],
-                "temperature": 0.7,
-                "max_tokens": 1024
-            }
-            response = requests.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers=headers,
-                json=data,
-                timeout=30
-            )
-            if response.status_code == 200:
-                result = response.json()
-                return result["choices"][0]["message"]["content"]
-            else:
-                # Auto-fallback to next provider
-                return call_ai_provider(message, "deepseek", use_expert_context)
-                
-        elif provider == "deepseek" and DEEPSEEK_KEY:
-            headers = {
-                "Authorization": f"Bearer {DEEPSEEK_KEY}",
-                "Content-Type": "application/json"
-            }
-            data = {
-                "model": "deepseek/deepseek-r1",
-                "messages": [{"role": "user", "content": enhanced_message}],
-                "temperature": 0.7,
-                "max_tokens": 1024
-            }
-            response = requests.post(
-                "https://openrouter.ai/api/v1/chat/completions",
-                headers=headers,
-                json=data,
-                timeout=30
-            )
-            if response.status_code == 200:
-                result = response.json()
-                return result["choices"][0]["message"]["content"]
-            else:
-                # Auto-fallback to next provider
-                return call_ai_provider(message, "qwen", use_expert_context)
-                
-        elif provider == "qwen" and QWEN_KEY:
-            headers = {
-                "Authorization": f"Bearer {QWEN_KEY}",
-                "Content-Type": "application/json"
-            }
-            data = {
-                "model": "qwen/qwen-2.5-72b-instruct",
-                "messages": [{"role": "user", "content": enhanced_message}],
-                "temperature": 0.7,
-                "max_tokens": 1024
-            }
-            response = requests.post(
-                "https://openrouter.ai/api/v1/chat/completions",
-                headers=headers,
-                json=data,
-                timeout=30
-            )
-            if response.status_code == 200:
-                result = response.json()
-                return result["choices"][0]["message"]["content"]
-            else:
-                return "All AI providers are currently unavailable. Please try again later."
-        
-        else:
-            return "No AI providers available. Please check API key configuration."
-            
-    except Exception as e:
-        return f"AI Provider Error: {str(e)}"
+    chain = FALLBACK_ORDER[FALLBACK_ORDER.index(provider):] if provider in FALLBACK_ORDER else []
+    chain = [name for name in chain if AI_PROVIDERS[name]["key"]]
+    if not chain:
+        return {
+            "response": "No AI providers available. Please check API key configuration.",
+            "provider": "none",
+            "attempts": []
+        }
+    
+    response, winner, attempts = call_with_fallback(
+        [(name, partial(request_completion, name, enhanced_message)) for name in chain],
+        deadline
+    )
+    if response is None:
+        return {
+            "response": "All AI providers are currently unavailable. Please try again later.",
+            "provider": "none",
+            "attempts": attempts
+        }
+    
+    return {
+        "response": response,
+        "provider": winner,
+        "attempts": attempts
+    }
 
 @app.route('/', methods=['GET'])
 def home():
@@ -263,19 +260,15 @@ def ask_ai():
         use_expert_context = data.get('use_expert_context', True)
         preferred_provider = data.get('provider', 'groq')
         
-        # Get AI response with expert enhancement
-        ai_response = call_ai_provider(message, preferred_provider, use_expert_context)
-        
-        # Determine which provider was actually used
-        provider_used = preferred_provider
-        if "All AI providers are currently unavailable" in ai_response:
-            provider_used = "none"
-        elif "No AI providers available" in ai_response:
-            provider_used = "none"
+        # Get AI response with expert enhancement, all fallbacks within one deadline
+        deadline = Deadline()
+        result = call_ai_provider(message, preferred_provider, use_expert_context, deadline)
         
         return jsonify({
-            "response": ai_response,
-            "provider": provider_used,
+            "response": result["response"],
+            "provider": result["provider"],
+            "attempts": result["attempts"],
+            "deadline_seconds": deadline.seconds,
             "expert_context_used": use_expert_context,
             "timestamp": datetime.now().isoformat(),
             "version": "2.0.0"
@@ -1,13 +1,23 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import requests
-import json
-import random
 import logging
 import time
 import os
+import sys
+from functools import partial
 from typing import Dict, List, Optional
 
+# Shared modules live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from provider_gateway import (
+    PROVIDER_TIMEOUT,
+    Deadline,
+    ProviderAttemptError,
+    call_with_fallback,
+    post_chat_completion
+)
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -21,6 +31,10 @@ GROQ_CODING_KEY = os.getenv('GROQ_CODING_KEY', '')
 DEEPSEEK_KEY = os.getenv('DEEPSEEK_KEY', '')
 QWEN_KEY = os.getenv('QWEN_KEY', '')
 
+# Provider endpoints - overridable to point at a local simulator for load testing
+GROQ_BASE_URL = os.getenv('GROQ_BASE_URL', 'https://api.groq.com/openai/v1')
+OPENROUTER_BASE_URL = os.getenv('OPENROUTER_BASE_URL', 'https://openrouter.ai/api/v1')
+
 # Simplified Expert Knowledge Base (just a few examples for Vercel)
 EXPERT_KNOWLEDGE = [
     {
@@ -58,25 +72,25 @@ AI_PROVIDERS = {
         "name": "GROQ Fast",
         "model": "llama-3.1-8b-instant",
         "api_key_env": "GROQ_FAST_KEY",
-        "endpoint": "https://api.groq.com/openai/v1/chat/completions"
+        "endpoint": f"{GROQ_BASE_URL}/chat/completions"
     },
     "groq_coding": {
         "name": "GROQ Coding",
         "model": "gemma2-9b-it",
         "api_key_env": "GROQ_CODING_KEY",
-        "endpoint": "https://api.groq.com/openai/v1/chat/completions"
+        "endpoint": f"{GROQ_BASE_URL}/chat/completions"
     },
     "deepseek": {
         "name": "DeepSeek R1",
         "model": "deepseek/deepseek-r1-distill-llama-70b",
         "api_key_env": "DEEPSEEK_KEY",
-        "endpoint": "https://openrouter.ai/api/v1/chat/completions"
+        "endpoint": f"{OPENROUTER_BASE_URL}/chat/completions"
     },
     "qwen": {
         "name": "Qwen 2.5 72B",
         "model": "qwen/qwen-2.5-72b-instruct",
         "api_key_env": "QWEN_KEY",
-        "endpoint": "https://openrouter.ai/api/v1/chat/completions"
+        "endpoint": f"{OPENROUTER_BASE_URL}/chat/completions"
     }
 }
 
@@ -100,15 +114,16 @@ def search_expert_knowledge(query: str, category: Optional[str] = None) -> List[
     
     return results
 
-def call_ai_provider(provider_key: str, message: str, context: str = None) -> Dict:
-    """Call specific AI provider"""
+def request_completion(provider_key: str, message: str, context: str = None,
+                       timeout: float = PROVIDER_TIMEOUT) -> Dict:
+    """Call one AI provider within `timeout` seconds; raises ProviderAttemptError on failure"""
     provider = AI_PROVIDERS.get(provider_key)
     if not provider:
-        return {"error": f"Provider {provider_key} not found"}
+        raise ProviderAttemptError(f"Provider {provider_key} not found")
     
     api_key = get_api_key(provider)
     if not api_key:
-        return {"error": f"API key not found for {provider['name']}"}
+        raise ProviderAttemptError(f"API key not found for {provider['name']}")
     
     system_message = "You are OpenGenNet 2.0, an advanced AI assistant with deep technical expertise."
     if context:
@@ -129,25 +144,25 @@ def call_ai_provider(provider_key: str, message: str, context: str = None) -> Di
         "temperature": 0.7
     }
     
+    result = post_chat_completion(provider["endpoint"], headers, data, timeout)
+    if 'choices' in result and len(result['choices']) > 0:
+        return {
+            "provider": provider["name"],
+            "model": provider["model"],
+            "response": result['choices'][0]['message']['content'],
+            "status": "success"
+        }
+    raise ProviderAttemptError(f"Invalid response format from {provider['name']}")
+
+def call_ai_provider(provider_key: str, message: str, context: str = None) -> Dict:
+    """Call specific AI provider"""
     try:
-        response = requests.post(provider["endpoint"], headers=headers, json=data, timeout=30)
-        response.raise_for_status()
-        
-        result = response.json()
-        if 'choices' in result and len(result['choices']) > 0:
-            return {
-                "provider": provider["name"],
-                "model": provider["model"],
-                "response": result['choices'][0]['message']['content'],
-                "status": "success"
-            }
-        else:
-            return {"error": f"Invalid response format from {provider['name']}"}
-            
-    except requests.exceptions.RequestException as e:
-        return {"error": f"Request failed for {provider['name']}: {str(e)}"}
+        return request_completion(provider_key, message, context)
+    except ProviderAttemptError as e:
+        name = AI_PROVIDERS.get(provider_key, {}).get("name", provider_key)
+        return {"error": f"Request failed for {name}: {str(e)}"}
     except Exception as e:
-        return {"error": f"Unexpected error with {provider['name']}: {str(e)}"}
+        return {"error": f"Unexpected error with {provider_key}: {str(e)}"}
 
 @app.route('/', methods=['GET'])
 def home():
@@ -200,20 +215,24 @@ def ask_ai():
                     context_items.append(f"Topic: {item['topic']}\nAnswer: {item['expert_answer']}")
                 context = "\n\n".join(context_items)
         
-        # Try preferred provider first
-        result = call_ai_provider(preferred_provider, message, context)
+        # Preferred provider first, then the others - all within one deadline
+        order = [preferred_provider] + [key for key in AI_PROVIDERS if key != preferred_provider]
+        deadline = Deadline()
+        result, winner, attempts = call_with_fallback(
+            [(key, partial(request_completion, key, message, context)) for key in order],
+            deadline
+        )
         
-        # If preferred provider fails, try others
-        if "error" in result:
-            for provider_key in AI_PROVIDERS.keys():
-                if provider_key != preferred_provider:
-                    result = call_ai_provider(provider_key, message, context)
-                    if "error" not in result:
-                        result["fallback_used"] = True
-                        break
+        if result is None:
+            return jsonify({
+                "error": "All AI providers failed within the request deadline",
+                "attempts": attempts,
+                "deadline_seconds": deadline.seconds
+            }), 500
         
-        if "error" in result:
-            return jsonify(result), 500
+        result = dict(result, attempts=attempts)
+        if winner != preferred_provider:
+            result["fallback_used"] = True
         
         return jsonify(result)
         
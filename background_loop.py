@@ -0,0 +1,147 @@
+"""
+OpenGenNet AI - Background Event Loop
+A long-lived asyncio loop running in a dedicated daemon thread. Synchronous Flask
+handlers submit coroutines to it through a thread-safe bridge, so async resources
+(pooled provider sessions, caches, in-flight request state) live across requests.
+"""
+
+import asyncio
+import atexit
+import concurrent.futures
+import contextvars
+import os
+import threading
+from typing import Any, AsyncIterator, Coroutine, Iterator, Optional
+
+from provider_gateway import close_async_session
+
+# Default per-request budget for work submitted from sync code
+BACKGROUND_LOOP_TIMEOUT = float(os.environ.get("BACKGROUND_LOOP_TIMEOUT", 60))
+
+
+async def _in_context(context: contextvars.Context, coro: Coroutine) -> Any:
+    # Runs as the task's first step, so the values land in the task's own context copy
+    for var, value in context.items():
+        var.set(value)
+    return await coro
+
+
+class BackgroundLoop:
+    """Event loop owned by a daemon thread, with a blocking bridge for sync callers."""
+
+    def __init__(self, name: str = "opengennet-event-loop"):
+        self.name = name
+        self.loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.pid = os.getpid()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self._started.set)
+        self.loop.run_forever()
+
+        # Loop stopped - release pooled connections and pending tasks
+        try:
+            pending = asyncio.all_tasks(self.loop)
+            for task in pending:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self.loop.run_until_complete(close_async_session())
+        finally:
+            self.loop.close()
+
+    def start(self) -> "BackgroundLoop":
+        self._thread.start()
+        self._started.wait()
+        return self
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive() and self.loop.is_running()
+
+    def submit(self, coro: Coroutine) -> concurrent.futures.Future:
+        """
+        Schedule a coroutine on the loop and return a concurrent future for it.
+
+        The coroutine sees the caller's contextvars (the request trace, for one),
+        as it would if the caller had awaited it directly.
+        """
+        return asyncio.run_coroutine_threadsafe(_in_context(contextvars.copy_context(), coro), self.loop)
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = BACKGROUND_LOOP_TIMEOUT) -> Any:
+        """
+        Run a coroutine on the loop and block the calling thread for its result.
+
+        On timeout the coroutine is cancelled on the loop and TimeoutError is raised.
+        """
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("BackgroundLoop.run() called from the loop thread; await instead")
+
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"Operation timed out after {timeout}s")
+        except BaseException:
+            # Caller was interrupted - don't leave the coroutine running
+            future.cancel()
+            raise
+
+    def iterate(self, agen: AsyncIterator, timeout: Optional[float] = BACKGROUND_LOOP_TIMEOUT) -> Iterator:
+        """
+        Drive an async generator on the loop from sync code, one item at a time.
+
+        `timeout` bounds the wait for each item. If the consumer stops early (client
+        disconnect) or an item times out, the generator is closed on the loop.
+        """
+        async def next_item():
+            return await agen.__anext__()
+
+        async def close():
+            await agen.aclose()
+
+        try:
+            while True:
+                try:
+                    item = self.run(next_item(), timeout)
+                except StopAsyncIteration:
+                    return
+                yield item
+        finally:
+            try:
+                self.run(close(), timeout=5)
+            except Exception:
+                pass
+
+    def stop(self, timeout: float = 5) -> None:
+        if self.running:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout)
+
+
+# Global loop instance (one per process)
+_background_loop = None
+_background_lock = threading.Lock()
+
+
+def get_background_loop() -> BackgroundLoop:
+    """Get or start the process-wide background loop (restarted after fork)."""
+    global _background_loop
+    loop = _background_loop
+    if loop is None or loop.pid != os.getpid() or not loop.running:
+        with _background_lock:
+            loop = _background_loop
+            if loop is None or loop.pid != os.getpid() or not loop.running:
+                loop = BackgroundLoop().start()
+                _background_loop = loop
+    return loop
+
+
+def _shutdown() -> None:
+    if _background_loop is not None and _background_loop.pid == os.getpid():
+        _background_loop.stop()
+
+
+atexit.register(_shutdown)
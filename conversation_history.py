@@ -0,0 +1,161 @@
+"""
+OpenGenNet AI - Conversation History Compaction
+Builds the history sent with each chat turn against a token budget: the most recent
+turns are kept verbatim, older turns are replaced by short extractive summaries
+(cached, since the same turns are summarized again on every follow-up), and the
+expert-enhancement sections appended to answers are left out entirely.
+"""
+
+import hashlib
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, List, Tuple
+
+import metrics
+
+# History configuration - override through environment variables
+HISTORY_TOKEN_BUDGET = int(os.environ.get("HISTORY_TOKEN_BUDGET", 1500))
+HISTORY_RECENT_MESSAGES = int(os.environ.get("HISTORY_RECENT_MESSAGES", 4))
+HISTORY_SUMMARY_SENTENCES = int(os.environ.get("HISTORY_SUMMARY_SENTENCES", 2))
+HISTORY_SUMMARY_CACHE_SIZE = int(os.environ.get("HISTORY_SUMMARY_CACHE_SIZE", 4096))
+
+# Markers of the sections expert_rag_system._integrate_expert_knowledge wraps answers in
+ENHANCED_RESPONSE_HEADER = "📋 **Enhanced Expert Response:**\n"
+EXPERT_SECTION_MARKER = "\n\n🎯 **Expert Knowledge Integration:**"
+
+PROMPT_TOKENS = metrics.histogram(
+    "prompt_tokens", "Estimated tokens sent per chat request",
+    buckets=(100, 250, 500, 1000, 1500, 2000, 3000, 4000, 6000, 8000)
+)
+HISTORY_TOKENS_SAVED = metrics.counter("history_tokens_saved_total", "Estimated tokens removed by history compaction")
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+WORD = re.compile(r"[a-zA-Z0-9_\-./]{3,}")
+STOPWORDS = frozenset(
+    "the and for are but not you your with this that have from they will would there their what "
+    "about which when make can like just how all any been has was were into more also use using".split()
+)
+
+
+def count_tokens(text: str) -> int:
+    """Rough token estimate (about 4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def message_tokens(messages: List[Dict]) -> int:
+    """Estimated prompt tokens for a message list, including per-message framing."""
+    return sum(count_tokens(message["content"]) + 4 for message in messages)
+
+
+def strip_expert_boilerplate(content: str) -> str:
+    """The answer itself, without the expert-enhancement header and appended sections."""
+    if content.startswith(ENHANCED_RESPONSE_HEADER):
+        content = content[len(ENHANCED_RESPONSE_HEADER):]
+    marker = content.find(EXPERT_SECTION_MARKER)
+    return content[:marker] if marker != -1 else content
+
+
+class SummaryCache:
+    """Bounded LRU of extractive summaries keyed by content hash."""
+
+    def __init__(self, max_entries: int = HISTORY_SUMMARY_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def summarize(self, content: str, sentences: int = HISTORY_SUMMARY_SENTENCES) -> str:
+        key = hashlib.sha1(f"{sentences}:{content}".encode("utf-8")).hexdigest()
+        with self._lock:
+            summary = self._entries.get(key)
+            if summary is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return summary
+
+        summary = extractive_summary(content, sentences)
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = summary
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return summary
+
+
+def extractive_summary(content: str, sentences: int = HISTORY_SUMMARY_SENTENCES) -> str:
+    """The `sentences` highest-scoring sentences (by content-word frequency), in original order."""
+    candidates = list(dict.fromkeys(
+        sentence.strip() for sentence in SENTENCE_SPLIT.split(content) if len(sentence.strip()) > 15
+    ))
+    if len(candidates) <= sentences:
+        return " ".join(candidates) if candidates else content[:300]
+
+    frequencies = Counter(
+        word for word in WORD.findall(content.lower()) if word not in STOPWORDS
+    )
+
+    def score(sentence: str) -> float:
+        words = [word for word in WORD.findall(sentence.lower()) if word not in STOPWORDS]
+        return sum(frequencies[word] for word in words) / (len(words) + 5)
+
+    ranked = sorted(range(len(candidates)), key=lambda index: score(candidates[index]), reverse=True)
+    return " ".join(candidates[index][:400] for index in sorted(ranked[:sentences]))
+
+
+summary_cache = SummaryCache()
+
+
+def compact_history(history: List[Dict], token_budget: int = HISTORY_TOKEN_BUDGET,
+                    recent_messages: int = HISTORY_RECENT_MESSAGES) -> Tuple[List[Dict], Dict]:
+    """
+    Fit conversation history (oldest first, current user message last) into a token budget.
+
+    Args:
+        history: session messages as {"role", "content"} dicts
+        token_budget: tokens available for history
+        recent_messages: how many of the newest messages are kept verbatim when they fit
+
+    Returns:
+        (messages to send, stats with original/sent tokens and how many messages were summarized)
+    """
+    cleaned = [
+        {"role": message["role"], "content": strip_expert_boilerplate(message["content"])}
+        if message["role"] == "assistant" else message
+        for message in history
+    ]
+
+    selected = []
+    used = 0
+    summarized = 0
+    for age, message in enumerate(reversed(cleaned)):
+        tokens = count_tokens(message["content"]) + 4
+
+        # The current question always goes out verbatim; other recent turns if they fit
+        if age == 0 or (age < recent_messages and used + tokens <= token_budget):
+            selected.append(message)
+            used += tokens
+            continue
+
+        summary = f"(earlier, summarized) {summary_cache.summarize(message['content'])}"
+        summary_tokens = count_tokens(summary) + 4
+        if tokens <= summary_tokens:
+            # Short turns are cheaper verbatim
+            summary, summary_tokens = message["content"], tokens
+        if used + summary_tokens > token_budget:
+            break
+        selected.append({"role": message["role"], "content": summary})
+        used += summary_tokens
+        summarized += summary is not message["content"]
+
+    selected.reverse()
+    original_tokens = message_tokens(history)
+    HISTORY_TOKENS_SAVED.inc(max(0, original_tokens - used))
+    return selected, {
+        "history_tokens": used,
+        "history_tokens_original": original_tokens,
+        "messages_summarized": summarized,
+        "messages_dropped": len(history) - len(selected)
+    }
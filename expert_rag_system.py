@@ -8,18 +8,34 @@ import json
 import os
 import re
 import logging
+import threading
+import time
 from typing import Dict, List, Tuple, Optional, Any
 from datetime import datetime
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
-from sentence_transformers import SentenceTransformer
 import hashlib
 
+import metrics
+import tracing
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+SEARCH_SECONDS = metrics.histogram("rag_search_seconds", "Whole expert search call (one query or one batch)")
+METHOD_SECONDS = metrics.histogram(
+    "rag_retrieval_seconds", "Expert search time per retrieval method and per call (tfidf, semantic, keywords, fusion)"
+)
+ENHANCE_SECONDS = metrics.histogram(
+    "rag_enhance_seconds", "enhance_ai_response time, split by whether it had to search first"
+)
+
+# Final ranking blends relevance (0-1) with the case's quality score (0-100, scaled to 0-1)
+RELEVANCE_WEIGHT = 0.7
+QUALITY_WEIGHT = 0.3
+
 class ExpertRAGSystem:
     """
     Advanced RAG system that integrates scraped cybersecurity and networking
@@ -189,7 +205,8 @@ class ExpertRAGSystem:
         
         logger.info("✅ Search indexes built successfully")
     
-    def search_expert_knowledge(self, query: str, top_k: int = 5, min_score: float = 0.1) -> List[Dict]:
+    def search_expert_knowledge(self, query: str, top_k: int = 5, min_score: float = 0.1,
+                                profile: bool = False):
         """
         Search expert knowledge using hybrid semantic + keyword approach.
         
@@ -197,48 +214,113 @@ class ExpertRAGSystem:
             query: Search query
             top_k: Number of top results to return
             min_score: Minimum relevance score threshold
+            profile: Also explain the search (per-method timings and candidates,
+                score breakdowns, dedup effects, final ranking)
             
         Returns:
-            List of expert knowledge cases with relevance scores
+            List of expert knowledge cases with relevance scores,
+            or (results, explanation) when profile is set
         """
-        if not self.knowledge_base:
-            return []
+        if profile:
+            return self._explain_search(query, top_k, min_score)
+        return self.search_expert_knowledge_batch([query], top_k, min_score)[0]
+    
+    def _case_embeddings(self) -> np.ndarray:
+        """Embeddings of every case's full text, encoded once and reused by all searches."""
+        if self.embeddings_cache.get('cases') is None:
+            self.embeddings_cache['cases'] = self.embeddings_model.encode(
+                [case['full_text'] for case in self.knowledge_base]
+            )
+        return self.embeddings_cache['cases']
+    
+    def search_expert_knowledge_batch(self, queries: List[str], top_k: int = 5, min_score: float = 0.1) -> List[List[Dict]]:
+        """
+        Search expert knowledge for many queries at once.
         
-        results = []
+        TF-IDF and semantic scores are computed as one query x case similarity matrix
+        instead of one pass over the knowledge base per query.
         
-        # Method 1: TF-IDF keyword search
-        if self.tfidf_matrix is not None:
-            query_vector = self.tfidf_vectorizer.transform([query])
-            tfidf_scores = cosine_similarity(query_vector, self.tfidf_matrix).flatten()
+        Args:
+            queries: Search queries
+            top_k: Number of top results to return per query
+            min_score: Minimum relevance score threshold
             
-            for i, score in enumerate(tfidf_scores):
-                if score >= min_score:
-                    case = self.knowledge_base[i].copy()
-                    case['relevance_score'] = score
-                    case['search_method'] = 'tfidf'
-                    results.append(case)
+        Returns:
+            One ranked result list per query, in query order
+        """
+        if not self.knowledge_base or not queries:
+            return [[] for _ in queries]
+        
+        search_start = time.perf_counter()
+        
+        # Method 1: TF-IDF keyword search
+        tfidf_scores = self._tfidf_scores(queries)
+        semantic_start = time.perf_counter()
+        METHOD_SECONDS.observe(semantic_start - search_start, method='tfidf')
+        tracing.record('rag_tfidf', semantic_start - search_start)
         
         # Method 2: Semantic search (if available)
-        if self.embeddings_model:
-            try:
-                query_embedding = self.embeddings_model.encode([query])
-                
-                for i, case in enumerate(self.knowledge_base):
-                    case_text = case['full_text']
-                    case_embedding = self.embeddings_model.encode([case_text])
-                    
-                    semantic_score = cosine_similarity(query_embedding, case_embedding)[0][0]
-                    
-                    if semantic_score >= min_score:
-                        case_copy = case.copy()
-                        case_copy['relevance_score'] = semantic_score
-                        case_copy['search_method'] = 'semantic'
-                        results.append(case_copy)
-                        
-            except Exception as e:
-                logger.warning(f"⚠️ Semantic search error: {e}")
-        
-        # Method 3: Keyword matching
+        semantic_scores = self._semantic_scores(queries)
+        if semantic_scores is not None:
+            semantic_seconds = time.perf_counter() - semantic_start
+            METHOD_SECONDS.observe(semantic_seconds, method='semantic')
+            tracing.record('rag_semantic', semantic_seconds)
+        
+        keyword_seconds = fusion_seconds = 0.0
+        batch_results = []
+        for row, query in enumerate(queries):
+            results = []
+            if tfidf_scores is not None:
+                results.extend(self._scored_cases(tfidf_scores[row], min_score, 'tfidf'))
+            if semantic_scores is not None:
+                results.extend(self._scored_cases(semantic_scores[row], min_score, 'semantic'))
+            
+            # Method 3: Keyword matching
+            stage_start = time.perf_counter()
+            results.extend(self._keyword_matches(query, min_score))
+            fusion_start = time.perf_counter()
+            keyword_seconds += fusion_start - stage_start
+            
+            batch_results.append(self._fuse_results(results, top_k))
+            fusion_seconds += time.perf_counter() - fusion_start
+        
+        METHOD_SECONDS.observe(keyword_seconds, method='keywords')
+        METHOD_SECONDS.observe(fusion_seconds, method='fusion')
+        SEARCH_SECONDS.observe(time.perf_counter() - search_start)
+        # Keyword matching and fusion interleave per query; trace them as their summed time
+        tracing.record('rag_keywords', keyword_seconds, queries=len(queries))
+        tracing.record('rag_fusion', fusion_seconds)
+        return batch_results
+    
+    def _tfidf_scores(self, queries: List[str]) -> Optional[np.ndarray]:
+        """TF-IDF cosine similarity of each query against every case (queries x cases)."""
+        if self.tfidf_matrix is None:
+            return None
+        return cosine_similarity(self.tfidf_vectorizer.transform(queries), self.tfidf_matrix)
+    
+    def _semantic_scores(self, queries: List[str]) -> Optional[np.ndarray]:
+        """Embedding cosine similarity of each query against every case, if the model is loaded."""
+        if not self.embeddings_model:
+            return None
+        try:
+            return cosine_similarity(self.embeddings_model.encode(queries), self._case_embeddings())
+        except Exception as e:
+            logger.warning(f"⚠️ Semantic search error: {e}")
+            return None
+    
+    def _scored_cases(self, scores: np.ndarray, min_score: float, method: str) -> List[Dict]:
+        """Copies of the cases scoring at least `min_score`, tagged with score and method."""
+        results = []
+        for i in np.flatnonzero(scores >= min_score):
+            case = self.knowledge_base[i].copy()
+            case['relevance_score'] = scores[i]
+            case['search_method'] = method
+            results.append(case)
+        return results
+    
+    def _keyword_matches(self, query: str, min_score: float) -> List[Dict]:
+        """Cases whose extracted keywords appear in the query."""
+        results = []
         query_lower = query.lower()
         for case in self.knowledge_base:
             keyword_matches = sum(1 for kw in case['keywords'] if kw.lower() in query_lower)
@@ -250,8 +332,10 @@ class ExpertRAGSystem:
                     case_copy['relevance_score'] = keyword_score
                     case_copy['search_method'] = 'keywords'
                     results.append(case_copy)
-        
-        # Deduplicate and rank results
+        return results
+    
+    def _fuse_results(self, results: List[Dict], top_k: int) -> List[Dict]:
+        """Deduplicate results from all methods (first method wins) and rank by relevance and quality."""
         seen_ids = set()
         unique_results = []
         for result in results:
@@ -261,13 +345,104 @@ class ExpertRAGSystem:
         
         # Sort by relevance score and quality
         unique_results.sort(
-            key=lambda x: (x['relevance_score'] * 0.7 + (x['quality_score'] / 100) * 0.3),
+            key=lambda x: (x['relevance_score'] * RELEVANCE_WEIGHT + (x['quality_score'] / 100) * QUALITY_WEIGHT),
             reverse=True
         )
-        
         return unique_results[:top_k]
     
-    def enhance_ai_response(self, user_query: str, ai_response: str, provider: str = "unknown") -> Dict[str, Any]:
+    def _explain_search(self, query: str, top_k: int, min_score: float) -> Tuple[List[Dict], Dict]:
+        """
+        search_expert_knowledge(profile=True): the same search and ranking, run stage by
+        stage with the bookkeeping the normal path skips. Kept out of the rag_* metrics.
+        """
+        search_start = time.perf_counter()
+        timings = {}
+        candidates = {}
+        
+        stage_start = time.perf_counter()
+        tfidf_scores = self._tfidf_scores([query])
+        if tfidf_scores is not None:
+            candidates['tfidf'] = self._scored_cases(tfidf_scores[0], min_score, 'tfidf')
+        timings['tfidf'] = time.perf_counter() - stage_start
+        
+        stage_start = time.perf_counter()
+        semantic_scores = self._semantic_scores([query])
+        if semantic_scores is not None:
+            candidates['semantic'] = self._scored_cases(semantic_scores[0], min_score, 'semantic')
+        timings['semantic'] = time.perf_counter() - stage_start
+        
+        stage_start = time.perf_counter()
+        candidates['keywords'] = self._keyword_matches(query, min_score)
+        timings['keywords'] = time.perf_counter() - stage_start
+        
+        stage_start = time.perf_counter()
+        results = [result for method_results in candidates.values() for result in method_results]
+        final = self._fuse_results(results, top_k)
+        timings['fusion'] = time.perf_counter() - stage_start
+        timings['total'] = time.perf_counter() - search_start
+        for stage in ('tfidf', 'semantic', 'keywords', 'fusion'):
+            if stage != 'semantic' or semantic_scores is not None:
+                tracing.record(f'rag_{stage}', timings[stage])
+        
+        # Dedup keeps the first method's copy of a case; note what every method scored it
+        matched_by = {}
+        for result in results:
+            matched_by.setdefault(result['id'], {}).setdefault(result['search_method'], float(result['relevance_score']))
+        kept_lower = [case_id for case_id, scores in matched_by.items() if max(scores.values()) > next(iter(scores.values()))]
+        
+        # Ranking had every case kept its best score instead of its first one
+        quality = {result['id']: result['quality_score'] for result in results}
+        best_ranking = sorted(
+            matched_by,
+            key=lambda case_id: max(matched_by[case_id].values()) * RELEVANCE_WEIGHT + (quality[case_id] / 100) * QUALITY_WEIGHT,
+            reverse=True
+        )[:top_k]
+        final_ids = [result['id'] for result in final]
+        
+        explanation = {
+            'query': query,
+            'top_k': top_k,
+            'min_score': min_score,
+            'cases_indexed': len(self.knowledge_base),
+            'timings_ms': {stage: round(seconds * 1000, 3) for stage, seconds in timings.items()},
+            'methods': {
+                method: {
+                    'available': method in candidates,
+                    'candidates': len(candidates.get(method, [])),
+                    'top_score': round(float(max((r['relevance_score'] for r in candidates.get(method, [])), default=0.0)), 4)
+                }
+                for method in ('tfidf', 'semantic', 'keywords')
+            },
+            'dedup': {
+                'candidates': len(results),
+                'unique': len(matched_by),
+                'duplicates_dropped': len(results) - len(matched_by),
+                'kept_lower_score': len(kept_lower),
+                'best_score_would_add': [case_id for case_id in best_ranking if case_id not in final_ids],
+                'best_score_would_drop': [case_id for case_id in final_ids if case_id not in best_ranking]
+            },
+            'ranking': [
+                {
+                    'rank': rank,
+                    'id': result['id'],
+                    'title': result['title'],
+                    'search_method': result['search_method'],
+                    'relevance_score': round(float(result['relevance_score']), 4),
+                    'quality_score': result['quality_score'],
+                    'relevance_part': round(float(result['relevance_score']) * RELEVANCE_WEIGHT, 4),
+                    'quality_part': round(result['quality_score'] / 100 * QUALITY_WEIGHT, 4),
+                    'final_score': round(float(result['relevance_score']) * RELEVANCE_WEIGHT
+                                         + result['quality_score'] / 100 * QUALITY_WEIGHT, 4),
+                    'matched_by': {method: round(score, 4) for method, score in matched_by[result['id']].items()}
+                }
+                for rank, result in enumerate(final, 1)
+            ],
+            'below_cutoff': len(matched_by) - len(final)
+        }
+        return final, explanation
+    
+    def enhance_ai_response(self, user_query: str, ai_response: str, provider: str = "unknown",
+                            expert_cases: Optional[List[Dict]] = None) -> Dict[str, Any]:
         """
         Enhance AI response with expert knowledge context.
         
@@ -275,16 +450,23 @@ class ExpertRAGSystem:
             user_query: Original user question
             ai_response: Basic AI response to enhance
             provider: AI provider name
+            expert_cases: Cases already retrieved for this query (skips the search)
             
         Returns:
             Enhanced response with expert context
         """
         logger.info(f"🚀 Enhancing response for query: {user_query[:100]}...")
+        enhance_start = time.perf_counter()
+        searched = "true" if expert_cases is None else "false"
         
         # Search for relevant expert knowledge
-        expert_cases = self.search_expert_knowledge(user_query, top_k=3)
+        if expert_cases is None:
+            expert_cases = self.search_expert_knowledge(user_query, top_k=3)
         
         if not expert_cases:
+            enhance_seconds = time.perf_counter() - enhance_start
+            ENHANCE_SECONDS.observe(enhance_seconds, searched=searched)
+            tracing.record('rag_enhance', enhance_seconds, searched=searched)
             return {
                 'enhanced_response': ai_response,
                 'expert_enhancement': False,
@@ -305,6 +487,9 @@ class ExpertRAGSystem:
         avg_quality = sum(case['quality_score'] for case in expert_cases) / len(expert_cases)
         avg_relevance = sum(case['relevance_score'] for case in expert_cases) / len(expert_cases)
         confidence_boost = (avg_quality * avg_relevance) / 100
+        enhance_seconds = time.perf_counter() - enhance_start
+        ENHANCE_SECONDS.observe(enhance_seconds, searched=searched)
+        tracing.record('rag_enhance', enhance_seconds, searched=searched)
         
         return {
             'enhanced_response': enhanced_response,
@@ -325,6 +510,37 @@ class ExpertRAGSystem:
             'provider': provider
         }
     
+    def build_prompt_context(self, expert_cases: List[Dict], token_budget: int = 600) -> str:
+        """
+        Build expert context for the system prompt, within an approximate token budget.
+        
+        Args:
+            expert_cases: Retrieved expert cases, best first
+            token_budget: Maximum context size in tokens (~4 characters per token)
+            
+        Returns:
+            Context text, empty if no case fits the budget
+        """
+        char_budget = token_budget * 4
+        context_parts = []
+        used = 0
+        
+        for i, case in enumerate(expert_cases, 1):
+            header = f"Expert Source {i} ({case['category']}): {case['title']}\n"
+            remaining = char_budget - used - len(header)
+            if remaining < 80:
+                break
+            
+            content = case['content']
+            if len(content) > remaining:
+                content = content[:remaining - 3] + '...'
+            
+            part = header + content
+            context_parts.append(part)
+            used += len(part) + 1
+        
+        return "\n".join(context_parts)
+    
     def _build_expert_context(self, expert_cases: List[Dict]) -> str:
         """Build expert context from relevant cases."""
         context_parts = []
@@ -441,19 +657,48 @@ class ExpertRAGSystem:
 
 # Global RAG system instance
 _rag_system = None
+_rag_system_lock = threading.Lock()
 
 def get_rag_system() -> ExpertRAGSystem:
     """Get or create the global RAG system instance."""
     global _rag_system
     if _rag_system is None:
-        # Use the correct data directory path
-        import os
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        correct_data_dir = os.path.join(current_dir, "data", "organized_expert_knowledge")
-        _rag_system = ExpertRAGSystem(correct_data_dir)
+        # Several request threads can arrive before the index exists - build it once
+        with _rag_system_lock:
+            if _rag_system is None:
+                # Use the correct data directory path
+                import os
+                current_dir = os.path.dirname(os.path.abspath(__file__))
+                correct_data_dir = os.path.join(current_dir, "data", "organized_expert_knowledge")
+                _rag_system = ExpertRAGSystem(correct_data_dir)
     return _rag_system
 
-def enhance_response(user_query: str, ai_response: str, provider: str = "unknown") -> Dict[str, Any]:
+def retrieve_expert_cases(user_query: str, top_k: int = 3) -> List[Dict]:
+    """
+    Retrieve the expert cases used both for prompt context and for enhancement.
+    
+    Args:
+        user_query: Original user question
+        top_k: Number of cases to retrieve
+        
+    Returns:
+        Expert cases with relevance scores
+    """
+    rag_system = get_rag_system()
+    return rag_system.search_expert_knowledge(user_query, top_k=top_k)
+
+def retrieve_expert_cases_batch(user_queries: List[str], top_k: int = 3) -> List[List[Dict]]:
+    """Expert cases for many questions in one vectorized search (one list per question)."""
+    rag_system = get_rag_system()
+    return rag_system.search_expert_knowledge_batch(user_queries, top_k=top_k)
+
+def build_prompt_context(expert_cases: List[Dict], token_budget: int = 600) -> str:
+    """Expert context for the system prompt, within `token_budget` tokens."""
+    rag_system = get_rag_system()
+    return rag_system.build_prompt_context(expert_cases, token_budget)
+
+def enhance_response(user_query: str, ai_response: str, provider: str = "unknown",
+                     expert_cases: Optional[List[Dict]] = None) -> Dict[str, Any]:
     """
     Main function to enhance AI responses with expert knowledge.
     
@@ -461,12 +706,13 @@ def enhance_response(user_query: str, ai_response: str, provider: str = "unknown
         user_query: Original user question
         ai_response: Basic AI response to enhance
         provider: AI provider name
+        expert_cases: Cases already retrieved for this query (skips the search)
         
     Returns:
         Enhanced response with expert context
     """
     rag_system = get_rag_system()
-    return rag_system.enhance_ai_response(user_query, ai_response, provider)
+    return rag_system.enhance_ai_response(user_query, ai_response, provider, expert_cases)
 
 if __name__ == "__main__":
     # Test the RAG system
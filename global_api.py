@@ -10,106 +10,430 @@ import sys
 # Add current directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
 import asyncio
 import aiohttp
+import contextvars
+import hashlib
 import json
 import time
-import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Optional
+from functools import partial
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
 # Import Expert RAG System
 try:
-    from expert_rag_system import enhance_response, get_rag_system
+    from expert_rag_system import (
+        enhance_response,
+        get_rag_system,
+        retrieve_expert_cases,
+        retrieve_expert_cases_batch,
+        build_prompt_context
+    )
     RAG_AVAILABLE = True
     print("🧠 Expert RAG System loaded successfully")
 except ImportError:
     RAG_AVAILABLE = False
     print("⚠️ Expert RAG System not available")
 
+import metrics
+import profiler
+import tracing
+from admission import ADMISSION_ENABLED, WSGIAdmissionMiddleware, admission_controller, overloaded_body
+from background_loop import get_background_loop
+from hedging import call_hedged, get_hedge_stats, latency_tracker
+from provider_router import ProviderRouter
+from rate_limiter import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_BATCH,
+    PRIORITY_HEDGE,
+    PRIORITY_INTERACTIVE,
+    RateLimitExceeded,
+    RateLimiterRegistry,
+    estimate_tokens,
+    parse_retry_after
+)
+from conversation_history import PROMPT_TOKENS, compact_history, message_tokens
+from session_store import ChatSession, create_session_store, new_session_id
+from singleflight import SingleFlight
+from provider_gateway import get_async_session
+from response_cache import get_response_cache, make_cache_key, FRESH, STALE
+
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app, origins="*")  # Enable CORS for all origins
 
+# 🚦 Admission control - chat is shed with 503 + Retry-After under overload,
+# batches have their own concurrency-only lane, and /search and /health use the
+# cheap lane so they keep answering
+ADMISSION_ROUTES = {
+    "/ask": "chat",
+    "/ask/stream": "chat",
+    "/ask/batch": "batch",
+    "/chat": "chat",
+    "/search": "cheap",
+    "/health": "cheap",
+    "/metrics": "cheap"
+}
+
+# ⏱️ Stage timing (Server-Timing header, sampled JSONL traces) for the routes doing real work
+TRACED_ROUTES = ("/ask", "/ask/stream", "/ask/batch", "/chat", "/search")
+app.wsgi_app = WSGIAdmissionMiddleware(
+    tracing.WSGITracingMiddleware(app.wsgi_app, TRACED_ROUTES), admission_controller, ADMISSION_ROUTES
+)
+
+# Provider endpoints - overridable to point at a local stub for load testing
+GROQ_BASE_URL = os.environ.get("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
+OPENROUTER_BASE_URL = os.environ.get("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+
 # Working API Providers - Use environment variables for production
 WORKING_PROVIDERS = {
     "groq_fast": {
         "name": "Groq LLaMA 3.1 8B",
         "api_key": os.environ.get("GROQ_FAST_KEY", "your_groq_fast_key_here"),
-        "base_url": "https://api.groq.com/openai/v1",
+        "base_url": GROQ_BASE_URL,
         "model": "llama-3.1-8b-instant",
+        "expected_latency": 1.0,
         "specialty": "Fast general responses"
     },
     "groq_coding": {
         "name": "Groq Gemma2 9B", 
         "api_key": os.environ.get("GROQ_CODING_KEY", "your_groq_coding_key_here"),
-        "base_url": "https://api.groq.com/openai/v1",
+        "base_url": GROQ_BASE_URL,
         "model": "gemma2-9b-it",
+        "expected_latency": 1.5,
         "specialty": "Coding & technical tasks"
     },
     "deepseek_reasoning": {
         "name": "DeepSeek R1",
         "api_key": os.environ.get("DEEPSEEK_KEY", "your_deepseek_key_here"),
-        "base_url": "https://openrouter.ai/api/v1", 
+        "base_url": OPENROUTER_BASE_URL,
         "model": "deepseek/deepseek-r1",
+        "expected_latency": 15.0,
         "specialty": "Complex reasoning"
     },
     "qwen_general": {
         "name": "Qwen 2.5 72B",
         "api_key": os.environ.get("QWEN_KEY", "your_qwen_key_here"),
-        "base_url": "https://openrouter.ai/api/v1",
-        "model": "qwen/qwen-2.5-72b-instruct", 
+        "base_url": OPENROUTER_BASE_URL,
+        "model": "qwen/qwen-2.5-72b-instruct",
+        "expected_latency": 5.0,
         "specialty": "Comprehensive knowledge"
     }
 }
 
-# Session storage
-chat_sessions = {}
+# Compatible backup for each provider, used when hedging a slow request
+HEDGE_BACKUPS = {
+    "groq_fast": "groq_coding",
+    "groq_coding": "groq_fast",
+    "deepseek_reasoning": "qwen_general",
+    "qwen_general": "groq_fast"
+}
+
+# Per-provider rate limits (free-tier defaults) and concurrency bulkheads
+GROQ_RPM = float(os.environ.get("GROQ_RPM", 30))
+GROQ_TPM = float(os.environ.get("GROQ_TPM", 6000))
+OPENROUTER_RPM = float(os.environ.get("OPENROUTER_RPM", 20))
+OPENROUTER_TPM = float(os.environ.get("OPENROUTER_TPM", 40000))
+PROVIDER_LIMITS = {
+    "groq_fast": {"rpm": GROQ_RPM, "tpm": GROQ_TPM, "concurrency": 8},
+    "groq_coding": {"rpm": GROQ_RPM, "tpm": GROQ_TPM, "concurrency": 8},
+    "deepseek_reasoning": {"rpm": OPENROUTER_RPM, "tpm": OPENROUTER_TPM, "concurrency": 4},
+    "qwen_general": {"rpm": OPENROUTER_RPM, "tpm": OPENROUTER_TPM, "concurrency": 6}
+}
+
+# How many times a request re-queues behind an upstream 429's Retry-After
+RATE_LIMIT_RETRIES = int(os.environ.get("RATE_LIMIT_RETRIES", 1))
+
+rate_limiters = RateLimiterRegistry(PROVIDER_LIMITS)
+
+# Session storage - bounded by count, idle TTL and memory; SESSION_BACKEND=sqlite
+# shares sessions between workers on the same host
+session_store = create_session_store()
+
+# Streaming latency metrics
+STREAM_TIME_TO_FIRST_TOKEN = metrics.histogram(
+    "stream_time_to_first_token_seconds", "Time from /ask/stream arrival to the first provider token"
+)
+STREAM_DURATION = metrics.histogram(
+    "stream_duration_seconds", "Total /ask/stream duration including expert enhancement"
+)
+STREAM_ERRORS = metrics.counter("stream_errors_total", "Provider errors during /ask/stream")
+
+# Request and upstream latency metrics (GET /metrics)
+REQUEST_DURATION = metrics.histogram(
+    "http_request_duration_seconds", "Time to produce a response (to the headers, for streams) by route"
+)
+PROVIDER_LATENCY = metrics.histogram(
+    "provider_request_seconds", "Upstream chat completion time by provider and outcome"
+)
+PROVIDER_TTFB = metrics.histogram("provider_ttfb_seconds", "Time to upstream response headers by provider")
+PROVIDER_ERRORS = metrics.counter("provider_errors_total", "Failed upstream calls by provider and reason")
+RAG_QUEUE_DEPTH = metrics.gauge("rag_executor_queue_depth", "RAG work waiting for a RAG_EXECUTOR thread")
+
+# In-flight coalescing of identical concurrent chat turns (and of their retrievals)
+chat_flight = SingleFlight("chat")
+retrieval_flight = SingleFlight("retrieval")
+
+# Retrieve-then-generate: prompt budget for expert context, and how long the
+# provider call may wait on a retrieval that started at request arrival
+EXPERT_CONTEXT_TOKENS = int(os.environ.get("EXPERT_CONTEXT_TOKENS", 600))
+RETRIEVAL_WAIT_BUDGET = float(os.environ.get("RETRIEVAL_WAIT_BUDGET", 0.75))
+
+# Fire-and-forget tasks running on the background loop
+_background_tasks = set()
+
+# Bounded pool for CPU-bound RAG work so it never blocks the event loop
+RAG_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("RAG_WORKERS", 4)),
+    thread_name_prefix="rag"
+)
+
+metrics.on_collect(lambda: RAG_QUEUE_DEPTH.set(RAG_EXECUTOR._work_queue.qsize()))
+
+# Response cache I/O runs here, never on the event loop - a SQLite call can wait
+# up to its busy timeout on another worker's write
+CACHE_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("CACHE_WORKERS", 2)),
+    thread_name_prefix="cache"
+)
+
+# Session load/append/save runs here for the same reason - a SQLite session write
+# can wait up to its busy timeout on another worker's transaction
+SESSION_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("SESSION_WORKERS", 4)),
+    thread_name_prefix="session"
+)
+
+def run_on_rag_pool(fn, *args) -> asyncio.Future:
+    """Run `fn` on RAG_EXECUTOR, keeping the caller's contextvars (the request trace)"""
+    return asyncio.get_running_loop().run_in_executor(RAG_EXECUTOR, contextvars.copy_context().run, fn, *args)
+
+def run_on_cache_pool(fn, *args) -> asyncio.Future:
+    """Run blocking response cache I/O on CACHE_EXECUTOR"""
+    return asyncio.get_running_loop().run_in_executor(CACHE_EXECUTOR, fn, *args)
+
+def run_on_session_pool(fn, *args) -> asyncio.Future:
+    """Run blocking session store I/O on SESSION_EXECUTOR"""
+    return asyncio.get_running_loop().run_in_executor(SESSION_EXECUTOR, fn, *args)
+
+# Overall budget for one chat request submitted from a Flask handler
+REQUEST_TIMEOUT = float(os.environ.get("REQUEST_TIMEOUT", 60))
 
-class ChatSession:
-    def __init__(self, session_id: str):
-        self.session_id = session_id
-        self.created_at = datetime.now()
-        self.messages = []
-        self.last_activity = datetime.now()
+# /ask/batch - queries per request, answers generated at once per batch, and the
+# budget for each item (the whole batch streams for at most BATCH_TIMEOUT)
+BATCH_MAX_QUERIES = int(os.environ.get("BATCH_MAX_QUERIES", 100))
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", 8))
+BATCH_ITEM_TIMEOUT = float(os.environ.get("BATCH_ITEM_TIMEOUT", REQUEST_TIMEOUT))
+BATCH_TIMEOUT = float(os.environ.get("BATCH_TIMEOUT", 300))
 
 def get_session(session_id: str = None) -> ChatSession:
     """Get or create chat session"""
-    if session_id and session_id in chat_sessions:
-        session = chat_sessions[session_id]
-        session.last_activity = datetime.now()
-        return session
-    
-    new_id = session_id or f"session_{int(time.time())}_{uuid.uuid4().hex[:8]}"
-    session = ChatSession(new_id)
-    chat_sessions[new_id] = session
+    return session_store.get_or_create(session_id)
+
+def open_turn(message: str, session_id: str = None, ephemeral: bool = False) -> ChatSession:
+    """Session for a chat turn with the user's message added (blocking - use run_on_session_pool)"""
+    session = ChatSession(new_session_id()) if ephemeral else get_session(session_id)
+    session_store.append(session, "user", message)
     return session
 
-def select_provider(message: str) -> str:
-    """Intelligent provider selection"""
+def close_turn(session: ChatSession, response: Optional[str] = None, save: bool = True) -> None:
+    """Add the answer, if any, and persist the turn (blocking - use run_on_session_pool)"""
+    if response is not None:
+        session_store.append(session, "assistant", response)
+    if save:
+        session_store.save(session)
+
+# Enhanced system prompt for expert capabilities
+SYSTEM_PROMPT = """You are OpenGenNet AI, an elite enterprise-grade AI assistant with TOP 1% expertise in:
+
+• Advanced Networking & Infrastructure (BGP, OSPF, SD-WAN, network automation, enterprise routing/switching)
+• Cybersecurity Excellence (threat hunting, incident response, security architecture, compliance frameworks)
+• Cloud Computing Mastery (AWS/Azure/GCP expert configurations, containerization, infrastructure as code)
+• Software Development (Python/JavaScript excellence, API design, microservices, DevOps practices)
+• Enterprise IT Leadership (system design, performance optimization, disaster recovery, scalability)
+
+Provide expert-level responses with:
+- Technical accuracy and industry best practices
+- Real-world implementation guidance
+- Security considerations and compliance requirements
+- Performance optimization recommendations
+- Actionable next steps and troubleshooting approaches
+
+Your responses should reflect the knowledge and experience of a senior technical consultant."""
+
+def build_conversation(session: ChatSession) -> Tuple[List[Dict], Dict]:
+    """System prompt plus conversation history compacted to HISTORY_TOKEN_BUDGET"""
+    history, history_stats = compact_history(list(session.messages))
+    return [{"role": "system", "content": SYSTEM_PROMPT}] + history, history_stats
+
+# Providers able to serve each query class (in preference order) and the
+# latency target the router tries to meet for that class
+QUERY_CLASSES = {
+    "coding": {"providers": ["groq_coding", "groq_fast", "qwen_general"], "latency_target": 5.0},
+    "reasoning": {"providers": ["deepseek_reasoning", "qwen_general"], "latency_target": 25.0},
+    "long_form": {"providers": ["qwen_general", "deepseek_reasoning", "groq_fast"], "latency_target": 12.0},
+    "general": {"providers": ["groq_fast", "groq_coding", "qwen_general"], "latency_target": 3.0}
+}
+
+# Live health scoring and circuit breaking per provider
+provider_router = ProviderRouter({
+    key: provider["expected_latency"] for key, provider in WORKING_PROVIDERS.items()
+})
+
+def classify_query(message: str) -> str:
+    """Keyword-based query class"""
     message_lower = message.lower()
     
     # Coding/technical keywords
     coding_keywords = ['code', 'python', 'function', 'programming', 'script', 'debug', 'algorithm', 'implement', 'api', 'sql', 'javascript', 'html', 'css']
     if any(word in message_lower for word in coding_keywords):
-        return "groq_coding"
+        return "coding"
     
     # Complex reasoning keywords  
     reasoning_keywords = ['analyze', 'compare', 'explain why', 'reasoning', 'complex', 'strategy', 'philosophy', 'pros and cons', 'evaluate']
     if any(word in message_lower for word in reasoning_keywords):
-        return "deepseek_reasoning"
+        return "reasoning"
     
     # Long-form content
     if len(message) > 200 or any(word in message_lower for word in ['detailed', 'comprehensive', 'complete guide', 'tutorial', 'step by step']):
-        return "qwen_general"
+        return "long_form"
     
-    # Default to fast provider
-    return "groq_fast"
+    return "general"
 
-async def call_ai_provider(provider_key: str, messages: List[Dict], max_tokens: int = 1000) -> Dict:
-    """Call selected AI provider"""
+def select_provider(message: str) -> str:
+    """Intelligent provider selection - query class first, then live provider health"""
+    query_class = QUERY_CLASSES[classify_query(message)]
+    return provider_router.select(query_class["providers"], query_class["latency_target"])
+
+async def _post_chat_completion(provider: Dict, headers: Dict, payload: Dict) -> Dict:
+    """POST a chat completion to the provider and normalize the result"""
+    start_time = time.time()
+    
+    try:
+        session = get_async_session()
+        async with session.post(
+            f"{provider['base_url']}/chat/completions",
+            json=payload,
+            headers=headers,
+            timeout=aiohttp.ClientTimeout(total=30)
+        ) as response:
+            
+            ttfb = time.time() - start_time
+            
+            if response.status == 200:
+                data = await response.json()
+                content = data['choices'][0]['message']['content']
+                
+                return {
+                    "success": True,
+                    "response": content,
+                    "provider": provider['name'],
+                    "model": provider['model'],
+                    "response_time": time.time() - start_time,
+                    "ttfb": ttfb,
+                    "tokens_used": data.get("usage", {}).get("total_tokens")
+                }
+            else:
+                error_text = await response.text()
+                return {
+                    "success": False,
+                    "error": f"API Error {response.status}: {error_text}",
+                    "provider": provider['name'],
+                    "status": response.status,
+                    "retry_after": parse_retry_after(response.headers.get("Retry-After"))
+                }
+                
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"Connection error: {str(e)}",
+            "provider": provider['name']
+        }
+
+def record_provider_call(provider_key: str, result: Dict, seconds: float) -> None:
+    """Upstream latency, TTFB and errors for one provider attempt"""
+    tracing.record("upstream", seconds, provider=provider_key, success=result["success"])
+    if result["success"]:
+        PROVIDER_LATENCY.observe(seconds, provider=provider_key, outcome="ok")
+        PROVIDER_TTFB.observe(result["ttfb"], provider=provider_key)
+    else:
+        PROVIDER_LATENCY.observe(seconds, provider=provider_key, outcome="error")
+        PROVIDER_ERRORS.inc(provider=provider_key, reason=f"http_{result['status']}" if "status" in result else "connection")
+
+async def _rate_limited_post(provider_key: str, provider: Dict, headers: Dict, payload: Dict,
+                             priority: int = PRIORITY_INTERACTIVE) -> Dict:
+    """POST within the provider's rate limits and bulkhead, re-queueing behind an upstream 429"""
+    limiter = rate_limiters.get(provider_key)
+    tokens = estimate_tokens(payload["messages"], payload["max_tokens"])
+    
+    for attempt in range(RATE_LIMIT_RETRIES + 1):
+        try:
+            with tracing.span("rate_limit_wait", provider=provider_key):
+                await limiter.acquire(tokens, priority)
+        except RateLimitExceeded as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "provider": provider['name'],
+                "rate_limited": True,
+                "locally_throttled": True,
+                "retry_after": e.retry_after
+            }
+        
+        result = None
+        start = time.perf_counter()
+        try:
+            result = await _post_chat_completion(provider, headers, payload)
+        finally:
+            # No completion (error, 429, cancelled hedge loser) - give the token reservation back
+            limiter.release(tokens, result.get("tokens_used") if result and result["success"] else 0)
+        record_provider_call(provider_key, result, time.perf_counter() - start)
+        
+        if result.get("status") != 429:
+            return result
+        
+        # Provider is over its limit - pause it and wait our turn again
+        limiter.penalize(result["retry_after"])
+        result["rate_limited"] = True
+    
+    return result
+
+def _cached_result(entry: Dict) -> Dict:
+    """Build a provider result from a response cache entry"""
+    result = dict(entry["value"])
+    result.update({
+        "success": True,
+        "response_time": 0.0,
+        "cached": True,
+        "cache_state": entry["state"],
+        "cache_age": round(entry["age"], 1)
+    })
+    return result
+
+def _revalidate_in_background(cache_key: str, provider_key: str, provider: Dict, headers: Dict, payload: Dict) -> None:
+    """Refresh a stale cache entry without holding up the current request"""
+    cache = get_response_cache()
+    if not cache.claim_refresh(cache_key):
+        return
+    
+    async def revalidate():
+        try:
+            result = await _rate_limited_post(provider_key, provider, headers, payload, PRIORITY_BACKGROUND)
+            if result["success"]:
+                await run_on_cache_pool(cache.set, cache_key, result)
+        finally:
+            cache.release_refresh(cache_key)
+    
+    # Keep a reference so the task isn't garbage collected mid-flight
+    task = asyncio.get_running_loop().create_task(revalidate())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+def _provider_request(provider_key: str, messages: List[Dict], max_tokens: int) -> tuple:
+    """Provider config, headers and OpenAI-compatible payload for a chat completion"""
     provider = WORKING_PROVIDERS[provider_key]
     
     headers = {
@@ -131,156 +455,561 @@ async def call_ai_provider(provider_key: str, messages: List[Dict], max_tokens:
         "temperature": 0.7
     }
     
+    return provider, headers, payload
+
+async def _attempt_provider(provider_key: str, messages: List[Dict], max_tokens: int,
+                            priority: int = PRIORITY_INTERACTIVE) -> Dict:
+    """One upstream attempt, feeding successful latencies to the hedging tracker"""
+    provider, headers, payload = _provider_request(provider_key, messages, max_tokens)
+    result = await _rate_limited_post(provider_key, provider, headers, payload, priority)
+    if result["success"]:
+        latency_tracker.record(provider_key, result["response_time"])
+        provider_router.record_success(provider_key, result["response_time"], result["ttfb"])
+    elif not result.get("locally_throttled"):
+        # Being over our own quota says nothing about provider health (an upstream 429 does)
+        provider_router.record_failure(provider_key, result["error"])
+    return result
+
+async def call_ai_provider(provider_key: str, messages: List[Dict], max_tokens: int = 1000,
+                           priority: int = PRIORITY_INTERACTIVE) -> Dict:
+    """Call selected AI provider, reusing cached completions for identical payloads"""
+    provider, headers, payload = _provider_request(provider_key, messages, max_tokens)
+    
+    # 💾 Shared response cache (fresh hit, or stale hit refreshed in background)
+    cache = get_response_cache()
+    with tracing.span("cache_lookup") as span:
+        cache_key = make_cache_key(provider['base_url'], payload) if cache else None
+        cached = await run_on_cache_pool(cache.get, cache_key) if cache else None
+        span.set(state=cached["state"] if cached else "miss")
+    
+    if cached and cached["state"] == FRESH:
+        return _cached_result(cached)
+    if cached and cached["state"] == STALE:
+        _revalidate_in_background(cache_key, provider_key, provider, headers, payload)
+        return _cached_result(cached)
+    
+    # ⏱️ Hedge to a compatible backup if the primary is slower than usual
+    backup_key = HEDGE_BACKUPS.get(provider_key)
+    if backup_key and not provider_router.is_available(backup_key):
+        backup_key = None
+    result, hedged = await call_hedged(
+        provider_key, partial(_attempt_provider, provider_key, messages, max_tokens, priority),
+        backup_key, partial(
+            _attempt_provider, backup_key, messages, max_tokens, max(priority, PRIORITY_HEDGE)
+        ) if backup_key else None
+    )
+    result["hedged"] = hedged
+    
+    # 🚦 Primary is over its rate limit - the backup has its own quota
+    if result.get("rate_limited") and backup_key:
+        result = await _attempt_provider(backup_key, messages, max_tokens, priority)
+        result["hedged"] = False
+    
+    if result["success"]:
+        if cache:
+            # Fire and forget; a copy, since callers go on to annotate the result
+            CACHE_EXECUTOR.submit(cache.set, cache_key, dict(result))
+    elif cached:
+        # Provider is failing - serve the most recent answer we have
+        print(f"⚠️ {provider['name']} failed, serving cached response ({int(cached['age'])}s old)")
+        return _cached_result(cached)
+    
+    return result
+
+async def stream_ai_provider(provider_key: str, messages: List[Dict], max_tokens: int = 1000) -> AsyncIterator[str]:
+    """Stream completion text deltas from the provider (`stream: true` SSE), serving cache hits whole"""
+    provider, headers, payload = _provider_request(provider_key, messages, max_tokens)
+    
+    cache = get_response_cache()
+    with tracing.span("cache_lookup") as span:
+        cache_key = make_cache_key(provider['base_url'], payload) if cache else None
+        cached = await run_on_cache_pool(cache.get, cache_key) if cache else None
+        span.set(state=cached["state"] if cached else "miss")
+    
+    if cached and cached["state"] in (FRESH, STALE):
+        if cached["state"] == STALE:
+            _revalidate_in_background(cache_key, provider_key, provider, headers, payload)
+        yield cached["value"]["response"]
+        return
+    
+    limiter = rate_limiters.get(provider_key)
+    tokens = estimate_tokens(messages, max_tokens)
+    with tracing.span("rate_limit_wait", provider=provider_key):
+        await limiter.acquire(tokens)
+    
     start_time = time.time()
+    ttfb = None
+    error_reason = None
+    parts = []
     
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.post(
-                f"{provider['base_url']}/chat/completions",
-                json=payload,
-                headers=headers,
-                timeout=aiohttp.ClientTimeout(total=30)
-            ) as response:
+    try:
+        session = get_async_session()
+        async with session.post(
+            f"{provider['base_url']}/chat/completions",
+            json=dict(payload, stream=True),
+            headers=headers,
+            timeout=aiohttp.ClientTimeout(total=30)
+        ) as response:
+            
+            if response.status != 200:
+                error_text = await response.text()
+                if response.status == 429:
+                    limiter.penalize(parse_retry_after(response.headers.get("Retry-After")))
+                error_reason = f"http_{response.status}"
+                raise RuntimeError(f"API Error {response.status}: {error_text}")
+            
+            ttfb = time.time() - start_time
+            PROVIDER_TTFB.observe(ttfb, provider=provider_key)
+            tracing.record("upstream_ttfb", ttfb, provider=provider_key)
+            
+            async for raw_line in response.content:
+                line = raw_line.decode("utf-8").strip()
+                if not line.startswith("data:"):
+                    continue
                 
-                response_time = time.time() - start_time
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
                 
-                if response.status == 200:
-                    data = await response.json()
-                    content = data['choices'][0]['message']['content']
-                    
-                    return {
-                        "success": True,
-                        "response": content,
-                        "provider": provider['name'],
-                        "model": provider['model'],
-                        "response_time": response_time
-                    }
-                else:
-                    error_text = await response.text()
-                    return {
-                        "success": False,
-                        "error": f"API Error {response.status}: {error_text}",
-                        "provider": provider['name']
-                    }
+                delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                if delta:
+                    parts.append(delta)
+                    yield delta
                     
-        except Exception as e:
-            return {
-                "success": False,
-                "error": f"Connection error: {str(e)}",
-                "provider": provider['name']
-            }
-
-def process_message_sync(message: str, session_id: str = None, max_tokens: int = 1000) -> Dict:
-    """Synchronous wrapper for async AI processing with Expert RAG enhancement"""
+    except Exception as e:
+        provider_router.record_failure(provider_key, str(e))
+        PROVIDER_LATENCY.observe(time.time() - start_time, provider=provider_key, outcome="error")
+        tracing.record("upstream", time.time() - start_time, provider=provider_key, success=False)
+        PROVIDER_ERRORS.inc(provider=provider_key, reason=error_reason or ("stream" if ttfb is not None else "connection"))
+        if parts or not cached:
+            raise
+        # Provider is failing before any output - serve the most recent answer we have
+        print(f"⚠️ {provider['name']} stream failed, serving cached response ({int(cached['age'])}s old)")
+        yield cached["value"]["response"]
+        return
+    finally:
+        # Nothing streamed back - give the token reservation back
+        limiter.release(tokens, None if parts else 0)
     
-    # Get or create session
-    session = get_session(session_id)
-    session.messages.append({"role": "user", "content": message})
+    provider_router.record_success(provider_key, time.time() - start_time, ttfb)
+    PROVIDER_LATENCY.observe(time.time() - start_time, provider=provider_key, outcome="ok")
+    tracing.record("upstream", time.time() - start_time, provider=provider_key, success=True)
     
-    # Build conversation context
-    messages = []
+    if cache and parts:
+        CACHE_EXECUTOR.submit(cache.set, cache_key, {
+            "success": True,
+            "response": "".join(parts),
+            "provider": provider['name'],
+            "model": provider['model'],
+            "response_time": time.time() - start_time
+        })
+
+def coalescing_key(message: str, provider_key: str, max_tokens: int, messages: List[Dict],
+                   priority: int = PRIORITY_INTERACTIVE) -> str:
+    """
+    Normalized query + provider + parameters + prior conversation, per priority so an
+    interactive turn never waits at batch priority behind (or is cancelled with) a batch item
+    """
+    normalized_query = " ".join(message.lower().split())
+    history = json.dumps(messages[:-1], sort_keys=True, ensure_ascii=False)
+    history_digest = hashlib.sha256(history.encode("utf-8")).hexdigest()
+    return f"{priority}:{provider_key}:{max_tokens}:{history_digest}:{normalized_query}"
+
+async def _retrieve(message: str) -> Dict:
+    """Expert retrieval on the RAG pool, timed"""
+    start = time.perf_counter()
+    try:
+        with tracing.span("retrieval"):
+            cases = await run_on_rag_pool(retrieve_expert_cases, message)
+    except Exception as e:
+        print(f"⚠️ Expert retrieval failed: {e}")
+        cases = []
+    return {"cases": cases, "seconds": time.perf_counter() - start}
+
+def start_retrieval(message: str) -> Optional[asyncio.Future]:
+    """Kick off expert retrieval at request arrival (coalesced per normalized query)"""
+    if not RAG_AVAILABLE:
+        return None
+    
+    async def run():
+        retrieval, _ = await retrieval_flight.do(" ".join(message.lower().split()), partial(_retrieve, message))
+        return retrieval
     
-    # Enhanced system prompt for expert capabilities
-    system_prompt = """You are OpenGenNet AI, an elite enterprise-grade AI assistant with TOP 1% expertise in:
+    return asyncio.ensure_future(run())
 
-• Advanced Networking & Infrastructure (BGP, OSPF, SD-WAN, network automation, enterprise routing/switching)
-• Cybersecurity Excellence (threat hunting, incident response, security architecture, compliance frameworks)
-• Cloud Computing Mastery (AWS/Azure/GCP expert configurations, containerization, infrastructure as code)
-• Software Development (Python/JavaScript excellence, API design, microservices, DevOps practices)
-• Enterprise IT Leadership (system design, performance optimization, disaster recovery, scalability)
+async def await_retrieval(retrieval: Optional[asyncio.Future], timeout: Optional[float]) -> Optional[List[Dict]]:
+    """Retrieved cases, or None if retrieval is unavailable or still running after `timeout`"""
+    if retrieval is None:
+        return None
+    done, _ = await asyncio.wait({retrieval}, timeout=timeout)
+    return retrieval.result()["cases"] if done else None
 
-Provide expert-level responses with:
-- Technical accuracy and industry best practices
-- Real-world implementation guidance
-- Security considerations and compliance requirements
-- Performance optimization recommendations
-- Actionable next steps and troubleshooting approaches
+def inject_expert_context(messages: List[Dict], expert_cases: List[Dict]) -> List[Dict]:
+    """Append retrieved expert knowledge to the system prompt, within EXPERT_CONTEXT_TOKENS"""
+    context = build_prompt_context(expert_cases, EXPERT_CONTEXT_TOKENS)
+    if not context:
+        return messages
+    
+    system_message = dict(messages[0])
+    system_message["content"] += f"\n\nRelevant expert knowledge for this question:\n{context}"
+    return [system_message] + messages[1:]
 
-Your responses should reflect the knowledge and experience of a senior technical consultant."""
+async def generate_answer(message: str, messages: List[Dict], provider_key: str, max_tokens: int,
+                          retrieval: Optional[asyncio.Future] = None,
+                          priority: int = PRIORITY_INTERACTIVE) -> Dict:
+    """Provider call plus Expert RAG enhancement - the session-independent part of a chat turn"""
+    timings = {}
+    
+    # 📚 Retrieved knowledge goes into the prompt if it is ready within budget
+    stage_start = time.perf_counter()
+    expert_cases = await await_retrieval(retrieval, RETRIEVAL_WAIT_BUDGET)
+    timings["retrieval_wait"] = time.perf_counter() - stage_start
+    tracing.record("retrieval_wait", timings["retrieval_wait"])
+    if expert_cases:
+        messages = inject_expert_context(messages, expert_cases)
+    prompt_tokens = message_tokens(messages)
+    PROMPT_TOKENS.observe(prompt_tokens)
     
-    messages.append({"role": "system", "content": system_prompt})
+    # Call AI provider
+    stage_start = time.perf_counter()
+    result = await call_ai_provider(provider_key, messages, max_tokens, priority)
+    timings["provider"] = time.perf_counter() - stage_start
+    tracing.record("provider", timings["provider"], provider=provider_key, cached=result.get("cached", False))
     
-    # Add recent conversation history (last 8 messages)
-    recent_messages = session.messages[-8:] if len(session.messages) > 8 else session.messages
-    for msg in recent_messages:
-        messages.append({"role": msg["role"], "content": msg["content"]})
+    if not result["success"]:
+        return {"success": False, "error": result["error"]}
+    
+    basic_response = result["response"]
+    provider_name = result["provider"]
+    answer = {
+        "success": True,
+        "response": basic_response,
+        "model_used": provider_name,
+        "response_time": result["response_time"],
+        "cached": result.get("cached", False),
+        "expert_enhancement": False,
+        "expert_context_injected": bool(expert_cases),
+        "prompt_tokens": prompt_tokens
+    }
+    
+    # 🧠 EXPERT RAG ENHANCEMENT - reuses the arrival-time retrieval instead of searching again
+    if RAG_AVAILABLE:
+        try:
+            print(f"🚀 Enhancing response with Expert RAG system...")
+            stage_start = time.perf_counter()
+            if expert_cases is None:
+                expert_cases = await await_retrieval(retrieval, None)
+            enhancement = await run_on_rag_pool(enhance_response, message, basic_response, provider_name, expert_cases)
+            timings["enhancement"] = time.perf_counter() - stage_start
+            tracing.record("enhancement", timings["enhancement"])
+            
+            if enhancement['expert_enhancement']:
+                # Use enhanced response
+                answer.update({
+                    "response": enhancement['enhanced_response'],
+                    "model_used": f"{provider_name} + Expert RAG",
+                    "expert_enhancement": True,
+                    "expert_sources": enhancement['expert_sources'],
+                    "confidence_boost": enhancement['confidence_boost'],
+                    "enhancement_summary": enhancement['enhancement_summary']
+                })
+            else:
+                print("ℹ️ No relevant expert knowledge found, using basic response")
+                
+        except Exception as e:
+            print(f"⚠️ RAG enhancement failed: {e}")
+            # Fall back to basic response
+    
+    if retrieval is not None and retrieval.done():
+        # Retrieval time that ran concurrently with assembly instead of blocking the prompt
+        timings["retrieval"] = retrieval.result()["seconds"]
+        timings["retrieval_overlap"] = max(0.0, timings["retrieval"] - timings["retrieval_wait"])
+    
+    answer["timings"] = timings
+    return answer
+
+async def process_message(message: str, session_id: str = None, max_tokens: int = 1000,
+                          ephemeral: bool = False) -> Dict:
+    """Async AI processing with Expert RAG enhancement"""
+    arrival = time.perf_counter()
+    
+    # Expert retrieval starts now, overlapping session lookup and history assembly
+    retrieval = start_retrieval(message)
+    
+    # Get or create session (one-off lookups such as the /search fallback are not stored)
+    with tracing.span("session"):
+        session = await run_on_session_pool(open_turn, message, session_id, ephemeral)
+    
+    # Build conversation context
+    with tracing.span("history"):
+        messages, history_stats = build_conversation(session)
     
     # Select best provider
-    selected_provider = select_provider(message)
+    with tracing.span("select_provider") as span:
+        selected_provider = select_provider(message)
+        span.set(provider=selected_provider)
+    assembly_time = time.perf_counter() - arrival
+    
+    # Identical concurrent questions share one upstream call + enhancement
+    with tracing.span("generate") as span:
+        answer, coalesced = await chat_flight.do(
+            coalescing_key(message, selected_provider, max_tokens, messages),
+            partial(generate_answer, message, messages, selected_provider, max_tokens, retrieval)
+        )
+        span.set(coalesced=coalesced)
+    
+    if not answer["success"]:
+        if not ephemeral:
+            await run_on_session_pool(close_turn, session)
+        return {
+            "success": False,
+            "error": answer["error"],
+            "session_id": session.session_id
+        }
+    
+    # Add to session
+    with tracing.span("session_save"):
+        await run_on_session_pool(close_turn, session, answer["response"], not ephemeral)
+    
+    timings = dict(answer["timings"], assembly=assembly_time, total=time.perf_counter() - arrival)
+    
+    result = dict(answer)
+    result.update({
+        "timings": {stage: round(seconds * 1000, 2) for stage, seconds in timings.items()},
+        "coalesced": coalesced,
+        "history": history_stats,
+        "session_id": session.session_id,
+        "message_count": len(session.messages)
+    })
+    return result
+
+async def process_message_stream(message: str, session_id: str = None, max_tokens: int = 1000) -> AsyncIterator[Tuple[str, Dict]]:
+    """
+    Streaming variant of process_message yielding (event, data) pairs:
+    start, token*, expert_enhancement?, done - or error.
+    """
+    start_time = time.perf_counter()
+    retrieval = start_retrieval(message)
+    
+    with tracing.span("session"):
+        session = await run_on_session_pool(open_turn, message, session_id)
+    
+    with tracing.span("history"):
+        messages, history_stats = build_conversation(session)
+    with tracing.span("select_provider") as span:
+        selected_provider = select_provider(message)
+        span.set(provider=selected_provider)
+    provider_name = WORKING_PROVIDERS[selected_provider]['name']
+    
+    yield "start", {"session_id": session.session_id, "model_used": provider_name}
+    
+    with tracing.span("retrieval_wait"):
+        expert_cases = await await_retrieval(retrieval, RETRIEVAL_WAIT_BUDGET)
+    if expert_cases:
+        messages = inject_expert_context(messages, expert_cases)
+    prompt_tokens = message_tokens(messages)
+    PROMPT_TOKENS.observe(prompt_tokens)
     
-    # Call AI provider (run async in sync context)
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
+    time_to_first_token = None
+    parts = []
     
     try:
-        result = loop.run_until_complete(
-            call_ai_provider(selected_provider, messages, max_tokens)
-        )
-    finally:
-        loop.close()
+        async for delta in stream_ai_provider(selected_provider, messages, max_tokens):
+            if time_to_first_token is None:
+                time_to_first_token = time.perf_counter() - start_time
+                STREAM_TIME_TO_FIRST_TOKEN.observe(time_to_first_token, provider=selected_provider)
+            parts.append(delta)
+            yield "token", {"content": delta}
+    except Exception as e:
+        STREAM_ERRORS.inc(provider=selected_provider)
+        await run_on_session_pool(close_turn, session)
+        yield "error", {"error": f"Streaming error: {str(e)}", "session_id": session.session_id}
+        return
     
-    if result["success"]:
-        basic_response = result["response"]
-        provider_name = result["provider"]
-        response_time = result["response_time"]
-        
-        # 🧠 EXPERT RAG ENHANCEMENT
-        if RAG_AVAILABLE:
-            try:
-                print(f"🚀 Enhancing response with Expert RAG system...")
-                enhancement = enhance_response(message, basic_response, provider_name)
+    basic_response = "".join(parts)
+    final_response = basic_response
+    expert_enhancement = False
+    
+    # 🧠 EXPERT RAG ENHANCEMENT - appended as a final event once the answer is complete
+    if RAG_AVAILABLE and basic_response:
+        try:
+            if expert_cases is None:
+                expert_cases = await await_retrieval(retrieval, None)
+            with tracing.span("enhancement"):
+                enhancement = await run_on_rag_pool(enhance_response, message, basic_response, provider_name, expert_cases)
+            
+            if enhancement['expert_enhancement']:
+                final_response = enhancement['enhanced_response']
+                expert_enhancement = True
                 
-                if enhancement['expert_enhancement']:
-                    # Use enhanced response
-                    final_response = enhancement['enhanced_response']
-                    
-                    # Add to session
-                    session.messages.append({"role": "assistant", "content": final_response})
-                    
-                    return {
-                        "success": True,
-                        "response": final_response,
-                        "model_used": f"{provider_name} + Expert RAG",
-                        "response_time": response_time,
-                        "session_id": session.session_id,
-                        "message_count": len(session.messages),
-                        "expert_enhancement": True,
-                        "expert_sources": enhancement['expert_sources'],
-                        "confidence_boost": enhancement['confidence_boost'],
-                        "enhancement_summary": enhancement['enhancement_summary']
-                    }
-                else:
-                    print("ℹ️ No relevant expert knowledge found, using basic response")
-                    
+                # Only send what the enhancement added after the streamed answer
+                _, found, expert_section = final_response.partition(basic_response)
+                
+                yield "expert_enhancement", {
+                    "content": expert_section if found else final_response,
+                    "expert_sources": enhancement['expert_sources'],
+                    "confidence_boost": enhancement['confidence_boost'],
+                    "enhancement_summary": enhancement['enhancement_summary']
+                }
+        except Exception as e:
+            print(f"⚠️ RAG enhancement failed: {e}")
+    
+    await run_on_session_pool(close_turn, session, final_response)
+    
+    total_duration = time.perf_counter() - start_time
+    STREAM_DURATION.observe(total_duration, provider=selected_provider)
+    
+    yield "done", {
+        "session_id": session.session_id,
+        "model_used": f"{provider_name} + Expert RAG" if expert_enhancement else provider_name,
+        "message_count": len(session.messages),
+        "expert_enhancement": expert_enhancement,
+        "time_to_first_token": round(time_to_first_token, 3) if time_to_first_token is not None else None,
+        "total_duration": round(total_duration, 3),
+        "tokens_sent": prompt_tokens,
+        "history": history_stats
+    }
+
+def parse_batch_queries(data: Optional[Dict]) -> Tuple[Optional[List[Dict]], Optional[str]]:
+    """
+    Batch items from a /ask/batch body - {"queries": ["question", {"id": ..., "query": ...}]}.
+    Returns (items, None) or (None, error message).
+    """
+    if not data or not isinstance(data.get("queries"), list) or not data["queries"]:
+        return None, "queries must be a non-empty list"
+    if len(data["queries"]) > BATCH_MAX_QUERIES:
+        return None, f"At most {BATCH_MAX_QUERIES} queries per batch"
+    
+    items = []
+    for index, entry in enumerate(data["queries"]):
+        if isinstance(entry, str):
+            entry = {"query": entry}
+        query = entry.get("query", "").strip() if isinstance(entry, dict) and isinstance(entry.get("query"), str) else ""
+        if not query:
+            return None, f"Query {index} is empty"
+        items.append({"index": index, "id": entry.get("id", index), "query": query})
+    return items, None
+
+async def _retrieve_batch(queries: List[str]) -> Dict:
+    """Expert cases for a whole batch from one vectorized search"""
+    start = time.perf_counter()
+    try:
+        with tracing.span("retrieval", queries=len(queries)):
+            cases = await run_on_rag_pool(retrieve_expert_cases_batch, queries)
+    except Exception as e:
+        print(f"⚠️ Batch expert retrieval failed: {e}")
+        cases = [[] for _ in queries]
+    return {"cases": cases, "seconds": time.perf_counter() - start}
+
+def start_batch_retrieval(queries: List[str]) -> List[Optional[asyncio.Future]]:
+    """One retrieval for the batch, exposed as a per-query future in start_retrieval's format"""
+    if not RAG_AVAILABLE:
+        return [None] * len(queries)
+    
+    batch = asyncio.ensure_future(_retrieve_batch(queries))
+    
+    async def item(index: int) -> Dict:
+        retrieval = await batch
+        return {"cases": retrieval["cases"][index], "seconds": retrieval["seconds"]}
+    
+    return [asyncio.ensure_future(item(index)) for index in range(len(queries))]
+
+async def process_batch(items: List[Dict], max_tokens: int = 1000) -> AsyncIterator[Dict]:
+    """
+    Answer a batch of independent questions, yielding one result per item as it
+    completes (start, result*, done). Items run BATCH_CONCURRENCY at a time at
+    batch priority, so interactive chat still gets provider slots first.
+    """
+    start_time = time.perf_counter()
+    yield {"event": "start", "count": len(items)}
+    
+    retrievals = start_batch_retrieval([item["query"] for item in items])
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    
+    async def run(item: Dict, retrieval: Optional[asyncio.Future]) -> Dict:
+        result = {"event": "result", "index": item["index"], "id": item["id"], "query": item["query"]}
+        async with semaphore:
+            item_start = time.perf_counter()
+            messages = [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": item["query"]}]
+            selected_provider = select_provider(item["query"])
+            try:
+                answer, coalesced = await asyncio.wait_for(chat_flight.do(
+                    coalescing_key(item["query"], selected_provider, max_tokens, messages, PRIORITY_BATCH),
+                    partial(generate_answer, item["query"], messages, selected_provider, max_tokens,
+                            retrieval, PRIORITY_BATCH)
+                ), BATCH_ITEM_TIMEOUT)
+            except asyncio.TimeoutError:
+                result.update(status="timeout", error=f"No answer within {BATCH_ITEM_TIMEOUT:.0f}s")
+                return result
             except Exception as e:
-                print(f"⚠️ RAG enhancement failed: {e}")
-                # Fall back to basic response
+                result.update(status="error", error=str(e))
+                return result
         
-        # Add basic response to session
-        session.messages.append({"role": "assistant", "content": basic_response})
+        if not answer["success"]:
+            result.update(status="error", error=answer["error"])
+            return result
         
-        return {
-            "success": True,
-            "response": basic_response,
-            "model_used": provider_name,
-            "response_time": response_time,
-            "session_id": session.session_id,
-            "message_count": len(session.messages),
-            "expert_enhancement": False
-        }
-    else:
+        result.update({
+            "status": "ok",
+            "response": answer["response"],
+            "model_used": answer["model_used"],
+            "response_time": answer["response_time"],
+            "expert_enhancement": answer["expert_enhancement"],
+            "coalesced": coalesced,
+            "duration_ms": round((time.perf_counter() - item_start) * 1000, 2)
+        })
+        return result
+    
+    tasks = [asyncio.ensure_future(run(item, retrieval)) for item, retrieval in zip(items, retrievals)]
+    counts = {"ok": 0, "error": 0, "timeout": 0}
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            result = await next_result
+            counts[result["status"]] += 1
+            yield result
+    finally:
+        # Client went away or the batch timed out - stop the remaining items; cancelling
+        # an item's wrapper cancels its generation once no other caller shares it
+        pending = [task for task in tasks + [r for r in retrievals if r is not None] if not task.done()]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    
+    yield {
+        "event": "done",
+        "count": len(items),
+        **counts,
+        "total_duration": round(time.perf_counter() - start_time, 3)
+    }
+
+def format_sse(event: str, data: Dict) -> str:
+    """Encode one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def process_message_sync(message: str, session_id: str = None, max_tokens: int = 1000,
+                         ephemeral: bool = False) -> Dict:
+    """Synchronous bridge that runs process_message on the shared background loop"""
+    submitted = time.perf_counter()
+    
+    async def run():
+        # Time from submission until the loop picked the request up
+        tracing.record("loop_dispatch", time.perf_counter() - submitted)
+        return await process_message(message, session_id, max_tokens, ephemeral)
+    
+    try:
+        return get_background_loop().run(run(), timeout=REQUEST_TIMEOUT)
+    except TimeoutError as e:
         return {
             "success": False,
-            "error": result["error"],
-            "session_id": session.session_id
+            "error": str(e),
+            "session_id": session_id or "unknown"
         }
 
-# 🌐 API ENDPOINTS FOR FRONTEND BUILDERS
+# 📦 RESPONSE PAYLOADS (shared by the Flask app and the ASGI app in global_asgi.py)
 
-@app.route("/", methods=["GET"])
-def home():
+def service_info_payload() -> Dict:
     """API documentation and service info"""
-    return jsonify({
+    return {
         "service": "OpenGenNet Expert AI API",
         "version": "1.0.0",
         "description": "Global API for TOP 1% cybersecurity and networking expertise",
@@ -289,10 +1018,13 @@ def home():
             "GET /": "Service information",
             "GET /health": "Health check",
             "POST /ask": "Simple chat endpoint for frontend builders",
+            "POST /ask/stream": "Streaming chat endpoint (server-sent events)",
+            "POST /ask/batch": "Many questions at once, results streamed as NDJSON as they complete",
             "POST /chat": "Alternative chat endpoint",
-            "POST /search": "Expert knowledge search",
+            "POST /search": "Expert knowledge search (?explain=1 adds timings, candidates and score breakdown)",
             "GET /models": "Available models",
-            "GET /status": "System status"
+            "GET /status": "System status",
+            "GET /metrics": "Prometheus metrics (latency histograms, counters, queue depths)"
         },
         "integration": {
             "frontend_builder": "Lovable.ai, Bolt.new, Durable, etc.",
@@ -303,19 +1035,168 @@ def home():
         },
         "documentation": "https://docs.opengennet.ai",
         "support": "https://github.com/opengennet/api"
-    })
+    }
 
-@app.route("/health", methods=["GET"])
-def health():
-    """Health check endpoint - critical for deployment platforms"""
-    return jsonify({
+def health_payload() -> Dict:
+    """Health check body"""
+    return {
         "status": "healthy",
         "service": "OpenGenNet Expert AI Backend",
         "version": "1.0.0",
         "expert_rag": "available" if RAG_AVAILABLE else "unavailable",
         "providers": len(WORKING_PROVIDERS),
         "timestamp": datetime.now().isoformat()
-    })
+    }
+
+def ask_payload(result: Dict) -> Dict:
+    """Frontend-builder response body for a successful /ask"""
+    response_data = {
+        "response": result["response"],
+        "session_id": result["session_id"],
+        "model_used": result["model_used"],
+        "response_time": result["response_time"],
+        "cached": result["cached"],
+        "timings": result.get("timings", {}),
+        "tokens_sent": result.get("prompt_tokens"),
+        "timestamp": datetime.now().isoformat()
+    }
+    
+    # Add expert enhancement details if available
+    if result.get("expert_enhancement"):
+        response_data.update({
+            "expert_enhancement": True,
+            "expert_sources": result["expert_sources"],
+            "confidence_boost": result["confidence_boost"]
+        })
+    
+    return response_data
+
+def expert_search_payload(query: str, expert_results: List[Dict], explanation: Optional[Dict] = None) -> Dict:
+    """/search body for direct expert knowledge hits (plus the ranking explanation for ?explain=1)"""
+    payload = {
+        "query": query,
+        "results": [
+            {
+                "title": result["title"],
+                "content": result["content"][:500] + "..." if len(result["content"]) > 500 else result["content"],
+                "category": result["category"],
+                "technology": result["technology"],
+                "relevance_score": result["relevance_score"],
+                "quality_score": result["quality_score"],
+                "source": "Expert Knowledge Base"
+            }
+            for result in expert_results
+        ],
+        "total_found": len(expert_results),
+        "search_type": "expert_knowledge"
+    }
+    if explanation is not None:
+        payload["explain"] = explanation
+    return payload
+
+def ai_search_payload(query: str, result: Dict) -> Dict:
+    """/search body when falling back to an AI-generated answer"""
+    return {
+        "query": query,
+        "results": [{
+            "title": "AI Knowledge Response",
+            "content": result["response"],
+            "source": result["model_used"],
+            "relevance": 0.95
+        }],
+        "search_type": "ai_generated"
+    }
+
+def models_payload() -> Dict:
+    """Available models"""
+    model_list = []
+    for key, provider in WORKING_PROVIDERS.items():
+        model_list.append({
+            "id": key,
+            "object": "model",
+            "created": int(time.time()),
+            "owned_by": "opengennet",
+            "name": provider["name"],
+            "model": provider["model"],
+            "specialty": provider["specialty"]
+        })
+    
+    return {
+        "object": "list",
+        "data": model_list
+    }
+
+def status_payload() -> Dict:
+    """System status for monitoring"""
+    expert_status = "available" if RAG_AVAILABLE else "unavailable"
+    cache = get_response_cache()
+    provider_scores = provider_router.scores()
+    
+    capabilities = [
+        "Multi-model AI routing",
+        "Session management", 
+        "Conversation memory",
+        "Real-time responses",
+        "Expert knowledge enhancement"
+    ]
+    
+    if RAG_AVAILABLE:
+        capabilities.extend([
+            "Expert knowledge enhancement",
+            "Semantic search",
+            "TOP 1% cybersecurity expertise",
+            "Advanced networking knowledge"
+        ])
+    
+    return {
+        "status": "operational",
+        "expert_rag_system": expert_status,
+        "active_sessions": len(session_store),
+        "sessions": session_store.stats(),
+        "response_cache": cache.get_stats() if cache else {"enabled": False},
+        "hedging": get_hedge_stats(),
+        "rate_limits": rate_limiters.stats(),
+        "admission": admission_controller.stats(),
+        "providers": {
+            name: dict(
+                {"model": config["model"], "specialty": config["specialty"]},
+                **provider_scores[name]
+            )
+            for name, config in WORKING_PROVIDERS.items()
+        },
+        "capabilities": capabilities,
+        "metrics": metrics.snapshot(),
+        "uptime": datetime.now().isoformat()
+    }
+
+def record_request(rule: Optional[str], method: str, status: int, started: float) -> None:
+    """Request latency by matched route rule (unmatched paths share one series)"""
+    REQUEST_DURATION.observe(
+        time.perf_counter() - started, route=rule or "unmatched", method=method, status=str(status)
+    )
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_duration(response):
+    if "request_start" in g:
+        record_request(request.url_rule.rule if request.url_rule else None, request.method,
+                       response.status_code, g.request_start)
+    return response
+
+# 🌐 API ENDPOINTS FOR FRONTEND BUILDERS
+
+@app.route("/", methods=["GET"])
+def home():
+    """API documentation and service info"""
+    return jsonify(service_info_payload())
+
+@app.route("/health", methods=["GET"])
+def health():
+    """Health check endpoint - critical for deployment platforms"""
+    return jsonify(health_payload())
 
 @app.route("/ask", methods=["POST"])  
 def ask():
@@ -341,23 +1222,7 @@ def ask():
         result = process_message_sync(query, session_id, max_tokens)
         
         if result["success"]:
-            response_data = {
-                "response": result["response"],
-                "session_id": result["session_id"],
-                "model_used": result["model_used"],
-                "response_time": result["response_time"],
-                "timestamp": datetime.now().isoformat()
-            }
-            
-            # Add expert enhancement details if available
-            if result.get("expert_enhancement"):
-                response_data.update({
-                    "expert_enhancement": True,
-                    "expert_sources": result["expert_sources"],
-                    "confidence_boost": result["confidence_boost"]
-                })
-            
-            return jsonify(response_data)
+            return jsonify(ask_payload(result))
         else:
             return jsonify({
                 "error": result["error"],
@@ -367,6 +1232,74 @@ def ask():
     except Exception as e:
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
+@app.route("/ask/stream", methods=["POST"])
+def ask_stream():
+    """
+    Streaming chat endpoint - same request body as /ask
+    Returns: text/event-stream of start, token, expert_enhancement and done events
+    """
+    data = request.get_json(silent=True)
+    
+    if not data:
+        return jsonify({"error": "JSON body required"}), 400
+    
+    query = data.get("query", "").strip()
+    if not query:
+        return jsonify({"error": "Query parameter required"}), 400
+    
+    session_id = data.get("session_id", None)
+    max_tokens = data.get("max_tokens", 1000)
+    
+    events = get_background_loop().iterate(
+        process_message_stream(query, session_id, max_tokens),
+        timeout=REQUEST_TIMEOUT
+    )
+    
+    def generate():
+        try:
+            for event, payload in events:
+                yield format_sse(event, payload)
+        except TimeoutError as e:
+            yield format_sse("error", {"error": str(e)})
+        finally:
+            events.close()
+    
+    return Response(generate(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+@app.route("/ask/batch", methods=["POST"])
+def ask_batch():
+    """
+    Batch chat endpoint
+    Accepts: { "queries": ["question", {"id": "q2", "query": "question"}], "max_tokens": 1000 }
+    Returns: application/x-ndjson - a start line, one result line per query in completion order, a done line
+    """
+    data = request.get_json(silent=True)
+    items, error = parse_batch_queries(data)
+    if error:
+        return jsonify({"error": error}), 400
+    
+    events = get_background_loop().iterate(
+        process_batch(items, data.get("max_tokens", 1000)),
+        timeout=BATCH_TIMEOUT
+    )
+    
+    def generate():
+        try:
+            for payload in events:
+                yield json.dumps(payload) + "\n"
+        except TimeoutError as e:
+            yield json.dumps({"event": "error", "error": str(e)}) + "\n"
+        finally:
+            events.close()
+    
+    return Response(generate(), mimetype="application/x-ndjson", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
 @app.route("/chat", methods=["POST"])
 def chat():
     """Alternative chat endpoint (compatibility)"""
@@ -393,6 +1326,7 @@ def search():
     try:
         data = request.get_json()
         query = data.get("query", "").strip()
+        explain = request.args.get("explain") == "1"
         
         if not query:
             return jsonify({"error": "Query required"}), 400
@@ -400,44 +1334,34 @@ def search():
         # Direct expert knowledge search if RAG is available
         if RAG_AVAILABLE:
             try:
-                rag_system = get_rag_system()
-                expert_results = rag_system.search_expert_knowledge(query, top_k=5)
+                with tracing.span("expert_search"):
+                    rag_system = get_rag_system()
+                    if explain:
+                        expert_results, explanation = rag_system.search_expert_knowledge(query, top_k=5, profile=True)
+                    else:
+                        expert_results, explanation = rag_system.search_expert_knowledge(query, top_k=5), None
                 
-                if expert_results:
-                    return jsonify({
-                        "query": query,
-                        "results": [
-                            {
-                                "title": result["title"],
-                                "content": result["content"][:500] + "..." if len(result["content"]) > 500 else result["content"],
-                                "category": result["category"],
-                                "technology": result["technology"],
-                                "relevance_score": result["relevance_score"],
-                                "quality_score": result["quality_score"],
-                                "source": "Expert Knowledge Base"
-                            }
-                            for result in expert_results
-                        ],
-                        "total_found": len(expert_results),
-                        "search_type": "expert_knowledge"
-                    })
+                # An explained search answers even with no hits - the explanation is the point
+                if expert_results or explanation:
+                    return jsonify(expert_search_payload(query, expert_results, explanation))
             except Exception as e:
                 print(f"⚠️ Expert search failed: {e}")
         
-        # Fallback to AI response
-        result = process_message_sync(f"Search knowledge about: {query}")
+        # Fallback to AI response - chat-lane work, so only when chat has room
+        retry_after = admission_controller.try_admit("chat") if ADMISSION_ENABLED else None
+        if retry_after is not None:
+            return Response(overloaded_body(retry_after), status=503, mimetype="application/json",
+                            headers={"Retry-After": str(int(retry_after + 0.999))})
+        
+        start_time = time.perf_counter()
+        try:
+            result = process_message_sync(f"Search knowledge about: {query}", ephemeral=True)
+        finally:
+            if ADMISSION_ENABLED:
+                admission_controller.release("chat", time.perf_counter() - start_time)
         
         if result["success"]:
-            return jsonify({
-                "query": query,
-                "results": [{
-                    "title": "AI Knowledge Response",
-                    "content": result["response"],
-                    "source": result["model_used"],
-                    "relevance": 0.95
-                }],
-                "search_type": "ai_generated"
-            })
+            return jsonify(ai_search_payload(query, result))
         else:
             return jsonify({"error": result["error"]}), 500
             
@@ -447,59 +1371,23 @@ def search():
 @app.route("/models", methods=["GET"])
 def models():
     """List available models"""
-    model_list = []
-    for key, provider in WORKING_PROVIDERS.items():
-        model_list.append({
-            "id": key,
-            "object": "model",
-            "created": int(time.time()),
-            "owned_by": "opengennet",
-            "name": provider["name"],
-            "model": provider["model"],
-            "specialty": provider["specialty"]
-        })
-    
-    return jsonify({
-        "object": "list",
-        "data": model_list
-    })
+    return jsonify(models_payload())
 
 @app.route("/status", methods=["GET"])
 def status():
     """System status for monitoring"""
-    expert_status = "available" if RAG_AVAILABLE else "unavailable"
-    
-    capabilities = [
-        "Multi-model AI routing",
-        "Session management", 
-        "Conversation memory",
-        "Real-time responses",
-        "Expert knowledge enhancement"
-    ]
-    
-    if RAG_AVAILABLE:
-        capabilities.extend([
-            "Expert knowledge enhancement",
-            "Semantic search",
-            "TOP 1% cybersecurity expertise",
-            "Advanced networking knowledge"
-        ])
-    
-    return jsonify({
-        "status": "operational",
-        "expert_rag_system": expert_status,
-        "active_sessions": len(chat_sessions),
-        "providers": {
-            name: {
-                "model": config["model"],
-                "specialty": config["specialty"], 
-                "status": "active"
-            }
-            for name, config in WORKING_PROVIDERS.items()
-        },
-        "capabilities": capabilities,
-        "uptime": datetime.now().isoformat()
-    })
+    return jsonify(status_payload())
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """Prometheus scrape endpoint (this worker's metrics)"""
+    return Response(metrics.render_prometheus(), content_type=metrics.PROMETHEUS_CONTENT_TYPE)
+
+@app.route("/debug/profile", methods=["GET"])
+def debug_profile():
+    """Sampling profile of this worker as collapsed stacks - off unless PROFILER_ENABLED, token required"""
+    body, status, headers = profiler.handle_profile_request(request.args, request.headers.get("Authorization"))
+    return Response(body, status=status, headers=headers)
 
 # Error handlers
 @app.errorhandler(404)
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+🌐 OpenGenNet Expert AI - Global API (ASGI serving mode)
+Same endpoints as global_api.py, served natively async: provider calls are awaited
+on the server's event loop instead of holding a worker thread, and CPU-bound RAG
+search runs on the bounded RAG_EXECUTOR pool.
+
+Run with: uvicorn global_asgi:app --host 0.0.0.0 --port $PORT
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+from functools import partial
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from quart import Quart, Response, g, request, jsonify
+
+import global_api
+import metrics
+import profiler
+import tracing
+from admission import ADMISSION_ENABLED, ASGIAdmissionMiddleware, admission_controller, overloaded_body
+from provider_gateway import close_async_session
+from global_api import (
+    ADMISSION_ROUTES,
+    BATCH_TIMEOUT,
+    RAG_AVAILABLE,
+    REQUEST_TIMEOUT,
+    TRACED_ROUTES,
+    process_message,
+    record_request,
+    run_on_rag_pool,
+    process_message_stream,
+    process_batch,
+    parse_batch_queries,
+    format_sse,
+    service_info_payload,
+    health_payload,
+    ask_payload,
+    expert_search_payload,
+    ai_search_payload,
+    models_payload,
+    status_payload
+)
+
+# Initialize Quart app
+app = Quart(__name__)
+
+# 🚦 Admission control and ⏱️ stage timing - same lanes and traced routes as the Flask app
+app.asgi_app = ASGIAdmissionMiddleware(
+    tracing.ASGITracingMiddleware(app.asgi_app, TRACED_ROUTES), admission_controller, ADMISSION_ROUTES
+)
+
+@app.before_request
+async def start_request_timer():
+    g.request_start = time.perf_counter()
+
+# CORS headers for frontend compatibility, and request latency metrics
+@app.after_request
+async def after_request(response):
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    response.headers["Access-Control-Allow-Headers"] = "Content-Type,Authorization"
+    response.headers["Access-Control-Allow-Methods"] = "GET,POST,OPTIONS"
+    if "request_start" in g:
+        record_request(request.url_rule.rule if request.url_rule else None, request.method,
+                       response.status_code, g.request_start)
+    return response
+
+@app.after_serving
+async def shutdown():
+    """Release pooled provider connections held by the server loop"""
+    await close_async_session()
+
+async def process_message_async(message: str, session_id: str = None, max_tokens: int = 1000,
+                                ephemeral: bool = False):
+    """Await process_message on the server loop with the same budget as the Flask bridge"""
+    try:
+        return await asyncio.wait_for(
+            process_message(message, session_id, max_tokens, ephemeral),
+            timeout=REQUEST_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        return {
+            "success": False,
+            "error": f"Operation timed out after {REQUEST_TIMEOUT}s",
+            "session_id": session_id or "unknown"
+        }
+
+# 🌐 API ENDPOINTS FOR FRONTEND BUILDERS
+
+@app.route("/", methods=["GET"])
+async def home():
+    """API documentation and service info"""
+    return jsonify(service_info_payload())
+
+@app.route("/health", methods=["GET"])
+async def health():
+    """Health check endpoint - critical for deployment platforms"""
+    return jsonify(health_payload())
+
+@app.route("/ask", methods=["POST"])
+async def ask():
+    """
+    Main AI chat endpoint - optimized for frontend builders like Lovable.ai
+    Accepts: { "query": "user question" }
+    Returns: { "response": "AI answer" }
+    """
+    try:
+        data = await request.get_json(silent=True)
+
+        if not data:
+            return jsonify({"error": "JSON body required"}), 400
+
+        query = data.get("query", "").strip()
+        if not query:
+            return jsonify({"error": "Query parameter required"}), 400
+
+        session_id = data.get("session_id", None)
+        max_tokens = data.get("max_tokens", 1000)
+
+        result = await process_message_async(query, session_id, max_tokens)
+
+        if result["success"]:
+            return jsonify(ask_payload(result))
+        else:
+            return jsonify({
+                "error": result["error"],
+                "session_id": result.get("session_id", "unknown")
+            }), 500
+
+    except Exception as e:
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+@app.route("/ask/stream", methods=["POST"])
+async def ask_stream():
+    """
+    Streaming chat endpoint - same request body as /ask
+    Returns: text/event-stream of start, token, expert_enhancement and done events
+    """
+    data = await request.get_json(silent=True)
+
+    if not data:
+        return jsonify({"error": "JSON body required"}), 400
+
+    query = data.get("query", "").strip()
+    if not query:
+        return jsonify({"error": "Query parameter required"}), 400
+
+    session_id = data.get("session_id", None)
+    max_tokens = data.get("max_tokens", 1000)
+
+    async def generate():
+        events = process_message_stream(query, session_id, max_tokens)
+        try:
+            while True:
+                # Same per-event bound as the Flask app's get_background_loop().iterate
+                try:
+                    event, payload = await asyncio.wait_for(events.__anext__(), REQUEST_TIMEOUT)
+                except StopAsyncIteration:
+                    break
+                yield format_sse(event, payload).encode("utf-8")
+        except asyncio.TimeoutError:
+            yield format_sse("error", {"error": f"Operation timed out after {REQUEST_TIMEOUT}s"}).encode("utf-8")
+        finally:
+            await events.aclose()
+
+    response = Response(generate(), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    response.timeout = None
+    return response
+
+@app.route("/ask/batch", methods=["POST"])
+async def ask_batch():
+    """
+    Batch chat endpoint - same request body as the Flask app
+    Returns: application/x-ndjson, one result line per query in completion order
+    """
+    data = await request.get_json(silent=True)
+    items, error = parse_batch_queries(data)
+    if error:
+        return jsonify({"error": error}), 400
+
+    async def generate():
+        batch = process_batch(items, data.get("max_tokens", 1000))
+        deadline = asyncio.get_running_loop().time() + BATCH_TIMEOUT
+        try:
+            while True:
+                remaining = deadline - asyncio.get_running_loop().time()
+                try:
+                    payload = await asyncio.wait_for(batch.__anext__(), max(0.0, remaining))
+                except StopAsyncIteration:
+                    break
+                yield (json.dumps(payload) + "\n").encode("utf-8")
+        except asyncio.TimeoutError:
+            yield (json.dumps({"event": "error", "error": f"Batch timed out after {BATCH_TIMEOUT}s"}) + "\n").encode("utf-8")
+        finally:
+            await batch.aclose()
+
+    response = Response(generate(), mimetype="application/x-ndjson")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    response.timeout = None
+    return response
+
+@app.route("/chat", methods=["POST"])
+async def chat():
+    """Alternative chat endpoint (compatibility)"""
+    try:
+        data = await request.get_json(silent=True) or {}
+
+        message = data.get("message", "").strip()
+        if not message:
+            return jsonify({"error": "Message required"}), 400
+
+        session_id = data.get("session_id", None)
+        max_tokens = data.get("max_tokens", 1000)
+
+        result = await process_message_async(message, session_id, max_tokens)
+
+        return jsonify(result)
+
+    except Exception as e:
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+@app.route("/search", methods=["POST"])
+async def search():
+    """Expert knowledge search endpoint"""
+    try:
+        data = await request.get_json(silent=True) or {}
+        query = data.get("query", "").strip()
+        explain = request.args.get("explain") == "1"
+
+        if not query:
+            return jsonify({"error": "Query required"}), 400
+
+        # Direct expert knowledge search, off the event loop
+        if RAG_AVAILABLE:
+            try:
+                with tracing.span("expert_search"):
+                    rag_system = await run_on_rag_pool(global_api.get_rag_system)
+                    if explain:
+                        expert_results, explanation = await run_on_rag_pool(
+                            partial(rag_system.search_expert_knowledge, query, 5, profile=True)
+                        )
+                    else:
+                        expert_results, explanation = await run_on_rag_pool(rag_system.search_expert_knowledge, query, 5), None
+
+                # An explained search answers even with no hits - the explanation is the point
+                if expert_results or explanation:
+                    return jsonify(expert_search_payload(query, expert_results, explanation))
+            except Exception as e:
+                print(f"⚠️ Expert search failed: {e}")
+
+        # Fallback to AI response - chat-lane work, so only when chat has room
+        retry_after = admission_controller.try_admit("chat") if ADMISSION_ENABLED else None
+        if retry_after is not None:
+            return Response(overloaded_body(retry_after), status=503, mimetype="application/json",
+                            headers={"Retry-After": str(int(retry_after + 0.999))})
+
+        start_time = time.perf_counter()
+        try:
+            result = await process_message_async(f"Search knowledge about: {query}", ephemeral=True)
+        finally:
+            if ADMISSION_ENABLED:
+                admission_controller.release("chat", time.perf_counter() - start_time)
+
+        if result["success"]:
+            return jsonify(ai_search_payload(query, result))
+        else:
+            return jsonify({"error": result["error"]}), 500
+
+    except Exception as e:
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+@app.route("/models", methods=["GET"])
+async def models():
+    """List available models"""
+    return jsonify(models_payload())
+
+@app.route("/status", methods=["GET"])
+async def status():
+    """System status for monitoring"""
+    return jsonify(status_payload())
+
+@app.route("/metrics", methods=["GET"])
+async def prometheus_metrics():
+    """Prometheus scrape endpoint (this worker's metrics)"""
+    return Response(metrics.render_prometheus(), content_type=metrics.PROMETHEUS_CONTENT_TYPE)
+
+@app.route("/debug/profile", methods=["GET"])
+async def debug_profile():
+    """Sampling profile of this worker - sampled from a pool thread so the event loop keeps serving"""
+    body, status, headers = await asyncio.get_running_loop().run_in_executor(
+        None, profiler.handle_profile_request, dict(request.args), request.headers.get("Authorization")
+    )
+    response = Response(body, status=status, headers=headers)
+    response.timeout = None
+    return response
+
+# Error handlers
+@app.errorhandler(404)
+async def not_found(error):
+    return jsonify({"error": {"message": "Endpoint not found", "type": "not_found"}}), 404
+
+@app.errorhandler(500)
+async def internal_error(error):
+    return jsonify({"error": {"message": "Internal server error", "type": "internal_error"}}), 500
+
+if __name__ == "__main__":
+    import uvicorn
+
+    port = int(os.environ.get("PORT", 8000))
+
+    print("🌐 Starting OpenGenNet Expert AI - Global API (ASGI)")
+    print("=" * 60)
+    print(f"🧠 Expert RAG System: {'Available' if RAG_AVAILABLE else 'Unavailable'}")
+    print(f"🌍 Global API Server: http://0.0.0.0:{port}")
+    print("=" * 60)
+
+    uvicorn.run(app, host="0.0.0.0", port=port)
@@ -0,0 +1,163 @@
+"""
+OpenGenNet AI - Hedged Provider Requests
+When the primary provider has not answered within its recent latency percentile,
+the same request is sent to a compatible backup provider; the first successful
+answer wins and the other call is cancelled. A token-bucket budget caps how many
+extra upstream requests hedging may add.
+"""
+
+import asyncio
+import os
+import threading
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+import metrics
+
+# Hedging configuration - override through environment variables
+HEDGING_ENABLED = os.environ.get("HEDGING_ENABLED", "true").lower() == "true"
+HEDGE_PERCENTILE = float(os.environ.get("HEDGE_PERCENTILE", 0.95))
+HEDGE_DEFAULT_DELAY = float(os.environ.get("HEDGE_DEFAULT_DELAY", 8.0))
+HEDGE_MIN_DELAY = float(os.environ.get("HEDGE_MIN_DELAY", 0.5))
+HEDGE_MAX_DELAY = float(os.environ.get("HEDGE_MAX_DELAY", 20.0))
+HEDGE_MIN_SAMPLES = int(os.environ.get("HEDGE_MIN_SAMPLES", 20))
+HEDGE_BUDGET_RATIO = float(os.environ.get("HEDGE_BUDGET_RATIO", 0.1))
+HEDGE_BUDGET_BURST = float(os.environ.get("HEDGE_BUDGET_BURST", 10))
+
+HEDGE_REQUESTS = metrics.counter("hedge_eligible_requests_total", "Provider calls that could have been hedged")
+HEDGES_FIRED = metrics.counter("hedges_fired_total", "Backup requests sent because the primary was slow")
+HEDGE_WINS = metrics.counter("hedge_wins_total", "Hedged calls where the backup provider answered first")
+HEDGES_DENIED = metrics.counter("hedges_denied_total", "Hedges skipped because the budget was exhausted")
+
+
+class LatencyTracker:
+    """Rolling window of recent successful call latencies per provider."""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, provider_key: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.get(provider_key)
+            if samples is None:
+                samples = self._samples[provider_key] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def percentile(self, provider_key: str, quantile: float) -> Optional[float]:
+        """Latency at `quantile`, or None until HEDGE_MIN_SAMPLES calls have been seen."""
+        with self._lock:
+            samples = sorted(self._samples.get(provider_key, ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * quantile))]
+
+
+class HedgeBudget:
+    """Every request earns `ratio` tokens (up to `burst`); every hedge spends one."""
+
+    def __init__(self, ratio: float = HEDGE_BUDGET_RATIO, burst: float = HEDGE_BUDGET_BURST):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = burst
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+
+latency_tracker = LatencyTracker()
+hedge_budget = HedgeBudget()
+
+
+def hedge_delay(provider_key: str) -> float:
+    """How long to wait on the primary before hedging."""
+    observed = latency_tracker.percentile(provider_key, HEDGE_PERCENTILE)
+    delay = HEDGE_DEFAULT_DELAY if observed is None else observed
+    return max(HEDGE_MIN_DELAY, min(HEDGE_MAX_DELAY, delay))
+
+
+async def _cancel(task: asyncio.Task) -> None:
+    task.cancel()
+    try:
+        await task
+    except (asyncio.CancelledError, Exception):
+        pass
+
+
+async def call_hedged(primary_key: str, primary: Callable[[], Awaitable[Dict]],
+                      backup_key: Optional[str], backup: Optional[Callable[[], Awaitable[Dict]]]) -> Tuple[Dict, bool]:
+    """
+    Run `primary`, hedging with `backup` if it is slower than its latency percentile.
+
+    Both callables return provider result dicts with a "success" flag. Returns the
+    winning result and whether a hedge was fired.
+    """
+    HEDGE_REQUESTS.inc(provider=primary_key)
+    hedge_budget.deposit()
+
+    primary_task = asyncio.ensure_future(primary())
+    if not HEDGING_ENABLED or backup is None:
+        return await primary_task, False
+
+    tasks = [primary_task]
+    try:
+        done, _ = await asyncio.wait({primary_task}, timeout=hedge_delay(primary_key))
+        if done:
+            return primary_task.result(), False
+
+        if not hedge_budget.try_spend():
+            HEDGES_DENIED.inc(provider=primary_key)
+            return await primary_task, False
+
+        HEDGES_FIRED.inc(provider=primary_key)
+        backup_task = asyncio.ensure_future(backup())
+        tasks.append(backup_task)
+        pending = set(tasks)
+        result = None
+
+        # First successful answer wins; a failure is only returned if both fail
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                candidate = task.result()
+                if candidate["success"]:
+                    if task is backup_task:
+                        HEDGE_WINS.inc(provider=primary_key)
+                    return candidate, True
+                result = result or candidate
+
+        return result, True
+
+    finally:
+        # Cancel the loser (or everything, if our caller was cancelled)
+        for task in tasks:
+            if not task.done():
+                await _cancel(task)
+
+
+def get_hedge_stats() -> Dict:
+    """Hedge rate and backup win rate per primary provider, for /status."""
+    current = metrics.snapshot()
+    eligible = current.get("hedge_eligible_requests_total", {})
+    fired = current.get("hedges_fired_total", {})
+    wins = current.get("hedge_wins_total", {})
+    return {
+        "enabled": HEDGING_ENABLED,
+        "budget_ratio": HEDGE_BUDGET_RATIO,
+        "hedge_rate": {
+            labels: round(fired.get(labels, 0) / count, 3) for labels, count in eligible.items() if count
+        },
+        "win_rate": {
+            labels: round(wins.get(labels, 0) / count, 3) for labels, count in fired.items() if count
+        }
+    }
@@ -0,0 +1,278 @@
+"""
+OpenGenNet AI - Metrics
+In-process counters, gauges and histograms for latency and throughput tracking.
+Metrics are registered once at import time by the modules that record them and
+read back through snapshot() for the status endpoints, or render_prometheus()
+for GET /metrics.
+
+Recording stays off shared locks: counters and histograms write into a per-thread
+shard that only the owning thread mutates, and readers merge the shards. Shards of
+finished threads are folded into a retired total, so one-thread-per-request servers
+don't grow them. Values are per process - each gunicorn worker reports its own.
+"""
+
+import math
+import os
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Latency buckets in seconds, covering cache hits through slow reasoning models
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+# Prefix for exported metric names ("" for none)
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "opengennet")
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _label_key(labels: Dict[str, str]) -> Tuple:
+    return tuple(sorted(labels.items()))
+
+
+class _ThreadShards:
+    """Per-thread dicts of one metric's series, merged (with `merge`) on read."""
+
+    def __init__(self, merge: Callable[[Dict, Dict], None]):
+        self._merge = merge
+        self._local = threading.local()
+        self._shards = []
+        self._retired = {}
+        self._lock = threading.Lock()
+
+    def local(self) -> Dict:
+        """This thread's shard; the lock is only taken the first time a thread records."""
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._retire_finished()
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _retire_finished(self) -> None:
+        live = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                live.append((thread, shard))
+            else:
+                self._merge(self._retired, shard)
+        self._shards = live
+
+    def merged(self) -> Dict:
+        with self._lock:
+            self._retire_finished()
+            total = {}
+            self._merge(total, self._retired)
+            for _, shard in self._shards:
+                # dict.copy() runs under the GIL, so the owner can keep writing meanwhile
+                self._merge(total, shard.copy())
+        return total
+
+
+def _add_values(into: Dict, shard: Dict) -> None:
+    for key, value in shard.items():
+        into[key] = into.get(key, 0) + value
+
+
+def _add_series(into: Dict, shard: Dict) -> None:
+    for key, series in shard.items():
+        total = into.get(key)
+        if total is None:
+            into[key] = list(series)
+        else:
+            for index, value in enumerate(series):
+                total[index] += value
+
+
+class Counter:
+    """Monotonically increasing count, optionally split by labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._shards = _ThreadShards(_add_values)
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _label_key(labels)
+        values = self._shards.local()
+        values[key] = values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._shards.merged().get(_label_key(labels), 0)
+
+    def values(self) -> Dict[Tuple, float]:
+        return self._shards.merged()
+
+    def snapshot(self) -> Dict:
+        return {_format_labels(key): value for key, value in self.values().items()}
+
+    def exposition(self, name: str) -> List[str]:
+        return [f"{name}{_prometheus_labels(key)} {_number(value)}" for key, value in _sorted(self.values())]
+
+
+class Gauge(Counter):
+    """Value that can go up and down (queue depth, active sessions)."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels) -> None:
+        # A single dict store is atomic; only read-modify-write needs the lock
+        self._values[_label_key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def values(self) -> Dict[Tuple, float]:
+        return self._values.copy()
+
+
+class Histogram:
+    """Bucketed distribution of observations, with sum and count."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self._shards = _ThreadShards(_add_series)
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        series_by_key = self._shards.local()
+        series = series_by_key.get(key)
+        if series is None:
+            # One count per bucket plus +Inf, then sum and count
+            series = series_by_key[key] = [0] * (len(self.buckets) + 3)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def snapshot(self) -> Dict:
+        return {
+            _format_labels(key): {
+                "count": series[-1],
+                "sum": round(series[-2], 6),
+                "avg": round(series[-2] / series[-1], 6) if series[-1] else 0.0
+            }
+            for key, series in self._shards.merged().items()
+        }
+
+    def exposition(self, name: str) -> List[str]:
+        lines = []
+        for key, series in _sorted(self._shards.merged()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series):
+                cumulative += count
+                lines.append(f"{name}_bucket{_prometheus_labels(key, le=_number(float(bound)))} {cumulative}")
+            lines.append(f"{name}_sum{_prometheus_labels(key)} {_number(series[-2])}")
+            lines.append(f"{name}_count{_prometheus_labels(key)} {series[-1]}")
+        return lines
+
+
+def _format_labels(key: Tuple) -> str:
+    return ",".join(f"{name}={value}" for name, value in key) or "all"
+
+
+def _sorted(series: Dict) -> List:
+    return sorted(series.items(), key=lambda item: _format_labels(item[0]))
+
+
+def _prometheus_labels(key: Tuple, **extra) -> str:
+    pairs = list(key) + list(extra.items())
+    if not pairs:
+        return ""
+    escaped = (
+        str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _number(value: float) -> str:
+    if isinstance(value, int):
+        return str(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+# Global registry of every metric in the process
+_registry = {}
+_registry_lock = threading.Lock()
+_collectors = []
+
+
+def _register(metric_class, name: str, description: str, **kwargs):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = metric_class(name, description, **kwargs)
+        return metric
+
+
+def counter(name: str, description: str) -> Counter:
+    """Get or create a counter."""
+    return _register(Counter, name, description)
+
+
+def gauge(name: str, description: str) -> Gauge:
+    """Get or create a gauge."""
+    return _register(Gauge, name, description)
+
+
+def histogram(name: str, description: str, buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+    """Get or create a histogram."""
+    return _register(Histogram, name, description, buckets=buckets)
+
+
+def on_collect(callback: Callable[[], None]) -> None:
+    """Run `callback` before every snapshot/render - for gauges sampled at read time (queue sizes)."""
+    with _registry_lock:
+        _collectors.append(callback)
+
+
+def _collect() -> List:
+    with _registry_lock:
+        collectors = list(_collectors)
+        metrics = list(_registry.values())
+    for callback in collectors:
+        try:
+            callback()
+        except Exception as e:
+            print(f"⚠️ Metrics collector failed: {e}")
+    return metrics
+
+
+def snapshot() -> Dict[str, Dict]:
+    """All registered metrics keyed by name, for JSON status output."""
+    return {metric.name: metric.snapshot() for metric in _collect()}
+
+
+def render_prometheus() -> str:
+    """Every registered metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in sorted(_collect(), key=lambda metric: metric.name):
+        name = f"{METRICS_NAMESPACE}_{metric.name}" if METRICS_NAMESPACE else metric.name
+        description = metric.description.replace("\\", "\\\\").replace("\n", "\\n")
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        lines.extend(metric.exposition(name))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,167 @@
+"""
+OpenGenNet AI - Sampling Profiler
+On-demand wall-clock profile of a live worker for GET /debug/profile?seconds=N.
+Every thread's Python stack is sampled at a fixed rate through
+sys._current_frames() and aggregated into collapsed stacks ("thread;outer;...;inner count"),
+the input format of flamegraph.pl, speedscope and similar tools.
+
+Off unless PROFILER_ENABLED=true and PROFILER_TOKEN is set; requests must send
+"Authorization: Bearer <PROFILER_TOKEN>". Overhead is bounded by PROFILER_MAX_SECONDS,
+PROFILER_MAX_HZ and one profile per process at a time. Only the worker process that
+serves the request is profiled, and it needs spare threads (gthread, or the ASGI
+app) for the sample to see other requests.
+"""
+
+import hmac
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Mapping, Optional, Tuple
+
+# Profiler configuration - override through environment variables
+PROFILER_ENABLED = os.environ.get("PROFILER_ENABLED", "false").lower() == "true"
+PROFILER_TOKEN = os.environ.get("PROFILER_TOKEN", "")
+PROFILER_DEFAULT_SECONDS = float(os.environ.get("PROFILER_DEFAULT_SECONDS", 10))
+PROFILER_MAX_SECONDS = float(os.environ.get("PROFILER_MAX_SECONDS", 25))
+PROFILER_DEFAULT_HZ = float(os.environ.get("PROFILER_DEFAULT_HZ", 100))
+PROFILER_MAX_HZ = float(os.environ.get("PROFILER_MAX_HZ", 250))
+
+# Leaf frames of threads parked in the standard library (excluded unless idle=1)
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("socket.py", "accept"),
+    ("socket.py", "readinto"),
+    ("ssl.py", "read"),
+    ("ssl.py", "recv_into"),
+    ("thread.py", "_worker"),
+}
+
+_profile_lock = threading.Lock()
+
+if PROFILER_ENABLED and not PROFILER_TOKEN:
+    print("⚠️ PROFILER_ENABLED is set without PROFILER_TOKEN - /debug/profile will refuse every request")
+
+
+def _code_label(code) -> Tuple[str, str]:
+    filename = os.path.basename(code.co_filename)
+    return filename, f"{filename}:{code.co_name}".replace(";", ",").replace(" ", "_")
+
+
+def sample_stacks(seconds: float, hz: float = PROFILER_DEFAULT_HZ, include_idle: bool = False,
+                  line_numbers: bool = False) -> Dict:
+    """
+    Sample every other thread's stack `hz` times a second for `seconds`.
+
+    Returns:
+        {"stacks": Counter of collapsed stacks, "samples": sampling passes made,
+         "overhead": sampler CPU time / wall time}
+    """
+    own = threading.get_ident()
+    interval = 1.0 / hz
+    stacks = Counter()
+    code_labels = {}
+    samples = 0
+    cpu_start = time.thread_time()
+    start = next_sample = time.monotonic()
+    deadline = start + seconds
+
+    while True:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            labels = []
+            leaf = None
+            while frame is not None:
+                code = frame.f_code
+                cached = code_labels.get(code)
+                if cached is None:
+                    cached = code_labels[code] = _code_label(code)
+                if leaf is None:
+                    leaf = (cached[0], code.co_name)
+                labels.append(f"{cached[1]}:{frame.f_lineno}" if line_numbers else cached[1])
+                frame = frame.f_back
+            if not include_idle and leaf in IDLE_FRAMES:
+                continue
+            thread_name = names.get(ident, str(ident)).replace(";", ",").replace(" ", "_")
+            stacks[";".join([thread_name] + labels[::-1])] += 1
+        samples += 1
+
+        next_sample += interval
+        now = time.monotonic()
+        if next_sample >= deadline:
+            break
+        if next_sample > now:
+            time.sleep(next_sample - now)
+        else:
+            # Fell behind (large stacks, busy GIL) - skip missed ticks instead of bursting
+            next_sample = now
+
+    wall = time.monotonic() - start
+    return {
+        "stacks": stacks,
+        "samples": samples,
+        "overhead": (time.thread_time() - cpu_start) / wall if wall else 0.0
+    }
+
+
+def collapse(stacks: Counter) -> str:
+    """Collapsed-stack text, heaviest stacks first."""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def authorized(authorization: Optional[str]) -> bool:
+    if not PROFILER_TOKEN or not authorization:
+        return False
+    scheme, _, token = authorization.partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(token.strip().encode(), PROFILER_TOKEN.encode())
+
+
+def _error(status: int, message: str, error_type: str, headers: Optional[Dict] = None) -> Tuple[str, int, Dict]:
+    body = json.dumps({"error": {"message": message, "type": error_type}})
+    return body, status, dict({"Content-Type": "application/json"}, **(headers or {}))
+
+
+def handle_profile_request(args: Mapping, authorization: Optional[str]) -> Tuple[str, int, Dict]:
+    """
+    Serve /debug/profile; blocks for the profile duration (run it off the event loop).
+
+    Query args: seconds (default PROFILER_DEFAULT_SECONDS), hz (default PROFILER_DEFAULT_HZ),
+    idle=1 to keep parked threads, lines=1 to split frames by line number.
+    Returns (body, status, headers).
+    """
+    if not PROFILER_ENABLED:
+        return _error(404, "Endpoint not found", "not_found")
+    if not authorized(authorization):
+        return _error(401, "Valid profiler token required", "unauthorized", {"WWW-Authenticate": "Bearer"})
+
+    try:
+        seconds = float(args.get("seconds", PROFILER_DEFAULT_SECONDS))
+        hz = float(args.get("hz", PROFILER_DEFAULT_HZ))
+    except (TypeError, ValueError):
+        return _error(400, "seconds and hz must be numbers", "invalid_request")
+    if not 0 < seconds <= PROFILER_MAX_SECONDS:
+        return _error(400, f"seconds must be in (0, {PROFILER_MAX_SECONDS:g}]", "invalid_request")
+    if not 0 < hz <= PROFILER_MAX_HZ:
+        return _error(400, f"hz must be in (0, {PROFILER_MAX_HZ:g}]", "invalid_request")
+
+    if not _profile_lock.acquire(blocking=False):
+        return _error(409, "A profile is already running in this worker", "conflict")
+    try:
+        result = sample_stacks(seconds, hz, args.get("idle") == "1", args.get("lines") == "1")
+    finally:
+        _profile_lock.release()
+
+    return collapse(result["stacks"]), 200, {
+        "Content-Type": "text/plain; charset=utf-8",
+        "Cache-Control": "no-store",
+        "X-Profile-Pid": str(os.getpid()),
+        "X-Profile-Samples": str(result["samples"]),
+        "X-Profile-Overhead": f"{result['overhead']:.4f}"
+    }
@@ -0,0 +1,254 @@
+"""
+OpenGenNet AI - Provider Gateway
+Shared, pooled HTTP clients for the OpenAI-compatible provider APIs (Groq, OpenRouter).
+One keep-alive connection pool per host is reused by every request in the process,
+so DNS lookups and TCP/TLS handshakes are paid once instead of on every LLM call.
+"""
+
+import asyncio
+import concurrent.futures
+import os
+import random
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    REQUESTS_AVAILABLE = True
+except ImportError:
+    REQUESTS_AVAILABLE = False
+
+# Pool configuration - override through environment variables
+PROVIDER_POOL_LIMIT = int(os.environ.get("PROVIDER_POOL_LIMIT", 100))
+PROVIDER_POOL_LIMIT_PER_HOST = int(os.environ.get("PROVIDER_POOL_LIMIT_PER_HOST", 20))
+PROVIDER_KEEPALIVE_TIMEOUT = float(os.environ.get("PROVIDER_KEEPALIVE_TIMEOUT", 60))
+PROVIDER_DNS_CACHE_TTL = int(os.environ.get("PROVIDER_DNS_CACHE_TTL", 300))
+PROVIDER_TIMEOUT = float(os.environ.get("PROVIDER_TIMEOUT", 30))
+
+# Deadline-based fallback - one overall budget per request, shared by every attempt
+PROVIDER_DEADLINE = float(os.environ.get("PROVIDER_DEADLINE", 25))
+FALLBACK_RETRIES = int(os.environ.get("FALLBACK_RETRIES", 1))
+FALLBACK_BACKOFF = float(os.environ.get("FALLBACK_BACKOFF", 0.25))
+FALLBACK_MIN_ATTEMPT = float(os.environ.get("FALLBACK_MIN_ATTEMPT", 1.0))
+FALLBACK_PARALLEL_BELOW = float(os.environ.get("FALLBACK_PARALLEL_BELOW", 8))
+
+# Hosts we expect to talk to; sizes the sync adapter's pool cache
+PROVIDER_HOSTS = ("api.groq.com", "openrouter.ai")
+
+_async_sessions = weakref.WeakKeyDictionary()
+_sync_session = None
+_sync_lock = threading.Lock()
+
+
+def get_async_session() -> "aiohttp.ClientSession":
+    """
+    Get the pooled aiohttp session for the running event loop.
+
+    aiohttp sessions are bound to the loop that created them, so one session is
+    kept per loop and reused by every coroutine running on it.
+    """
+    if not AIOHTTP_AVAILABLE:
+        raise RuntimeError("aiohttp is required for async provider calls")
+
+    loop = asyncio.get_running_loop()
+    session = _async_sessions.get(loop)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=PROVIDER_POOL_LIMIT,
+            limit_per_host=PROVIDER_POOL_LIMIT_PER_HOST,
+            keepalive_timeout=PROVIDER_KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=PROVIDER_DNS_CACHE_TTL,
+            use_dns_cache=True
+        )
+        session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=PROVIDER_TIMEOUT)
+        )
+        _async_sessions[loop] = session
+    return session
+
+
+async def close_async_session() -> None:
+    """Close the running loop's pooled session (call before closing the loop)."""
+    loop = asyncio.get_running_loop()
+    session = _async_sessions.pop(loop, None)
+    if session is not None and not session.closed:
+        await session.close()
+
+
+def get_sync_session() -> "requests.Session":
+    """Get the process-wide pooled requests session used by the sync Flask apps."""
+    global _sync_session
+    if not REQUESTS_AVAILABLE:
+        raise RuntimeError("requests is required for sync provider calls")
+
+    if _sync_session is None:
+        with _sync_lock:
+            if _sync_session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=len(PROVIDER_HOSTS),
+                    pool_maxsize=PROVIDER_POOL_LIMIT_PER_HOST,
+                    pool_block=False
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _sync_session = session
+    return _sync_session
+
+
+def get_pool_config() -> dict:
+    """Pool settings, for status endpoints and benchmarks."""
+    return {
+        "limit": PROVIDER_POOL_LIMIT,
+        "limit_per_host": PROVIDER_POOL_LIMIT_PER_HOST,
+        "keepalive_timeout": PROVIDER_KEEPALIVE_TIMEOUT,
+        "dns_cache_ttl": PROVIDER_DNS_CACHE_TTL,
+        "timeout": PROVIDER_TIMEOUT
+    }
+
+
+class Deadline:
+    """Overall time budget for one request."""
+
+    def __init__(self, seconds: float = PROVIDER_DEADLINE):
+        self.seconds = seconds
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, cap: float = PROVIDER_TIMEOUT) -> float:
+        """Timeout for the next call: what is left of the budget, at most `cap`."""
+        return min(cap, self.remaining())
+
+
+class ProviderAttemptError(Exception):
+    """A provider call failed; `retryable` marks transient failures worth retrying on the same provider."""
+
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def post_chat_completion(url: str, headers: Dict, payload: Dict, timeout: float) -> Dict:
+    """
+    POST a chat completion on the pooled sync session and return the decoded JSON.
+
+    Raises ProviderAttemptError: connection errors, 429 and 5xx are retryable; timeouts
+    are not (the provider already used its share of the deadline).
+    """
+    try:
+        response = get_sync_session().post(url, headers=headers, json=payload, timeout=timeout)
+    except requests.exceptions.Timeout:
+        raise ProviderAttemptError(f"Timed out after {timeout:.1f}s")
+    except requests.exceptions.RequestException as e:
+        raise ProviderAttemptError(f"Request failed: {e}", retryable=True)
+
+    if response.status_code != 200:
+        retryable = response.status_code == 429 or response.status_code >= 500
+        raise ProviderAttemptError(f"HTTP {response.status_code}: {response.text[:200]}", retryable=retryable)
+    return response.json()
+
+
+_fallback_executor = concurrent.futures.ThreadPoolExecutor(max_workers=8, thread_name_prefix="fallback")
+
+
+def _attempt(name: str, fn: Callable[[float], Any], deadline: Deadline, log: List[Dict], parallel: bool = False) -> Any:
+    """One provider, retried with jittered backoff while the error is transient and budget remains."""
+    for attempt in range(FALLBACK_RETRIES + 1):
+        start = time.monotonic()
+        entry = {"provider": name, "attempt": attempt + 1, "parallel": parallel, "status": "in_flight"}
+        log.append(entry)
+        try:
+            result = fn(deadline.timeout())
+            entry.update(status="success", duration_ms=round((time.monotonic() - start) * 1000, 1))
+            return result
+        except Exception as e:
+            entry.update(status="error", error=str(e)[:200], duration_ms=round((time.monotonic() - start) * 1000, 1))
+            if not getattr(e, "retryable", False) or attempt == FALLBACK_RETRIES:
+                raise
+
+        backoff = random.uniform(0, FALLBACK_BACKOFF * 2 ** attempt)
+        if deadline.remaining() - backoff < FALLBACK_MIN_ATTEMPT:
+            raise ProviderAttemptError("Deadline too close to retry")
+        time.sleep(backoff)
+
+
+def call_with_fallback(attempts: List[Tuple[str, Callable[[float], Any]]],
+                       deadline: Optional[Deadline] = None) -> Tuple[Optional[Any], Optional[str], List[Dict]]:
+    """
+    Try providers in order within one overall deadline.
+
+    Args:
+        attempts: ordered (name, fn) pairs; fn(timeout) returns a result or raises
+        deadline: request budget (a fresh PROVIDER_DEADLINE one by default)
+
+    Returns:
+        (result of the first successful attempt or None, name of the provider that
+        produced it or None, log of every attempt made).
+        Once less than FALLBACK_PARALLEL_BELOW seconds remain, the remaining fallbacks
+        are raced in parallel instead of run one after another.
+    """
+    deadline = deadline or Deadline()
+    log = []
+
+    for index, (name, fn) in enumerate(attempts):
+        remaining = attempts[index:]
+        if deadline.remaining() < FALLBACK_MIN_ATTEMPT:
+            log.extend({"provider": skipped, "status": "skipped", "error": "deadline exceeded"} for skipped, _ in remaining)
+            break
+
+        if len(remaining) > 1 and deadline.remaining() < FALLBACK_PARALLEL_BELOW:
+            return _race(remaining, deadline, log) + (log,)
+
+        try:
+            return _attempt(name, fn, deadline, log), name, log
+        except Exception:
+            continue
+
+    return None, None, log
+
+
+def _race(attempts: List[Tuple[str, Callable[[float], Any]]], deadline: Deadline,
+          log: List[Dict]) -> Tuple[Optional[Any], Optional[str]]:
+    """
+    First success (and its provider) among attempts run concurrently; the losers are
+    left to hit their timeouts. A loser finishing before the snapshot is also logged
+    as a success, so callers must use the returned name, not the log.
+    """
+    logs = [[] for _ in attempts]
+    names = {
+        _fallback_executor.submit(_attempt, name, fn, deadline, attempt_log, True): name
+        for (name, fn), attempt_log in zip(attempts, logs)
+    }
+    futures = set(names)
+    result = winner = None
+    try:
+        while futures and winner is None:
+            done, futures = concurrent.futures.wait(
+                futures, timeout=deadline.remaining(), return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    result, winner = future.result(), names[future]
+                    break
+    finally:
+        # Snapshot: attempts still running are reported as in flight
+        log.extend(dict(entry) for attempt_log in logs for entry in list(attempt_log))
+    return result, winner
@@ -0,0 +1,148 @@
+"""
+OpenGenNet AI - Adaptive Provider Router
+Tracks live health per provider (EWMA latency, time-to-first-byte and error rate)
+with a circuit breaker that opens on failure streaks and probes with a single
+half-open request. Routing picks, among the providers able to serve a query class,
+the most preferred one whose expected latency meets the class target.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+# Router configuration - override through environment variables
+ROUTER_EWMA_ALPHA = float(os.environ.get("ROUTER_EWMA_ALPHA", 0.2))
+ROUTER_FAILURE_THRESHOLD = int(os.environ.get("ROUTER_FAILURE_THRESHOLD", 5))
+ROUTER_OPEN_SECONDS = float(os.environ.get("ROUTER_OPEN_SECONDS", 30))
+ROUTER_ERROR_PENALTY = float(os.environ.get("ROUTER_ERROR_PENALTY", 2.0))
+
+# Circuit breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ProviderHealth:
+    """Live health score for one provider."""
+
+    def __init__(self, provider_key: str, expected_latency: float):
+        self.provider_key = provider_key
+        self.ewma_latency = expected_latency
+        self.ewma_ttfb = None
+        self.error_rate = 0.0
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.probe_started_at = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.last_error = None
+
+    def expected_latency(self) -> float:
+        """EWMA latency inflated by the chance of having to retry elsewhere."""
+        return self.ewma_latency * (1 + ROUTER_ERROR_PENALTY * self.error_rate)
+
+    def to_dict(self) -> Dict:
+        return {
+            "status": self.state,
+            "ewma_latency": round(self.ewma_latency, 3),
+            "ewma_ttfb": round(self.ewma_ttfb, 3) if self.ewma_ttfb is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "expected_latency": round(self.expected_latency(), 3),
+            "consecutive_failures": self.consecutive_failures,
+            "requests": self.requests,
+            "errors": self.errors,
+            "last_error": self.last_error
+        }
+
+
+class ProviderRouter:
+    """Health-scored routing with a per-provider circuit breaker."""
+
+    def __init__(self, expected_latencies: Dict[str, float]):
+        self._health = {
+            key: ProviderHealth(key, latency) for key, latency in expected_latencies.items()
+        }
+        self._lock = threading.Lock()
+
+    def _ewma(self, current: Optional[float], sample: float) -> float:
+        if current is None:
+            return sample
+        return ROUTER_EWMA_ALPHA * sample + (1 - ROUTER_EWMA_ALPHA) * current
+
+    def record_success(self, provider_key: str, latency: float, ttfb: Optional[float] = None) -> None:
+        with self._lock:
+            health = self._health[provider_key]
+            health.requests += 1
+            health.ewma_latency = self._ewma(health.ewma_latency, latency)
+            if ttfb is not None:
+                health.ewma_ttfb = self._ewma(health.ewma_ttfb, ttfb)
+            health.error_rate = self._ewma(health.error_rate, 0.0)
+            health.consecutive_failures = 0
+            health.state = CLOSED
+            health.probe_in_flight = False
+
+    def record_failure(self, provider_key: str, error: str = None) -> None:
+        with self._lock:
+            health = self._health[provider_key]
+            health.requests += 1
+            health.errors += 1
+            health.last_error = (error or "")[:200]
+            health.error_rate = self._ewma(health.error_rate, 1.0)
+            health.consecutive_failures += 1
+            health.probe_in_flight = False
+
+            # A failed probe re-opens immediately; otherwise open on a failure streak
+            if health.state == HALF_OPEN or health.consecutive_failures >= ROUTER_FAILURE_THRESHOLD:
+                if health.state != OPEN:
+                    print(f"🔌 Circuit opened for {provider_key} after {health.consecutive_failures} failures")
+                health.state = OPEN
+                health.opened_at = time.time()
+
+    def _admit(self, health: ProviderHealth, claim_probe: bool) -> bool:
+        """Whether a request may go to this provider (moves open -> half-open after cooldown)."""
+        if health.state == CLOSED:
+            return True
+        if health.state == OPEN and time.time() - health.opened_at >= ROUTER_OPEN_SECONDS:
+            health.state = HALF_OPEN
+        if health.state == HALF_OPEN:
+            # A probe that never reported back (e.g. served from cache) expires
+            probe_expired = time.time() - health.probe_started_at >= ROUTER_OPEN_SECONDS
+            if not health.probe_in_flight or probe_expired:
+                if claim_probe:
+                    health.probe_in_flight = True
+                    health.probe_started_at = time.time()
+                return True
+        return False
+
+    def is_available(self, provider_key: str) -> bool:
+        """True only for closed circuits (used for optional traffic such as hedges)."""
+        with self._lock:
+            return self._health[provider_key].state == CLOSED
+
+    def select(self, candidates: List[str], latency_target: float) -> str:
+        """
+        Pick the first candidate (in preference order) whose circuit admits traffic and
+        whose expected latency meets `latency_target`; otherwise the fastest admitted
+        candidate. If every circuit is open, fall back to the most preferred provider.
+        """
+        with self._lock:
+            admitted = [key for key in candidates if self._admit(self._health[key], claim_probe=False)]
+            if not admitted:
+                return candidates[0]
+
+            within_target = [key for key in admitted if self._health[key].expected_latency() <= latency_target]
+            chosen = within_target[0] if within_target else min(
+                admitted, key=lambda key: self._health[key].expected_latency()
+            )
+            self._admit(self._health[chosen], claim_probe=True)
+            return chosen
+
+    def scores(self) -> Dict[str, Dict]:
+        """Live health per provider, for /status."""
+        with self._lock:
+            for health in self._health.values():
+                self._admit(health, claim_probe=False)
+            return {key: health.to_dict() for key, health in self._health.items()}
@@ -0,0 +1,237 @@
+"""
+OpenGenNet AI - Provider Rate Limiting
+Per-provider token buckets for requests and tokens per minute, a bounded concurrency
+pool (bulkhead) so one slow provider cannot tie up every request, and a short
+priority queue for callers waiting on either. An upstream 429 pauses the provider
+for its Retry-After instead of letting the next burst hit the same wall.
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+import metrics
+
+# Limiter configuration - override through environment variables
+RATE_LIMIT_QUEUE_DEPTH = int(os.environ.get("RATE_LIMIT_QUEUE_DEPTH", 32))
+RATE_LIMIT_MAX_WAIT = float(os.environ.get("RATE_LIMIT_MAX_WAIT", 10))
+RATE_LIMIT_DEFAULT_RETRY_AFTER = float(os.environ.get("RATE_LIMIT_DEFAULT_RETRY_AFTER", 2))
+
+# Queue priorities - lower runs first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_HEDGE = 1
+PRIORITY_BATCH = 2
+PRIORITY_BACKGROUND = 3
+
+QUEUE_DEPTH = metrics.gauge("rate_limit_queue_depth", "Requests waiting for a provider slot")
+QUEUE_WAIT = metrics.histogram("rate_limit_wait_seconds", "Time spent waiting for a provider slot")
+IN_FLIGHT = metrics.gauge("provider_in_flight", "Requests currently holding a provider slot")
+REJECTIONS = metrics.counter("rate_limit_rejections_total", "Requests turned away by the provider limiter")
+UPSTREAM_429 = metrics.counter("provider_429_total", "429 responses received from providers")
+
+
+class RateLimitExceeded(Exception):
+    """The provider cannot take this request within the caller's wait budget."""
+
+    def __init__(self, provider_key: str, reason: str, retry_after: float):
+        super().__init__(f"{provider_key} rate limited ({reason}), retry in {retry_after:.1f}s")
+        self.provider_key = provider_key
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> float:
+    """Seconds from a Retry-After header (delta-seconds or HTTP-date)."""
+    if not value:
+        return RATE_LIMIT_DEFAULT_RETRY_AFTER
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return RATE_LIMIT_DEFAULT_RETRY_AFTER
+
+
+class TokenBucket:
+    """Refills `per_minute` units per minute up to a full minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self._tokens = per_minute
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """Seconds until `amount` units are available (0 if they are now)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self._tokens >= amount:
+            return 0.0
+        return (amount - self._tokens) / self.rate
+
+    def take(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self._tokens -= amount
+
+    def available(self) -> float:
+        self._refill(time.monotonic())
+        return self._tokens
+
+
+class ProviderLimiter:
+    """
+    Admission for one provider: rpm/tpm buckets, a concurrency cap and a priority
+    queue. Waiters must share one event loop, like the rest of the async stack.
+    """
+
+    def __init__(self, provider_key: str, rpm: float, tpm: float, concurrency: int):
+        self.provider_key = provider_key
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.concurrency = concurrency
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    def _delay(self, tokens: float, now: float) -> Optional[float]:
+        """Seconds until a request of `tokens` may start, or None if it waits on a free slot."""
+        if self.in_flight >= self.concurrency:
+            return None
+        return max(
+            self.paused_until - now,
+            self.requests.delay(1, now),
+            self.tokens.delay(tokens, now)
+        )
+
+    def _wake_head(self) -> None:
+        if self._waiters:
+            waiter = self._waiters[0][2]
+            if waiter is not None and not waiter.done():
+                waiter.get_loop().call_soon_threadsafe(lambda: waiter.done() or waiter.set_result(None))
+
+    async def acquire(self, tokens: float, priority: int = PRIORITY_INTERACTIVE,
+                      max_wait: float = RATE_LIMIT_MAX_WAIT) -> None:
+        """
+        Wait for a slot and budget for a request of `tokens` estimated tokens.
+
+        Raises RateLimitExceeded when the queue is full or the wait would exceed `max_wait`.
+        """
+        loop = asyncio.get_running_loop()
+        start = time.monotonic()
+        deadline = start + max_wait
+        entry = [priority, next(self._sequence), None]
+        acquired = False
+
+        with self._lock:
+            if len(self._waiters) >= RATE_LIMIT_QUEUE_DEPTH:
+                REJECTIONS.inc(provider=self.provider_key, reason="queue_full")
+                raise RateLimitExceeded(self.provider_key, "queue full", self._delay(tokens, start) or 1.0)
+            heapq.heappush(self._waiters, entry)
+            QUEUE_DEPTH.set(len(self._waiters), provider=self.provider_key)
+
+        try:
+            while True:
+                with self._lock:
+                    now = time.monotonic()
+                    delay = self._delay(tokens, now)
+                    at_head = self._waiters[0] is entry
+                    if at_head and delay == 0:
+                        heapq.heappop(self._waiters)
+                        self.requests.take(1, now)
+                        self.tokens.take(tokens, now)
+                        self.in_flight += 1
+                        acquired = True
+                        self._wake_head()
+                        return
+
+                    # Give up as soon as the known wait exceeds what the caller can afford
+                    if now >= deadline or (delay is not None and now + delay > deadline):
+                        REJECTIONS.inc(provider=self.provider_key, reason="wait_budget")
+                        raise RateLimitExceeded(self.provider_key, "over wait budget", delay or 1.0)
+
+                    # Sleep until woken (slot freed / became head) or the bucket refills
+                    entry[2] = waiter = loop.create_future()
+                    timeout = deadline - now
+                    if at_head and delay:
+                        timeout = min(timeout, delay)
+
+                try:
+                    await asyncio.wait_for(waiter, timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+        finally:
+            with self._lock:
+                if not acquired:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                    self._wake_head()
+                QUEUE_DEPTH.set(len(self._waiters), provider=self.provider_key)
+            QUEUE_WAIT.observe(time.monotonic() - start, provider=self.provider_key)
+            if acquired:
+                IN_FLIGHT.inc(provider=self.provider_key)
+
+    def release(self, estimated_tokens: float = 0, used_tokens: Optional[float] = None) -> None:
+        """
+        Free the slot; reconcile the token estimate with actual usage when known.
+        used_tokens=0 refunds the whole reservation (no completion came back).
+        """
+        with self._lock:
+            self.in_flight -= 1
+            if used_tokens is not None:
+                self.tokens.take(used_tokens - estimated_tokens, time.monotonic())
+            self._wake_head()
+        IN_FLIGHT.dec(provider=self.provider_key)
+
+    def penalize(self, retry_after: float) -> None:
+        """Upstream said 429 - hold every new request until Retry-After has passed."""
+        UPSTREAM_429.inc(provider=self.provider_key)
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+            self._wake_head()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "concurrency": self.concurrency,
+                "queue_depth": len(self._waiters),
+                "requests_available": round(self.requests.available(), 1),
+                "tokens_available": round(self.tokens.available()),
+                "paused_for": round(max(0.0, self.paused_until - time.monotonic()), 1)
+            }
+
+
+class RateLimiterRegistry:
+    """One ProviderLimiter per provider key."""
+
+    def __init__(self, limits: Dict[str, Dict]):
+        self._limiters = {
+            key: ProviderLimiter(key, limit["rpm"], limit["tpm"], limit["concurrency"])
+            for key, limit in limits.items()
+        }
+
+    def get(self, provider_key: str) -> ProviderLimiter:
+        return self._limiters[provider_key]
+
+    def stats(self) -> Dict[str, Dict]:
+        """Live limiter state per provider, for /status."""
+        return {key: limiter.stats() for key, limiter in self._limiters.items()}
+
+
+def estimate_tokens(messages, max_tokens: int) -> int:
+    """Prompt (about 4 characters per token) plus the completion allowance."""
+    return sum(len(message.get("content", "")) for message in messages) // 4 + max_tokens
@@ -0,0 +1,249 @@
+"""
+OpenGenNet AI - Shared LLM Response Cache
+Disk-backed cache of provider completions, shared by every gunicorn worker on a host
+through a single SQLite file, with TTL, stale-while-revalidate and size-bounded eviction.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import metrics
+
+# Cache configuration - override through environment variables
+RESPONSE_CACHE_ENABLED = os.environ.get("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_PATH = os.environ.get(
+    "RESPONSE_CACHE_PATH",
+    os.path.join(tempfile.gettempdir(), "opengennet_response_cache.sqlite3")
+)
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", 300))
+RESPONSE_CACHE_STALE_WHILE_REVALIDATE = float(os.environ.get("RESPONSE_CACHE_STALE_WHILE_REVALIDATE", 600))
+RESPONSE_CACHE_STALE_IF_ERROR = float(os.environ.get("RESPONSE_CACHE_STALE_IF_ERROR", 3600))
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+# Hits refresh an entry's LRU timestamp at most this often, so most hits stay read-only
+RESPONSE_CACHE_TOUCH_INTERVAL = float(os.environ.get("RESPONSE_CACHE_TOUCH_INTERVAL", 60))
+
+CACHE_EVENTS = metrics.counter(
+    "response_cache_events_total", "Response cache lookups (hits, stale_hits, misses), stores and evictions"
+)
+
+# Entry states returned by ResponseCache.get
+FRESH = "fresh"
+STALE = "stale"
+EXPIRED = "expired"
+
+
+def make_cache_key(base_url: str, payload: Dict) -> str:
+    """Canonical hash of a provider request (endpoint + model + messages + parameters)."""
+    canonical = json.dumps(
+        {"base_url": base_url, "payload": payload},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    SQLite (WAL) response cache shared across processes.
+
+    Entries are fresh for `ttl` seconds, then served as stale (with a background
+    refresh) for `stale_while_revalidate` seconds. Up to `stale_if_error` seconds
+    after creation they are still returned as expired entries, which callers only
+    use when the provider itself is failing. Least recently used entries are evicted
+    once the stored payload exceeds `max_bytes`. LRU order is kept to within
+    `touch_interval` seconds, so a hit only takes the write lock when its entry's
+    access time is older than that.
+    """
+
+    EVICTION_CHECK_INTERVAL = 32  # writes between size checks
+
+    def __init__(self, path: str = RESPONSE_CACHE_PATH, ttl: float = RESPONSE_CACHE_TTL,
+                 stale_while_revalidate: float = RESPONSE_CACHE_STALE_WHILE_REVALIDATE,
+                 stale_if_error: float = RESPONSE_CACHE_STALE_IF_ERROR,
+                 max_bytes: int = RESPONSE_CACHE_MAX_BYTES,
+                 touch_interval: float = RESPONSE_CACHE_TOUCH_INTERVAL):
+        self.path = path
+        self.ttl = ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self.stale_if_error = max(stale_if_error, ttl + stale_while_revalidate)
+        self.max_bytes = max_bytes
+        self.touch_interval = touch_interval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._writes_since_eviction = 0
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+        # Create the schema eagerly so configuration errors surface at startup
+        self._connection()
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread; SQLite handles cross-process locking."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_response_cache_accessed ON response_cache (accessed_at)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def _count(self, stat: str, amount: int = 1) -> None:
+        with self._lock:
+            self.stats[stat] += amount
+        CACHE_EVENTS.inc(amount, event=stat)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return {"value", "age", "state"} for a cached entry, or None."""
+        now = time.time()
+        try:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value, created_at, accessed_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._count("misses")
+                return None
+
+            age = now - row[1]
+            if age > self.stale_if_error:
+                self._count("misses")
+                return None
+
+            if now - row[2] > self.touch_interval:
+                conn.execute(
+                    "UPDATE response_cache SET accessed_at = ? WHERE key = ? AND accessed_at < ?",
+                    (now, key, now - self.touch_interval)
+                )
+        except sqlite3.Error as e:
+            print(f"⚠️ Response cache read failed: {e}")
+            return None
+
+        if age <= self.ttl:
+            state = FRESH
+            self._count("hits")
+        elif age <= self.ttl + self.stale_while_revalidate:
+            state = STALE
+            self._count("stale_hits")
+        else:
+            state = EXPIRED
+            self._count("misses")
+
+        return {"value": json.loads(row[0]), "age": age, "state": state}
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a successful provider result."""
+        now = time.time()
+        encoded = json.dumps(value, ensure_ascii=False)
+        try:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, size, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, encoded, len(encoded), now, now)
+            )
+        except sqlite3.Error as e:
+            print(f"⚠️ Response cache write failed: {e}")
+            return
+
+        self._count("stores")
+        with self._lock:
+            self._writes_since_eviction += 1
+            check_size = self._writes_since_eviction >= self.EVICTION_CHECK_INTERVAL
+            if check_size:
+                self._writes_since_eviction = 0
+        if check_size:
+            self.evict()
+
+    def evict(self) -> int:
+        """Drop entries past every serving window, then LRU entries until under max_bytes."""
+        removed = 0
+        try:
+            conn = self._connection()
+            cursor = conn.execute(
+                "DELETE FROM response_cache WHERE created_at < ?",
+                (time.time() - self.stale_if_error,)
+            )
+            removed += cursor.rowcount
+
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM response_cache").fetchone()[0]
+            if total > self.max_bytes:
+                # Free down to 90% of the budget so we don't evict on every write
+                target = total - int(self.max_bytes * 0.9)
+                freed = 0
+                victims = []
+                for key, size in conn.execute(
+                    "SELECT key, size FROM response_cache ORDER BY accessed_at ASC"
+                ):
+                    victims.append((key,))
+                    freed += size
+                    if freed >= target:
+                        break
+                conn.executemany("DELETE FROM response_cache WHERE key = ?", victims)
+                removed += len(victims)
+        except sqlite3.Error as e:
+            print(f"⚠️ Response cache eviction failed: {e}")
+
+        if removed:
+            self._count("evictions", removed)
+        return removed
+
+    def claim_refresh(self, key: str) -> bool:
+        """Mark a key as being revalidated by this process; False if already in progress."""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def release_refresh(self, key: str) -> None:
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this process plus the shared entry count."""
+        with self._lock:
+            stats = dict(self.stats)
+        try:
+            row = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM response_cache"
+            ).fetchone()
+            stats.update({"entries": row[0], "bytes": row[1]})
+        except sqlite3.Error:
+            pass
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["stale_hits"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+
+# Global cache instance
+_response_cache = None
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Get or create the process-wide cache, or None when caching is disabled."""
+    global _response_cache
+    if _response_cache is None and RESPONSE_CACHE_ENABLED:
+        try:
+            _response_cache = ResponseCache()
+        except sqlite3.Error as e:
+            print(f"⚠️ Response cache unavailable: {e}")
+            return None
+    return _response_cache
@@ -0,0 +1,457 @@
+"""
+OpenGenNet AI - Session Store
+Bounded storage for chat sessions: a cap on the number of sessions (least recently
+used evicted first), a ring buffer per session for history, an idle TTL enforced by
+a background sweeper, and approximate byte accounting with a memory budget.
+
+Two backends share one interface: SessionStore keeps sessions in process memory,
+SQLiteSessionStore keeps them in a local SQLite (WAL) file shared by every worker
+on the host, so follow-ups can land on any worker and survive restarts.
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Dict, Optional, Tuple
+
+import metrics
+
+# Session store configuration - override through environment variables
+SESSION_MAX_SESSIONS = int(os.environ.get("SESSION_MAX_SESSIONS", 10000))
+SESSION_MAX_MESSAGES = int(os.environ.get("SESSION_MAX_MESSAGES", 40))
+SESSION_MAX_BYTES = int(os.environ.get("SESSION_MAX_BYTES", 128 * 1024 * 1024))
+SESSION_IDLE_TTL = float(os.environ.get("SESSION_IDLE_TTL", 3600))
+SESSION_SWEEP_INTERVAL = float(os.environ.get("SESSION_SWEEP_INTERVAL", 60))
+SESSION_BACKEND = os.environ.get("SESSION_BACKEND", "memory").lower()
+SESSION_DB_PATH = os.environ.get(
+    "SESSION_DB_PATH",
+    os.path.join(tempfile.gettempdir(), "opengennet_sessions.sqlite3")
+)
+
+# Rough per-message and per-session overhead of the Python objects around the text
+MESSAGE_OVERHEAD_BYTES = 200
+SESSION_OVERHEAD_BYTES = 1024
+
+SESSIONS_ACTIVE = metrics.gauge("sessions_active", "Chat sessions held in memory")
+SESSION_BYTES = metrics.gauge("session_store_bytes", "Approximate memory held by chat sessions")
+SESSION_EVICTIONS = metrics.counter("session_evictions_total", "Sessions dropped, by reason")
+SESSION_TRIMMED = metrics.counter("session_messages_trimmed_total", "Old messages dropped by per-session ring buffers")
+
+
+def message_size(message: Dict) -> int:
+    """Approximate in-memory size of one history message."""
+    return len(message["content"].encode("utf-8")) + len(message["role"]) + MESSAGE_OVERHEAD_BYTES
+
+
+def new_session_id() -> str:
+    return f"session_{int(time.time())}_{uuid.uuid4().hex[:8]}"
+
+
+class ChatSession:
+    """One conversation: a ring buffer of the most recent messages."""
+
+    def __init__(self, session_id: str, max_messages: int = SESSION_MAX_MESSAGES):
+        self.session_id = session_id
+        self.created_at = time.time()
+        self.last_activity = self.created_at
+        self.messages = deque(maxlen=max_messages)
+        self.size_bytes = SESSION_OVERHEAD_BYTES
+        self.unsaved = []
+
+    def append(self, role: str, content: str) -> int:
+        """Add a message, dropping the oldest when full; returns the change in size."""
+        message = {"role": role, "content": content}
+        delta = message_size(message)
+        if len(self.messages) == self.messages.maxlen:
+            delta -= message_size(self.messages[0])
+            SESSION_TRIMMED.inc()
+        self.messages.append(message)
+        self.size_bytes += delta
+        self.last_activity = time.time()
+        return delta
+
+
+class SessionBackend:
+    """
+    Interface shared by the session backends.
+
+    A chat turn calls get_or_create() once, append() for each message and save()
+    once at the end, so backends can batch a turn's writes into one transaction.
+    """
+
+    def get_or_create(self, session_id: Optional[str] = None) -> ChatSession:
+        raise NotImplementedError
+
+    def append(self, session: ChatSession, role: str, content: str) -> None:
+        raise NotImplementedError
+
+    def save(self, session: ChatSession) -> None:
+        """Persist messages appended since the last save (no-op for in-memory storage)."""
+
+    def sweep(self) -> int:
+        raise NotImplementedError
+
+    def stats(self) -> Dict:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class SessionStore(SessionBackend):
+    """In-memory backend: LRU-ordered sessions bounded by count, idle time and total bytes."""
+
+    def __init__(self, max_sessions: int = SESSION_MAX_SESSIONS, max_bytes: int = SESSION_MAX_BYTES,
+                 idle_ttl: float = SESSION_IDLE_TTL):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self._sessions = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._sweeper = None
+        self._sweeper_pid = None
+        self._stop = threading.Event()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get_or_create(self, session_id: Optional[str] = None) -> ChatSession:
+        """Existing live session for `session_id`, or a new one (stored)."""
+        self._ensure_sweeper()
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(session_id) if session_id else None
+            if session is not None and now - session.last_activity <= self.idle_ttl:
+                session.last_activity = now
+                self._sessions.move_to_end(session_id)
+                return session
+            if session is not None:
+                self._remove(session_id, "ttl")
+
+            session = ChatSession(session_id or new_session_id())
+            self._sessions[session.session_id] = session
+            self._bytes += session.size_bytes
+            self._enforce_limits()
+            self._publish()
+            return session
+
+    def append(self, session: ChatSession, role: str, content: str) -> None:
+        """Record a message, keeping byte accounting and the memory budget in step."""
+        with self._lock:
+            delta = session.append(role, content)
+            if self._sessions.get(session.session_id) is session:
+                self._bytes += delta
+                self._sessions.move_to_end(session.session_id)
+                self._enforce_limits(keep=session.session_id)
+            self._publish()
+
+    def sweep(self) -> int:
+        """Drop sessions idle for longer than the TTL; returns how many were removed."""
+        cutoff = time.time() - self.idle_ttl
+        with self._lock:
+            # LRU order: idle sessions are at the front
+            expired = []
+            for session_id, session in self._sessions.items():
+                if session.last_activity > cutoff:
+                    break
+                expired.append(session_id)
+            for session_id in expired:
+                self._remove(session_id, "ttl")
+            self._publish()
+        return len(expired)
+
+    def _remove(self, session_id: str, reason: str) -> None:
+        session = self._sessions.pop(session_id)
+        self._bytes -= session.size_bytes
+        SESSION_EVICTIONS.inc(reason=reason)
+
+    def _enforce_limits(self, keep: Optional[str] = None) -> None:
+        """Evict least recently used sessions while over the count or byte budget."""
+        while len(self._sessions) > self.max_sessions:
+            self._remove(next(iter(self._sessions)), "capacity")
+        while self._bytes > self.max_bytes and len(self._sessions) > 1:
+            oldest = next(iter(self._sessions))
+            if oldest == keep:
+                break
+            self._remove(oldest, "memory")
+
+    def _publish(self) -> None:
+        SESSIONS_ACTIVE.set(len(self._sessions))
+        SESSION_BYTES.set(self._bytes)
+
+    def _ensure_sweeper(self) -> None:
+        """Start the idle sweeper thread (again after a fork)."""
+        if self._sweeper_pid == os.getpid() and self._sweeper.is_alive():
+            return
+        with self._lock:
+            if self._sweeper_pid == os.getpid() and self._sweeper.is_alive():
+                return
+            self._sweeper = threading.Thread(target=self._sweep_forever, name="session-sweeper", daemon=True)
+            self._sweeper_pid = os.getpid()
+            self._sweeper.start()
+
+    def _sweep_forever(self) -> None:
+        while not self._stop.wait(SESSION_SWEEP_INTERVAL):
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"⚠️ Session sweep failed: {e}")
+
+    def stats(self) -> Dict:
+        """Session counts, memory use and eviction totals, for /status."""
+        with self._lock:
+            return {
+                "backend": "memory",
+                "active_sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "max_messages_per_session": SESSION_MAX_MESSAGES,
+                "idle_ttl": self.idle_ttl,
+                "evictions": SESSION_EVICTIONS.snapshot(),
+                "messages_trimmed": SESSION_TRIMMED.value()
+            }
+
+
+class SQLiteSessionStore(SessionBackend):
+    """
+    SQLite (WAL) backend shared across processes.
+
+    Loading a session is one indexed read; the messages of a turn are written in a
+    single transaction on save(), which also trims the ring buffer. Idle, excess and
+    over-budget sessions are removed by the sweeper.
+    """
+
+    def __init__(self, path: str = SESSION_DB_PATH, max_sessions: int = SESSION_MAX_SESSIONS,
+                 max_bytes: int = SESSION_MAX_BYTES, idle_ttl: float = SESSION_IDLE_TTL,
+                 max_messages: int = SESSION_MAX_MESSAGES):
+        self.path = path
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.max_messages = max_messages
+        self._local = threading.local()
+        self._sweeper = None
+        self._sweeper_pid = None
+        self._sweeper_lock = threading.Lock()
+        self._stop = threading.Event()
+
+        # Create the schema eagerly so configuration errors surface at startup
+        self._connection()
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread; SQLite handles cross-process locking."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " session_id TEXT PRIMARY KEY,"
+                " created_at REAL NOT NULL,"
+                " last_activity REAL NOT NULL,"
+                " size_bytes INTEGER NOT NULL);"
+                "CREATE INDEX IF NOT EXISTS idx_sessions_activity ON sessions (last_activity);"
+                "CREATE TABLE IF NOT EXISTS session_messages ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " session_id TEXT NOT NULL,"
+                " role TEXT NOT NULL,"
+                " content TEXT NOT NULL,"
+                " size INTEGER NOT NULL);"
+                "CREATE INDEX IF NOT EXISTS idx_session_messages ON session_messages (session_id, id);"
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def get_or_create(self, session_id: Optional[str] = None) -> ChatSession:
+        self._ensure_sweeper()
+        session = ChatSession(session_id or new_session_id(), self.max_messages)
+        if not session_id:
+            return session
+
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT created_at, last_activity FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return session
+        if time.time() - row[1] > self.idle_ttl:
+            # The id comes back after expiry - start clean instead of on top of the old rows
+            self._expire(conn, session_id, row[1])
+            return session
+
+        rows = conn.execute(
+            "SELECT role, content FROM session_messages WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+            (session_id, self.max_messages)
+        ).fetchall()
+        session.created_at = row[0]
+        for role, content in reversed(rows):
+            session.append(role, content)
+        session.last_activity = time.time()
+        return session
+
+    def _expire(self, conn: sqlite3.Connection, session_id: str, last_activity: float) -> None:
+        """Delete an idle-expired session and its messages in one transaction."""
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # Unless another worker revived it since we read it
+            expired = conn.execute(
+                "DELETE FROM sessions WHERE session_id = ? AND last_activity = ?", (session_id, last_activity)
+            ).rowcount
+            if expired:
+                conn.execute("DELETE FROM session_messages WHERE session_id = ?", (session_id,))
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            print(f"⚠️ Session expiry failed: {e}")
+            return
+        if expired:
+            SESSION_EVICTIONS.inc(reason="ttl")
+
+    def append(self, session: ChatSession, role: str, content: str) -> None:
+        session.append(role, content)
+        session.unsaved.append((role, content))
+
+    def save(self, session: ChatSession) -> None:
+        """Write the turn's messages, trim the ring buffer and touch the session in one transaction."""
+        if not session.unsaved:
+            return
+        conn = self._connection()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT INTO session_messages (session_id, role, content, size) VALUES (?, ?, ?, ?)",
+                [
+                    (session.session_id, role, content, message_size({"role": role, "content": content}))
+                    for role, content in session.unsaved
+                ]
+            )
+            # A message row is dropped once max_messages newer rows exist for its session
+            trimmed = conn.execute(
+                "DELETE FROM session_messages WHERE session_id = ? AND id <= ("
+                " SELECT id FROM session_messages WHERE session_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (session.session_id, session.session_id, self.max_messages)
+            ).rowcount
+            conn.execute(
+                "INSERT INTO sessions (session_id, created_at, last_activity, size_bytes)"
+                " VALUES (?, ?, ?, (SELECT COALESCE(SUM(size), 0) FROM session_messages WHERE session_id = ?) + ?)"
+                " ON CONFLICT(session_id) DO UPDATE SET"
+                " last_activity = excluded.last_activity, size_bytes = excluded.size_bytes",
+                (session.session_id, session.created_at, time.time(), session.session_id, SESSION_OVERHEAD_BYTES)
+            )
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            print(f"⚠️ Session save failed: {e}")
+            return
+        session.unsaved = []
+        if trimmed > 0:
+            SESSION_TRIMMED.inc(trimmed)
+
+    def sweep(self) -> int:
+        """Drop idle sessions, then least recently used ones while over the count or byte budget."""
+        conn = self._connection()
+        removed = {}
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            removed["ttl"] = conn.execute(
+                "SELECT COUNT(*) FROM sessions WHERE last_activity < ?", (time.time() - self.idle_ttl,)
+            ).fetchone()[0]
+            conn.execute("DELETE FROM sessions WHERE last_activity < ?", (time.time() - self.idle_ttl,))
+
+            count, total_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM sessions").fetchone()
+            removed["capacity"] = max(0, count - self.max_sessions)
+            conn.execute(
+                "DELETE FROM sessions WHERE session_id IN ("
+                " SELECT session_id FROM sessions ORDER BY last_activity LIMIT ?)",
+                (removed["capacity"],)
+            )
+
+            removed["memory"] = 0
+            if total_bytes > self.max_bytes:
+                over = total_bytes - self.max_bytes
+                for session_id, size in conn.execute(
+                    "SELECT session_id, size_bytes FROM sessions ORDER BY last_activity"
+                ).fetchall():
+                    if over <= 0:
+                        break
+                    conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                    over -= size
+                    removed["memory"] += 1
+
+            conn.execute("DELETE FROM session_messages WHERE session_id NOT IN (SELECT session_id FROM sessions)")
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            print(f"⚠️ Session sweep failed: {e}")
+            return 0
+
+        for reason, count in removed.items():
+            if count:
+                SESSION_EVICTIONS.inc(count, reason=reason)
+        self._publish()
+        return sum(removed.values())
+
+    def _publish(self) -> Tuple[int, int]:
+        """Update the session gauges; returns (sessions, bytes)."""
+        count, total_bytes = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM sessions"
+        ).fetchone()
+        SESSIONS_ACTIVE.set(count)
+        SESSION_BYTES.set(total_bytes)
+        return count, total_bytes
+
+    def _ensure_sweeper(self) -> None:
+        """Start the sweeper thread (again after a fork)."""
+        if self._sweeper_pid == os.getpid() and self._sweeper.is_alive():
+            return
+        with self._sweeper_lock:
+            if self._sweeper_pid == os.getpid() and self._sweeper.is_alive():
+                return
+            self._sweeper = threading.Thread(target=self._sweep_forever, name="session-sweeper", daemon=True)
+            self._sweeper_pid = os.getpid()
+            self._sweeper.start()
+
+    def _sweep_forever(self) -> None:
+        while not self._stop.wait(SESSION_SWEEP_INTERVAL):
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"⚠️ Session sweep failed: {e}")
+
+    def stats(self) -> Dict:
+        count, total_bytes = self._publish()
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "active_sessions": count,
+            "max_sessions": self.max_sessions,
+            "bytes": total_bytes,
+            "max_bytes": self.max_bytes,
+            "max_messages_per_session": self.max_messages,
+            "idle_ttl": self.idle_ttl,
+            "evictions": SESSION_EVICTIONS.snapshot(),
+            "messages_trimmed": SESSION_TRIMMED.value()
+        }
+
+
+def create_session_store(backend: str = SESSION_BACKEND) -> SessionBackend:
+    """Session backend selected by SESSION_BACKEND ("memory" or "sqlite")."""
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    if backend != "memory":
+        print(f"⚠️ Unknown SESSION_BACKEND '{backend}', using in-memory sessions")
+    return SessionStore()
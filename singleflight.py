@@ -0,0 +1,72 @@
+"""
+OpenGenNet AI - Singleflight Request Coalescing
+Concurrent callers asking for the same key share one in-flight execution instead
+of each issuing their own upstream call. Callers must share an event loop (the
+background loop under Flask, the server loop under ASGI).
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+import metrics
+
+SINGLEFLIGHT_CALLS = metrics.counter("singleflight_calls_total", "Calls entering a singleflight group")
+SINGLEFLIGHT_COALESCED = metrics.counter(
+    "singleflight_coalesced_total", "Calls served by another caller's in-flight execution (upstream calls saved)"
+)
+
+
+class _Call:
+    """One in-flight execution and the number of callers waiting on it."""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Deduplicates concurrent executions per key."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: Dict[str, _Call] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run `fn` for `key`, or wait on the execution already in flight for it.
+
+        Returns (result, shared) where shared is True when another caller's execution
+        was reused. The execution runs as its own task, so a caller that times out or
+        disconnects does not cancel it for the others; once the last caller has left
+        it is cancelled, so abandoned work stops using provider quota.
+        """
+        SINGLEFLIGHT_CALLS.inc(group=self.name)
+
+        call = self._in_flight.get(key)
+        shared = call is not None
+        if shared:
+            SINGLEFLIGHT_COALESCED.inc(group=self.name)
+        else:
+            call = self._in_flight[key] = _Call(asyncio.ensure_future(fn()))
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task), shared
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+                self._forget(key, call)
+                # Return only once it has stopped, so callers' concurrency limits stay true
+                await asyncio.wait({call.task})
+
+    def _forget(self, key: str, call: _Call) -> None:
+        # A later call for the key may already have replaced a cancelled one
+        if self._in_flight.get(key) is call:
+            del self._in_flight[key]
+
+    def in_flight(self) -> int:
+        return len(self._in_flight)
@@ -0,0 +1,167 @@
+"""
+Session backend tests - SQLite sessions shared by concurrent worker processes.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import sqlite3
+import statistics
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from session_store import SESSION_OVERHEAD_BYTES, SQLiteSessionStore, SessionStore, message_size
+
+WORKERS = 4
+TURNS_PER_WORKER = 25
+SHARED_SESSIONS = ["stress_a", "stress_b", "stress_c", "stress_d", "stress_e"]
+
+
+def _worker(path: str, worker: int) -> None:
+    store = SQLiteSessionStore(path, max_messages=1000)
+    for turn in range(TURNS_PER_WORKER):
+        session = store.get_or_create(SHARED_SESSIONS[turn % len(SHARED_SESSIONS)])
+        store.append(session, "user", f"w{worker}-t{turn}")
+        store.append(session, "assistant", f"w{worker}-t{turn}-answer")
+        store.save(session)
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_sqlite_sessions_shared_across_processes(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    SQLiteSessionStore(path)
+
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_worker, args=(path, worker)) for worker in range(WORKERS)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+
+    store = SQLiteSessionStore(path, max_messages=1000)
+    assert len(store) == len(SHARED_SESSIONS)
+
+    expected = WORKERS * TURNS_PER_WORKER // len(SHARED_SESSIONS) * 2
+    for session_id in SHARED_SESSIONS:
+        messages = list(store.get_or_create(session_id).messages)
+        assert len(messages) == expected
+
+        # A turn is saved in one transaction, so its two messages stay adjacent
+        for user, assistant in zip(messages[::2], messages[1::2]):
+            assert user["role"] == "user" and assistant["role"] == "assistant"
+            assert assistant["content"] == f"{user['content']}-answer"
+
+
+def test_sqlite_ring_buffer_and_idle_ttl(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"), max_messages=4, idle_ttl=0.2)
+
+    session = store.get_or_create("ring")
+    for turn in range(5):
+        store.append(session, "user", f"q{turn}")
+        store.append(session, "assistant", f"a{turn}")
+        store.save(session)
+
+    reloaded = store.get_or_create("ring")
+    assert [message["content"] for message in reloaded.messages] == ["q3", "a3", "q4", "a4"]
+
+    time.sleep(0.3)
+    assert store.sweep() == 1
+    assert len(store) == 0
+    assert len(store.get_or_create("ring").messages) == 0
+
+
+def test_sqlite_expired_session_id_starts_clean(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    store = SQLiteSessionStore(path, max_messages=4, idle_ttl=0.2)
+    session = store.get_or_create("returning")
+    for turn in range(2):
+        store.append(session, "user", f"old q{turn}")
+        store.append(session, "assistant", f"old a{turn}")
+    store.save(session)
+
+    time.sleep(0.3)
+    session = store.get_or_create("returning")
+    assert len(session.messages) == 0
+    with sqlite3.connect(path) as conn:
+        # The expired rows are gone before the sweeper runs
+        assert conn.execute("SELECT COUNT(*) FROM session_messages").fetchone()[0] == 0
+
+    store.append(session, "user", "new q")
+    store.append(session, "assistant", "new a")
+    store.save(session)
+
+    reloaded = store.get_or_create("returning")
+    assert [message["content"] for message in reloaded.messages] == ["new q", "new a"]
+    assert store.stats()["bytes"] == SESSION_OVERHEAD_BYTES + sum(map(message_size, reloaded.messages))
+    assert len(store) == 1
+
+
+def test_sqlite_load_and_save_are_sub_millisecond(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"))
+    session = store.get_or_create("latency")
+    for turn in range(10):
+        store.append(session, "user", "x" * 500)
+        store.append(session, "assistant", "y" * 2000)
+    store.save(session)
+
+    loads, saves = [], []
+    for turn in range(200):
+        start = time.perf_counter()
+        session = store.get_or_create("latency")
+        loads.append(time.perf_counter() - start)
+
+        store.append(session, "user", "question")
+        store.append(session, "assistant", "answer")
+        start = time.perf_counter()
+        store.save(session)
+        saves.append(time.perf_counter() - start)
+
+    assert statistics.median(loads) < 0.001
+    assert statistics.median(saves) < 0.001
+
+
+def test_memory_store_evicts_least_recently_used():
+    store = SessionStore(max_sessions=2)
+    first = store.get_or_create("first")
+    store.get_or_create("second")
+    store.get_or_create("first")
+    store.get_or_create("third")
+
+    assert len(store) == 2
+    assert store.get_or_create("first") is first
+    assert store.stats()["evictions"]
+
+
+def test_session_io_runs_off_the_event_loop(tmp_path, monkeypatch):
+    import global_api
+
+    threads = []
+
+    class RecordingStore(SQLiteSessionStore):
+        def get_or_create(self, session_id=None):
+            threads.append(threading.current_thread())
+            return super().get_or_create(session_id)
+
+        def save(self, session):
+            threads.append(threading.current_thread())
+            super().save(session)
+
+    async def fake_generate(message, messages, provider_key, max_tokens, retrieval=None, priority=None):
+        return {"success": True, "response": "Check the MTU.", "timings": {}}
+
+    store = RecordingStore(str(tmp_path / "sessions.sqlite3"))
+    monkeypatch.setattr(global_api, "session_store", store)
+    monkeypatch.setattr(global_api, "generate_answer", fake_generate)
+    monkeypatch.setattr(global_api, "RAG_AVAILABLE", False)
+
+    result = asyncio.run(global_api.process_message("OSPF stuck?", "off_loop"))
+
+    assert result["message_count"] == 2
+    assert len(threads) == 2 and threading.main_thread() not in threads  # load and save
+    assert [message["role"] for message in store.get_or_create("off_loop").messages] == ["user", "assistant"]
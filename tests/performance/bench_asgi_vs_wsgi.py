@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+🚦 ASGI vs WSGI Load Test
+Drives concurrent /ask requests at global_api.py under gunicorn (sync gthread
+workers, the current deployment shape) and at global_asgi.py under uvicorn (one
+process), with both pointed at a local stub provider that holds every upstream
+call for --latency-ms. Reports throughput and latency percentiles per mode.
+
+Usage: python tests/performance/bench_asgi_vs_wsgi.py [--concurrency 200] [--requests 600]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import aiohttp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_provider import start_stub_server
+
+
+def server_env(stub_url: str, pool_size: int) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": ROOT,
+        "GROQ_BASE_URL": stub_url,
+        "OPENROUTER_BASE_URL": stub_url,
+        "RESPONSE_CACHE_ENABLED": "false",
+        "PROVIDER_POOL_LIMIT": str(pool_size),
+        "PROVIDER_POOL_LIMIT_PER_HOST": str(pool_size)
+    })
+    return env
+
+
+def server_commands(port: int, workers: int, threads: int) -> dict:
+    return {
+        f"gunicorn ({workers} workers x {threads} threads)": [
+            sys.executable, "-m", "gunicorn", "--bind", f"127.0.0.1:{port}",
+            "--workers", str(workers), "--threads", str(threads),
+            "--worker-class", "gthread", "--timeout", "120", "global_api:app"
+        ],
+        "uvicorn ASGI (1 process)": [
+            sys.executable, "-m", "uvicorn", "global_asgi:app",
+            "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"
+        ]
+    }
+
+
+async def wait_until_healthy(base_url: str, timeout: float = 60) -> None:
+    deadline = time.time() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.time() < deadline:
+            try:
+                async with session.get(f"{base_url}/health") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not become healthy")
+
+
+async def run_load(base_url: str, concurrency: int, total: int) -> dict:
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker(session):
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                async with session.post(f"{base_url}/ask", json={"query": f"load test question {i}"}) as response:
+                    await response.read()
+                    if response.status != 200:
+                        errors += 1
+                        continue
+            except aiohttp.ClientError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    connector = aiohttp.TCPConnector(limit=0)
+    timeout = aiohttp.ClientTimeout(total=300)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    pick = lambda q: round(latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000, 1) if latencies else None
+    return {
+        "requests": total,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+        "max_ms": round(latencies[-1] * 1000, 1) if latencies else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare gunicorn (WSGI) and uvicorn (ASGI) serving modes")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=600)
+    parser.add_argument("--latency-ms", type=float, default=1000.0, help="stub provider latency")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers")
+    parser.add_argument("--threads", type=int, default=8, help="gunicorn threads per worker")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    stub = start_stub_server(latency=args.latency_ms / 1000)
+    stub_url = f"http://127.0.0.1:{stub.server_address[1]}"
+    base_url = f"http://127.0.0.1:{args.port}"
+    env = server_env(stub_url, pool_size=max(args.concurrency, 100))
+
+    results = {}
+    for mode, command in server_commands(args.port, args.workers, args.threads).items():
+        process = subprocess.Popen(command, cwd=ROOT, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            asyncio.run(wait_until_healthy(base_url))
+            results[mode] = asyncio.run(run_load(base_url, args.concurrency, args.requests))
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+    stub.shutdown()
+
+    print("🚦 ASGI vs WSGI LOAD TEST")
+    print("=" * 90)
+    print(f"Concurrency {args.concurrency}, {args.requests} requests, stub latency {args.latency_ms}ms")
+    for mode, stats in results.items():
+        print(f"{mode:<36} {stats['throughput_rps']:>7} rps  p50 {stats['p50_ms']}ms  "
+              f"p95 {stats['p95_ms']}ms  p99 {stats['p99_ms']}ms  errors {stats['errors']}")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+⚡ Provider Gateway Benchmark
+Measures the per-request latency saved by the pooled keep-alive clients in
+provider_gateway.py versus a fresh connection per call, against a local stub
+of the OpenAI-compatible /chat/completions endpoint.
+
+Usage: python tests/performance/bench_provider_gateway.py [--requests 200] [--handshake-ms 20]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import aiohttp
+import requests
+
+import provider_gateway
+from stub_provider import start_stub_server
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "mean_ms": round(statistics.mean(samples) * 1000, 3),
+        "p50_ms": round(samples[len(samples) // 2] * 1000, 3),
+        "p95_ms": round(samples[int(len(samples) * 0.95) - 1] * 1000, 3)
+    }
+
+
+def bench_sync(url, payload, count, pooled):
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        if pooled:
+            response = provider_gateway.get_sync_session().post(url, json=payload, timeout=30)
+        else:
+            response = requests.post(url, json=payload, timeout=30)
+        response.json()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def bench_async(url, payload, count, pooled):
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        if pooled:
+            async with provider_gateway.get_async_session().post(url, json=payload) as response:
+                await response.json()
+        else:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(url, json=payload) as response:
+                    await response.json()
+        samples.append(time.perf_counter() - start)
+    if pooled:
+        await provider_gateway.close_async_session()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Provider gateway keep-alive benchmark")
+    parser.add_argument("--requests", type=int, default=200, help="requests per mode")
+    parser.add_argument("--handshake-ms", type=float, default=20.0,
+                        help="simulated connection setup cost per new connection")
+    args = parser.parse_args()
+
+    server = start_stub_server(handshake_delay=args.handshake_ms / 1000)
+    url = f"http://127.0.0.1:{server.server_address[1]}/chat/completions"
+    payload = {"model": "stub", "messages": [{"role": "user", "content": "ping"}], "max_tokens": 16}
+
+    results = {
+        "sync_fresh_connection": summarize(bench_sync(url, payload, args.requests, pooled=False)),
+        "sync_pooled": summarize(bench_sync(url, payload, args.requests, pooled=True)),
+        "async_fresh_session": summarize(asyncio.run(bench_async(url, payload, args.requests, pooled=False))),
+        "async_pooled": summarize(asyncio.run(bench_async(url, payload, args.requests, pooled=True)))
+    }
+    server.shutdown()
+
+    print("⚡ PROVIDER GATEWAY BENCHMARK")
+    print("=" * 60)
+    print(f"Requests per mode: {args.requests}, simulated handshake: {args.handshake_ms}ms")
+    for mode, stats in results.items():
+        print(f"{mode:<24} mean {stats['mean_ms']:>8.3f}ms  p50 {stats['p50_ms']:>8.3f}ms  p95 {stats['p95_ms']:>8.3f}ms")
+
+    sync_saved = results["sync_fresh_connection"]["mean_ms"] - results["sync_pooled"]["mean_ms"]
+    async_saved = results["async_fresh_session"]["mean_ms"] - results["async_pooled"]["mean_ms"]
+    print("-" * 60)
+    print(f"Saved per request (sync):  {sync_saved:.3f}ms")
+    print(f"Saved per request (async): {async_saved:.3f}ms")
+    print(json.dumps({"pool_config": provider_gateway.get_pool_config(), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
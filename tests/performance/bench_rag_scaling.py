@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+📏 Expert RAG Scaling Benchmark
+Times each stage of ExpertRAGSystem - knowledge loading, index build, every
+retrieval method, fusion, the full search and enhance_ai_response - at several
+corpus sizes, and measures the memory retained by the knowledge base and index.
+Corpora come from synthetic_corpus.py, so vocabulary and lengths follow the
+real cases under data/ and every corpus file shape is exercised.
+
+Results print as a table and, with --output, are written as JSON (one row per
+corpus size, plus the retrieval configuration) so runs can be compared.
+
+Usage: python tests/performance/bench_rag_scaling.py [--sizes 1000 10000 100000]
+           [--queries 50] [--max-features 10000] [--label baseline] [--output rag.json]
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+import expert_rag_system
+from expert_rag_system import ExpertRAGSystem
+from synthetic_corpus import DEFAULT_SOURCE, generate_corpus, measure_profile
+
+CASES_PER_FILE = 5000
+
+QUESTIONS = [
+    "How do I troubleshoot BGP neighbor flapping?",
+    "Firewall blocking IPsec VPN tunnel traffic",
+    "Investigate a phishing incident with malware on endpoints",
+    "AWS VPC routing between subnets not working",
+    "OSPF adjacency stuck in EXSTART state",
+    "Harden SSL/TLS configuration on web servers",
+    "DNS resolution failures after DHCP changes",
+    "Detect and mitigate a DDoS attack"
+]
+
+
+def timed(function: Callable, *args) -> float:
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def latency_summary(samples: List[float]) -> Dict:
+    samples = sorted(samples)
+    return {
+        "mean_ms": round(statistics.mean(samples) * 1000, 3),
+        "p50_ms": round(samples[len(samples) // 2] * 1000, 3),
+        "p95_ms": round(samples[max(0, int(len(samples) * 0.95) - 1)] * 1000, 3)
+    }
+
+
+def empty_system(max_features: int) -> ExpertRAGSystem:
+    """A system with nothing loaded yet (the semantic model, if any, is loaded)."""
+    with tempfile.TemporaryDirectory() as empty:
+        system = ExpertRAGSystem(empty)
+    system.tfidf_vectorizer = TfidfVectorizer(max_features=max_features, stop_words='english')
+    return system
+
+
+def bench_size(corpus_dir: str, size: int, queries: List[str], args) -> Dict:
+    """Build, memory and per-stage retrieval timings for one corpus."""
+    result = {"cases": size}
+
+    # Memory retained by the knowledge base and the index (traced in a separate pass - tracing is slow)
+    if not args.skip_memory:
+        system = empty_system(args.max_features)
+        system.data_directory = corpus_dir
+        tracemalloc.start()
+        system._load_expert_knowledge()
+        after_load = tracemalloc.get_traced_memory()[0]
+        system._build_search_index()
+        after_index, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["memory_mb"] = {
+            "knowledge_base": round(after_load / 2 ** 20, 1),
+            "index": round((after_index - after_load) / 2 ** 20, 1),
+            "peak": round(peak / 2 ** 20, 1)
+        }
+        del system
+
+    system = empty_system(args.max_features)
+    system.data_directory = corpus_dir
+    result["load_s"] = round(timed(system._load_expert_knowledge), 3)
+    result["index_s"] = round(timed(system._build_search_index), 3)
+    if system.embeddings_model:
+        result["embed_cases_s"] = round(timed(system._case_embeddings), 3)
+
+    samples = {stage: [] for stage in ("tfidf", "semantic", "keywords", "fusion", "search", "enhance", "enhance_search")}
+    for query in queries:
+        start = time.perf_counter()
+        tfidf_scores = system._tfidf_scores([query])
+        samples["tfidf"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        semantic_scores = system._semantic_scores([query])
+        if semantic_scores is not None:
+            samples["semantic"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        keyword_results = system._keyword_matches(query, args.min_score)
+        samples["keywords"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        results = system._scored_cases(tfidf_scores[0], args.min_score, 'tfidf')
+        if semantic_scores is not None:
+            results += system._scored_cases(semantic_scores[0], args.min_score, 'semantic')
+        system._fuse_results(results + keyword_results, args.top_k)
+        samples["fusion"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        cases = system.search_expert_knowledge(query, top_k=args.top_k, min_score=args.min_score)
+        samples["search"].append(time.perf_counter() - start)
+
+        answer = f"Answer about {query}. Check the configuration and logs."
+        samples["enhance"].append(timed(system.enhance_ai_response, query, answer, "bench", cases))
+        samples["enhance_search"].append(timed(system.enhance_ai_response, query, answer, "bench"))
+
+    batch_seconds = timed(system.search_expert_knowledge_batch, queries, args.top_k, args.min_score)
+    result["latency"] = {stage: latency_summary(values) for stage, values in samples.items() if values}
+    result["latency"]["batch_search_per_query"] = {"mean_ms": round(batch_seconds / len(queries) * 1000, 3)}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Expert RAG scaling benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=50, help="queries timed per corpus size")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--min-score", type=float, default=0.1)
+    parser.add_argument("--max-features", type=int, default=10000, help="TF-IDF vocabulary size")
+    parser.add_argument("--skip-memory", action="store_true", help="skip the (slow) traced memory pass")
+    parser.add_argument("--seed", type=int, default=0, help="synthetic corpus seed")
+    parser.add_argument("--label", default="default", help="name for this retrieval configuration")
+    parser.add_argument("--output", default=None, help="write the JSON results here")
+    args = parser.parse_args()
+
+    logging.getLogger(expert_rag_system.__name__).setLevel(logging.ERROR)
+    rng = random.Random(1)
+    titles = [case["title"] for case in ExpertRAGSystem(DEFAULT_SOURCE).knowledge_base]
+    profile = measure_profile()
+    queries = [QUESTIONS[i % len(QUESTIONS)] if i % 2 == 0 else rng.choice(titles) for i in range(args.queries)]
+
+    rows = []
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as corpus_dir:
+            generate_corpus(corpus_dir, size, profile, seed=args.seed, cases_per_file=CASES_PER_FILE)
+            rows.append(bench_size(corpus_dir, size, queries, args))
+
+    report = {
+        "label": args.label,
+        "config": {
+            "top_k": args.top_k,
+            "min_score": args.min_score,
+            "tfidf_max_features": args.max_features,
+            "semantic_available": rows[0].get("embed_cases_s") is not None,
+            "queries": args.queries,
+            "corpus_seed": args.seed
+        },
+        "results": rows
+    }
+
+    print("📏 EXPERT RAG SCALING BENCHMARK")
+    print("=" * 110)
+    stages = ["tfidf", "semantic", "keywords", "fusion", "search", "enhance", "enhance_search"]
+    print(f"{'cases':>8} {'load s':>8} {'index s':>8} {'mem MB':>8} " + " ".join(f"{stage:>14}" for stage in stages))
+    for row in rows:
+        memory = row.get("memory_mb", {})
+        print(f"{row['cases']:>8} {row['load_s']:>8} {row['index_s']:>8} "
+              f"{memory.get('knowledge_base', 0) + memory.get('index', 0):>8.1f} "
+              + " ".join(f"{row['latency'][stage]['p50_ms'] if stage in row['latency'] else '-':>14}" for stage in stages))
+    print("(per-stage columns are p50 ms per query)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+🎯 Offline Retrieval Evaluation
+Runs every query of the elite test suite (data/complete_elite_test_suite_*.json)
+through search_expert_knowledge under one or more index configurations and
+scores the results against each query's golden root_causes and commands,
+together with per-query search latency.
+
+There are no golden case ids, so relevance is judged by coverage: a retrieved
+case covers a golden item when at least COVERAGE_THRESHOLD of the item's
+significant tokens appear in the case text.
+
+    recall@k   share of golden items covered by the top k cases (per field and overall)
+    MRR        mean of 1 / rank of the first case covering any golden item
+
+Configurations are named dicts of TF-IDF settings, min_score and whether the
+semantic model is used (built-in set below, or --configs file.json). Results
+print as a comparison table and, with --output, are written as JSON.
+
+Usage: python tests/performance/eval_retrieval.py [--config baseline bigrams] [--configs configs.json]
+           [--data-dir data/organized_expert_knowledge] [--suite data/complete_elite_test_suite_X.json]
+           [--output eval.json]
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import re
+import statistics
+import sys
+import time
+from typing import Dict, List, Set
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT)
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from expert_rag_system import ExpertRAGSystem
+
+DEFAULT_DATA_DIR = os.path.join(ROOT, "data", "organized_expert_knowledge")
+GOLDEN_FIELDS = ("root_causes", "commands")
+K_VALUES = (1, 3, 5, 10)
+COVERAGE_THRESHOLD = 0.6
+
+# Named index configurations; anything omitted falls back to ExpertRAGSystem's defaults
+CONFIGS = {
+    "baseline": {},
+    "tfidf_only": {"semantic": False},
+    "bigrams": {"ngram_range": [1, 2], "max_features": 50000},
+    "sublinear_tf": {"sublinear_tf": True},
+    "small_vocab": {"max_features": 2000},
+    "low_min_score": {"min_score": 0.05}
+}
+
+TOKEN = re.compile(r"[a-z0-9][a-z0-9_.:/-]*")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from how in is it of on or the to what with show no not your".split()
+)
+
+
+def tokens(text: str) -> Set[str]:
+    return {token.rstrip(".:") for token in TOKEN.findall(text.lower())
+            if len(token) > 1 and token not in STOPWORDS}
+
+
+def covers(case_tokens: Set[str], item_tokens: Set[str]) -> bool:
+    return bool(item_tokens) and len(item_tokens & case_tokens) / len(item_tokens) >= COVERAGE_THRESHOLD
+
+
+def load_suite(path: str = None) -> List[Dict]:
+    """Golden queries from the newest (or the given) elite test suite file."""
+    if path is None:
+        path = sorted(glob.glob(os.path.join(ROOT, "data", "complete_elite_test_suite_*.json")))[-1]
+    with open(path, "r", encoding="utf-8") as f:
+        return [test for test in json.load(f)["test_suite"] if test.get("query") and test.get("golden")]
+
+
+def configure(rag: ExpertRAGSystem, config: Dict) -> None:
+    """Rebuild the index of a loaded system under `config`."""
+    rag.tfidf_vectorizer = TfidfVectorizer(
+        max_features=config.get("max_features", 10000),
+        ngram_range=tuple(config.get("ngram_range", (1, 1))),
+        sublinear_tf=config.get("sublinear_tf", False),
+        stop_words='english'
+    )
+    rag._build_search_index()
+    if not config.get("semantic", True):
+        rag.embeddings_model = None
+
+
+def evaluate(rag: ExpertRAGSystem, suite: List[Dict], config: Dict, repeats: int = 3) -> Dict:
+    """recall@k per golden field, MRR and search latency for one configuration."""
+    min_score = config.get("min_score", 0.1)
+    top_k = max(K_VALUES)
+    covered = {field: {k: 0 for k in K_VALUES} for field in GOLDEN_FIELDS}
+    totals = {field: 0 for field in GOLDEN_FIELDS}
+    reciprocal_ranks, latencies, per_query = [], [], []
+
+    for test in suite:
+        samples = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            results = rag.search_expert_knowledge(test["query"], top_k=top_k, min_score=min_score)
+            samples.append(time.perf_counter() - start)
+        latencies.append(min(samples))
+
+        case_tokens = [tokens(case["full_text"]) for case in results]
+        first_relevant = None
+        query_recall = {}
+        for field in GOLDEN_FIELDS:
+            items = [tokens(item) for item in test["golden"].get(field, [])]
+            totals[field] += len(items)
+            # Rank (1-based) of the first case covering each golden item
+            ranks = [
+                next((rank for rank, text in enumerate(case_tokens, 1) if covers(text, item)), None)
+                for item in items
+            ]
+            for k in K_VALUES:
+                covered[field][k] += sum(1 for rank in ranks if rank is not None and rank <= k)
+            found = [rank for rank in ranks if rank is not None]
+            if found:
+                first_relevant = min(found + ([first_relevant] if first_relevant else []))
+            query_recall[field] = round(len(found) / len(items), 3) if items else None
+
+        reciprocal_ranks.append(1 / first_relevant if first_relevant else 0.0)
+        per_query.append({
+            "id": test.get("id"),
+            "category": test.get("category"),
+            "results": len(results),
+            "first_relevant_rank": first_relevant,
+            "recall@10": query_recall,
+            "latency_ms": round(latencies[-1] * 1000, 3)
+        })
+
+    all_items = sum(totals.values())
+    ordered = sorted(latencies)
+    return {
+        "config": config,
+        "queries": len(suite),
+        "recall": {
+            **{field: {f"@{k}": round(covered[field][k] / totals[field], 4) if totals[field] else None
+                       for k in K_VALUES} for field in GOLDEN_FIELDS},
+            "all": {f"@{k}": round(sum(covered[field][k] for field in GOLDEN_FIELDS) / all_items, 4)
+                    if all_items else None for k in K_VALUES}
+        },
+        "mrr": round(statistics.mean(reciprocal_ranks), 4) if reciprocal_ranks else 0.0,
+        "latency_ms": {
+            "mean": round(statistics.mean(ordered) * 1000, 3),
+            "p50": round(ordered[len(ordered) // 2] * 1000, 3),
+            "p95": round(ordered[max(0, int(len(ordered) * 0.95) - 1)] * 1000, 3),
+            "max": round(ordered[-1] * 1000, 3)
+        },
+        "per_query": per_query
+    }
+
+
+def format_table(results: Dict[str, Dict]) -> str:
+    """Configurations side by side: overall recall@k, per-field recall@5, MRR and latency."""
+    header = (f"{'config':<16} " + " ".join(f"{'R@' + str(k):>7}" for k in K_VALUES)
+              + f" {'RC@5':>7} {'CMD@5':>7} {'MRR':>7} {'p50 ms':>8} {'p95 ms':>8}")
+    lines = [header, "-" * len(header)]
+    for name, result in results.items():
+        recall = result["recall"]
+        lines.append(
+            f"{name:<16} " + " ".join(f"{recall['all'][f'@{k}']:>7.3f}" for k in K_VALUES)
+            + f" {recall['root_causes']['@5']:>7.3f} {recall['commands']['@5']:>7.3f} {result['mrr']:>7.3f}"
+            + f" {result['latency_ms']['p50']:>8} {result['latency_ms']['p95']:>8}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline retrieval quality and latency evaluation")
+    parser.add_argument("--config", nargs="+", default=None, help="configuration names to run (default: all)")
+    parser.add_argument("--configs", default=None, help="JSON file of named configurations to use instead")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="knowledge base to search")
+    parser.add_argument("--suite", default=None, help="elite test suite file (default: newest under data/)")
+    parser.add_argument("--repeats", type=int, default=3, help="timed searches per query (fastest is kept)")
+    parser.add_argument("--output", default=None, help="write the JSON results here")
+    args = parser.parse_args()
+
+    logging.getLogger("expert_rag_system").setLevel(logging.ERROR)
+    configs = CONFIGS
+    if args.configs:
+        with open(args.configs, "r", encoding="utf-8") as f:
+            configs = json.load(f)
+    if args.config:
+        configs = {name: configs[name] for name in args.config}
+
+    suite = load_suite(args.suite)
+    results = {}
+    for name, config in configs.items():
+        # Fresh system per configuration - configure() may drop the semantic model
+        rag = ExpertRAGSystem(args.data_dir)
+        configure(rag, config)
+        results[name] = evaluate(rag, suite, config, args.repeats)
+
+    print(f"🎯 RETRIEVAL EVALUATION ({len(suite)} golden queries, {len(rag.knowledge_base)} cases)")
+    print(format_table(results))
+    print("R@k: golden root causes + commands covered by the top k; RC/CMD: per field")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"data_dir": args.data_dir, "results": results}, f, indent=2)
+        print(f"💾 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
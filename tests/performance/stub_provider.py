@@ -0,0 +1,258 @@
+"""
+Local OpenAI-compatible provider simulator for load tests and benchmarks.
+Serves POST <base>/chat/completions (plain and streaming) over keep-alive HTTP/1.1
+with configurable latency distributions, token throughput, response sizes and
+error/429 injection, so the apps can be driven offline and reproducibly.
+
+`handshake_delay` is charged once per new connection; `latency` (the median time
+to first token) once per request. Completion tokens are then produced at
+`tokens_per_second` (0 = instantly). GET /stats returns request counts by outcome.
+
+Point the apps at it with GROQ_BASE_URL / OPENROUTER_BASE_URL (global_api.py,
+global_asgi.py, api/index.py and api/vercel_index.py all read them) and any
+non-empty API keys.
+
+Usage: python tests/performance/stub_provider.py [--port 9100] [--latency-ms 1000]
+           [--latency-dist lognormal --latency-p99-ms 4000] [--tokens-per-second 200]
+           [--response-tokens 150 --response-tokens-max 600]
+           [--error-rate 0.02] [--rate-limit-rate 0.05] [--rpm 600] [--seed 1]
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "lognormal")
+
+# z-score of the 99th percentile of a standard normal
+Z_P99 = 2.326
+
+WORDS = (
+    "check the interface counters then verify the routing table and compare the configured "
+    "timers with the neighbor before restarting the session on the affected device"
+).split()
+
+
+class ProviderSimulator:
+    """Sampling and bookkeeping shared by every connection of one simulated provider."""
+
+    def __init__(self, latency: float = 0.0, latency_p99: Optional[float] = None,
+                 latency_dist: str = "fixed", tokens_per_second: float = 0.0,
+                 response_tokens: int = 16, response_tokens_max: Optional[int] = None,
+                 error_rate: float = 0.0, rate_limit_rate: float = 0.0, rpm: int = 0,
+                 retry_after: float = 1.0, seed: Optional[int] = None):
+        if latency_dist not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"latency_dist must be one of {LATENCY_DISTRIBUTIONS}")
+        self.latency = latency
+        self.latency_p99 = latency if latency_p99 is None else max(latency, latency_p99)
+        self.latency_dist = latency_dist
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.response_tokens_max = max(response_tokens, response_tokens_max or response_tokens)
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.rpm = rpm
+        self.retry_after = retry_after
+        self.stats = Counter()
+        self._random = random.Random(seed)
+        self._recent = deque()
+        self._lock = threading.Lock()
+
+    def sample_latency(self) -> float:
+        """Time to first token, with `latency` as the median and `latency_p99` as the 99th percentile."""
+        if self.latency_dist == "fixed" or self.latency_p99 == self.latency or self.latency <= 0:
+            return self.latency
+        with self._lock:
+            if self.latency_dist == "uniform":
+                # Uniform on [low, high] with the requested median and p99
+                half_width = (self.latency_p99 - self.latency) / 0.98
+                return max(0.0, self._random.uniform(self.latency - half_width, self.latency + half_width))
+            sigma = math.log(self.latency_p99 / self.latency) / Z_P99
+            return self._random.lognormvariate(math.log(self.latency), sigma)
+
+    def sample_tokens(self, max_tokens: Optional[int]) -> int:
+        with self._lock:
+            tokens = self._random.randint(self.response_tokens, self.response_tokens_max)
+        return max(1, min(tokens, max_tokens or tokens))
+
+    def admit(self) -> Optional[int]:
+        """HTTP status to fail this request with (429 or 5xx), or None to serve it."""
+        with self._lock:
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] > 60:
+                self._recent.popleft()
+            if self.rpm and len(self._recent) >= self.rpm:
+                return 429
+            self._recent.append(now)
+            roll = self._random.random()
+            if roll < self.rate_limit_rate:
+                return 429
+            if roll < self.rate_limit_rate + self.error_rate:
+                return self._random.choice((500, 502, 503))
+        return None
+
+    def record(self, outcome: str) -> None:
+        with self._lock:
+            self.stats[outcome] += 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return dict(self.stats)
+
+
+def completion_text(tokens: int) -> list:
+    """`tokens` word-sized pieces of filler text (one streamed delta each)."""
+    return [("" if index == 0 else " ") + WORDS[index % len(WORDS)] for index in range(tokens)]
+
+
+def make_stub_server(port: int = 0, handshake_delay: float = 0.0, latency: float = 0.0,
+                     **simulation) -> ThreadingHTTPServer:
+    """
+    Build (but do not start) a simulator server; `simulation` takes the remaining
+    ProviderSimulator options. The simulator is available as `server.simulator`.
+    """
+    simulator = ProviderSimulator(latency=latency, **simulation)
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            super().setup()
+            # Stand-in for the DNS + TCP + TLS cost of a new upstream connection
+            time.sleep(handshake_delay)
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/stats"):
+                return self.send_json(200, simulator.snapshot())
+            self.send_json(404, {"error": {"message": "Not found", "type": "not_found"}})
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                return self.send_json(404, {"error": {"message": "Not found", "type": "not_found"}})
+
+            status = simulator.admit()
+            time.sleep(simulator.sample_latency())
+            if status == 429:
+                simulator.record("rate_limited")
+                return self.send_json(429, {
+                    "error": {"message": "Rate limit reached, please retry", "type": "rate_limit_exceeded"}
+                }, {"Retry-After": f"{simulator.retry_after:g}"})
+            if status is not None:
+                simulator.record("error")
+                return self.send_json(status, {"error": {"message": "Simulated upstream failure", "type": "server_error"}})
+
+            pieces = completion_text(simulator.sample_tokens(body.get("max_tokens")))
+            prompt_tokens = sum(len(str(message.get("content", ""))) for message in body.get("messages", [])) // 4
+            simulator.record("stream" if body.get("stream") else "ok")
+            if body.get("stream"):
+                return self.stream_completion(body, pieces)
+
+            if simulator.tokens_per_second:
+                time.sleep(len(pieces) / simulator.tokens_per_second)
+            self.send_json(200, {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "model": body.get("model", "stub"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(pieces)},
+                    "finish_reason": "stop"
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": len(pieces),
+                    "total_tokens": prompt_tokens + len(pieces)
+                }
+            })
+
+        def stream_completion(self, body: Dict, pieces: list):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            interval = 1 / simulator.tokens_per_second if simulator.tokens_per_second else 0
+            chunks = [
+                {"model": body.get("model", "stub"), "choices": [{"index": 0, "delta": {"content": piece}}]}
+                for piece in pieces
+            ]
+            for index, data in enumerate([json.dumps(chunk) for chunk in chunks] + ["[DONE]"]):
+                if interval and index:
+                    time.sleep(interval)
+                event = f"data: {data}\n\n".encode()
+                self.wfile.write(f"{len(event):x}\r\n".encode() + event + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+
+        def send_json(self, status: int, payload: Dict, headers: Optional[Dict] = None):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    class StubServer(ThreadingHTTPServer):
+        def handle_error(self, request, client_address):
+            # Load-test clients that give up close mid-response; that is not a simulator error
+            pass
+
+    server = StubServer(("127.0.0.1", port), StubHandler)
+    server.daemon_threads = True
+    server.request_queue_size = 1024
+    server.simulator = simulator
+    return server
+
+
+def start_stub_server(port: int = 0, handshake_delay: float = 0.0, latency: float = 0.0,
+                      **simulation) -> ThreadingHTTPServer:
+    """Start the simulator on a daemon thread; base URL is http://127.0.0.1:<server.server_address[1]>"""
+    server = make_stub_server(port, handshake_delay, latency, **simulation)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulated OpenAI-compatible provider")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=1000.0, help="median time to first token")
+    parser.add_argument("--latency-p99-ms", type=float, default=None, help="99th percentile time to first token")
+    parser.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--handshake-ms", type=float, default=0.0)
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="completion throughput (0 = instant)")
+    parser.add_argument("--response-tokens", type=int, default=16)
+    parser.add_argument("--response-tokens-max", type=int, default=None)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 5xx")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--rpm", type=int, default=0, help="requests per minute before 429s (0 = unlimited)")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = make_stub_server(
+        args.port, args.handshake_ms / 1000, args.latency_ms / 1000,
+        latency_p99=args.latency_p99_ms / 1000 if args.latency_p99_ms is not None else None,
+        latency_dist=args.latency_dist,
+        tokens_per_second=args.tokens_per_second,
+        response_tokens=args.response_tokens,
+        response_tokens_max=args.response_tokens_max,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        rpm=args.rpm,
+        retry_after=args.retry_after,
+        seed=args.seed
+    )
+    print(f"🧪 Provider simulator on http://127.0.0.1:{args.port}")
+    server.serve_forever()
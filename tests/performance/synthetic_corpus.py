@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+🧬 Synthetic Expert Corpus Generator
+Writes realistic synthetic expert cases for scale-testing ExpertRAGSystem, in
+every JSON shape _extract_expert_cases understands:
+
+    training   {"expert_training_cases": [...]}
+    knowledge  {"expert_knowledge": {"<category>": [...]}}
+    data       {"data": [...]}
+    list       [...]                                  (plain case list)
+    tac        [...]                                  (TAC-style troubleshooting records)
+    keyed      {"metadata": {...}, "expert_cases": [...]}
+
+Text comes from per-category word chains, and lengths, technologies, quality
+scores and TAC fields are drawn from distributions measured on the real files
+under data/ (or from a profile saved with --save-profile). Output is deterministic
+for a given seed and profile, and each file is written case by case so memory
+does not grow with the corpus size.
+
+Usage: python tests/performance/synthetic_corpus.py --cases 1000000 --output /tmp/corpus
+           [--seed 0] [--cases-per-file 10000] [--workers 4] [--shapes training knowledge data list tac keyed]
+           [--profile profile.json | --save-profile profile.json]
+"""
+
+import argparse
+import bisect
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Iterator, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT)
+
+SHAPES = ("training", "knowledge", "data", "list", "tac", "keyed")
+DEFAULT_SOURCE = os.path.join(ROOT, "data", "organized_expert_knowledge")
+DEFAULT_TAC_SOURCES = [os.path.join(ROOT, "data", "tac_cases_1000plus_20250829_163541.json")]
+
+# Chain vocabulary per category is capped to keep profiles small
+MAX_TRANSITIONS_PER_WORD = 50
+START = "<s>"
+
+
+def _chain(texts: List[str]) -> Dict[str, Dict[str, int]]:
+    """First-order word chain; START marks sentence starts and "" sentence ends."""
+    transitions = defaultdict(Counter)
+    for text in texts:
+        for sentence in text.replace("\n", " ").split(". "):
+            words = sentence.split()
+            if not words:
+                continue
+            for previous, word in zip([START] + words, words + [""]):
+                transitions[previous][word] += 1
+    return {
+        word: dict(followers.most_common(MAX_TRANSITIONS_PER_WORD))
+        for word, followers in sorted(transitions.items())
+    }
+
+
+def _lengths(texts: List[str]) -> List[int]:
+    return sorted(len(text.split()) for text in texts if text)
+
+
+def measure_profile(source_dir: str = DEFAULT_SOURCE, tac_sources: Optional[List[str]] = None) -> Dict:
+    """Vocabulary, length and field distributions of the real corpus."""
+    from expert_rag_system import ExpertRAGSystem
+
+    logging.getLogger("expert_rag_system").setLevel(logging.ERROR)
+    cases = ExpertRAGSystem(source_dir).knowledge_base
+
+    by_category = defaultdict(list)
+    for case in cases:
+        by_category[case["category"]].append(case)
+
+    categories = {}
+    for category, group in sorted(by_category.items()):
+        categories[category] = {
+            "weight": len(group),
+            "title_chain": _chain([case["title"] for case in group]),
+            "content_chain": _chain([case["content"] for case in group]),
+            "title_words": _lengths([case["title"] for case in group]),
+            "content_words": _lengths([case["content"] for case in group]),
+            "technologies": dict(Counter(case["technology"] for case in group if case["technology"])),
+            "quality_scores": sorted(case["quality_score"] for case in group
+                                     if isinstance(case["quality_score"], (int, float)))
+        }
+
+    return {"categories": categories, "tac": measure_tac(tac_sources or DEFAULT_TAC_SOURCES)}
+
+
+def measure_tac(paths: List[str]) -> Dict:
+    """Field distributions of TAC-style troubleshooting records."""
+    records = []
+    for path in paths:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                records.extend(record for record in json.load(f) if isinstance(record, dict))
+        except (OSError, ValueError):
+            continue
+
+    detailed = [record for record in records if record.get("symptoms")]
+    steps = [step for record in detailed for key in ("initial_troubleshooting", "solution_steps", "workaround")
+             for step in record.get(key, [])]
+    commands = defaultdict(list)
+    for record in detailed:
+        for platform, lines in (record.get("commands_tested") or {}).items():
+            commands[platform].extend(lines)
+
+    return {
+        "title_chain": _chain([record["title"] for record in records if record.get("title")]),
+        "symptom_chain": _chain([symptom for record in detailed for symptom in record["symptoms"]]),
+        "cause_chain": _chain([record.get("root_cause") or record.get("permanent_fix", "")
+                               for record in detailed] + steps),
+        "steps": sorted(set(steps)),
+        "commands": {platform: sorted(set(lines)) for platform, lines in sorted(commands.items())},
+        "categories": dict(Counter(record.get("category", "Troubleshooting") for record in records)),
+        "severities": dict(Counter(record["severity"] for record in detailed if record.get("severity"))) or
+                      {"High": 1},
+        "tags": dict(Counter(tag for record in records for tag in record.get("tags", [])
+                             if tag not in ("generated", "tac-case")))
+    }
+
+
+class CorpusGenerator:
+    """Draws synthetic cases from a measured profile."""
+
+    def __init__(self, profile: Dict):
+        self.profile = profile
+        self.categories = sorted(profile["categories"])
+        self._category_weights = list(itertools.accumulate(
+            profile["categories"][name]["weight"] for name in self.categories
+        ))
+        self._chains = {}
+
+    def _compiled(self, chain: Dict[str, Dict[str, int]], key) -> Dict:
+        """Chain with cumulative weights, compiled once per chain."""
+        if key not in self._chains:
+            self._chains[key] = {
+                word: (list(followers), list(itertools.accumulate(followers.values())))
+                for word, followers in chain.items()
+            }
+        return self._chains[key]
+
+    @staticmethod
+    def _pick(rng: random.Random, options: List, cumulative: List[int]):
+        return options[bisect.bisect(cumulative, rng.random() * cumulative[-1])]
+
+    @staticmethod
+    def _weighted(rng: random.Random, counts: Dict):
+        options = sorted(counts)
+        return rng.choices(options, [counts[option] for option in options])[0] if options else ""
+
+    def text(self, rng: random.Random, chain: Dict, key, words: int, single_sentence: bool = False) -> str:
+        """About `words` words of chained text (at most one sentence with `single_sentence`)."""
+        compiled = self._compiled(chain, key)
+        if START not in compiled:
+            return ""
+        output, sentence, written, word = [], [], 0, START
+        while written + len(sentence) < words:
+            word = self._pick(rng, *compiled[word]) if word in compiled else ""
+            if not word:
+                if sentence:
+                    output.append(" ".join(sentence).rstrip(".") + ".")
+                    written += len(sentence)
+                    sentence = []
+                if single_sentence:
+                    break
+                word = START
+                continue
+            sentence.append(word)
+        if sentence:
+            output.append(" ".join(sentence))
+        return " ".join(output)
+
+    def case(self, rng: random.Random, number: int, category: Optional[str] = None) -> Dict:
+        """One expert case (the fields _add_expert_case reads)."""
+        category = category or self.categories[
+            bisect.bisect(self._category_weights, rng.random() * self._category_weights[-1])
+        ]
+        stats = self.profile["categories"][category]
+        title = self.text(rng, stats["title_chain"], (category, "title"), rng.choice(stats["title_words"]), True)
+        return {
+            "case_id": f"SYN_{number:09d}",
+            "title": title.rstrip(".") or f"Synthetic {category} case {number}",
+            "content": self.text(rng, stats["content_chain"], (category, "content"), rng.choice(stats["content_words"])),
+            "category": category,
+            "technology": self._weighted(rng, stats["technologies"]),
+            "level": "expert",
+            "quality_score": rng.choice(stats["quality_scores"]) if stats["quality_scores"] else 85
+        }
+
+    def tac_record(self, rng: random.Random, number: int) -> Dict:
+        """One TAC-style troubleshooting record (title, symptoms, root cause, steps, commands)."""
+        tac = self.profile["tac"]
+        commands = {
+            platform: rng.sample(lines, min(len(lines), rng.randint(2, 4)))
+            for platform, lines in tac["commands"].items() if lines and rng.random() < 0.6
+        }
+        tags = sorted(tac["tags"])
+        return {
+            "case_id": f"TAC-SYN-{number:09d}",
+            "title": self.text(rng, tac["title_chain"], ("tac", "title"), rng.randint(5, 10), True).rstrip("."),
+            "category": self._weighted(rng, tac["categories"]),
+            "severity": self._weighted(rng, tac["severities"]),
+            "symptoms": [self.text(rng, tac["symptom_chain"], ("tac", "symptom"), rng.randint(5, 12), True).rstrip(".")
+                         for _ in range(rng.randint(2, 4))],
+            "initial_troubleshooting": rng.sample(tac["steps"], min(len(tac["steps"]), 3)),
+            "root_cause": self.text(rng, tac["cause_chain"], ("tac", "cause"), rng.randint(8, 16), True).rstrip("."),
+            "solution_steps": rng.sample(tac["steps"], min(len(tac["steps"]), 3)),
+            "commands_tested": commands,
+            "success_rate": f"{rng.randint(70, 99)}% (based on {rng.randint(3, 40)} similar cases)",
+            "tags": rng.sample(tags, min(len(tags), rng.randint(2, 5))),
+            "quality_score": round(rng.uniform(7.0, 9.8), 1),
+            "confidence": rng.randint(80, 98)
+        }
+
+
+def _write_items(f, items: Iterator[Dict]) -> int:
+    """Stream a JSON array body; returns the number of items written."""
+    count = 0
+    for count, item in enumerate(items, 1):
+        f.write(("\n" if count == 1 else ",\n") + json.dumps(item))
+    return count
+
+
+def write_file(path: str, shape: str, generator: CorpusGenerator, rng: random.Random,
+               first: int, count: int) -> None:
+    """One corpus file of `count` cases numbered from `first`, in the given shape."""
+    if shape == "knowledge":
+        # All cases of a knowledge file share the category it is keyed by
+        category = rng.choice(generator.categories)
+        items = (generator.case(rng, number, category) for number in range(first, first + count))
+    elif shape == "tac":
+        items = (generator.tac_record(rng, number) for number in range(first, first + count))
+    else:
+        items = (generator.case(rng, number) for number in range(first, first + count))
+
+    with open(path, "w", encoding="utf-8") as f:
+        if shape in ("list", "tac"):
+            f.write("[")
+            _write_items(f, items)
+            f.write("\n]\n")
+        elif shape == "knowledge":
+            f.write('{"expert_knowledge": {' + json.dumps(category) + ": [")
+            _write_items(f, items)
+            f.write("\n]}}\n")
+        elif shape == "keyed":
+            f.write('{"metadata": ' + json.dumps({"source": "synthetic", "first_case": first}) + ', "expert_cases": [')
+            _write_items(f, items)
+            f.write("\n]}\n")
+        else:
+            f.write("{" + json.dumps({"training": "expert_training_cases", "data": "data"}[shape]) + ": [")
+            _write_items(f, items)
+            f.write("\n]}\n")
+
+
+_worker_generator = None
+
+
+def _init_worker(profile: Dict) -> None:
+    """Worker initializer: build the generator (and its compiled chains) once per process."""
+    global _worker_generator
+    _worker_generator = CorpusGenerator(profile)
+
+
+def _write_job(job) -> str:
+    """Worker entry point: (output_dir, seed, index, shape, first, count)."""
+    output_dir, seed, index, shape, first, count = job
+    path = os.path.join(output_dir, f"synthetic_{index:05d}_{shape}.json")
+    write_file(path, shape, _worker_generator, random.Random(f"{seed}:{index}"), first, count)
+    return path
+
+
+def generate_corpus(output_dir: str, cases: int, profile: Dict, seed: int = 0,
+                    cases_per_file: int = 10000, shapes=SHAPES, workers: int = 1) -> List[str]:
+    """
+    Write `cases` synthetic cases into output_dir, rotating through `shapes` per file.
+    Each file is seeded from (seed, file index), so files can be written in parallel
+    (or regenerated alone) and the output does not depend on `workers`.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = [
+        (output_dir, seed, index, shapes[index % len(shapes)], first, min(cases_per_file, cases - first))
+        for index, first in enumerate(range(0, cases, cases_per_file))
+    ]
+    if workers <= 1:
+        _init_worker(profile)
+        return [_write_job(job) for job in jobs]
+
+    # The profile is sent to each worker once, not pickled into every job
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(profile,)) as pool:
+        return list(pool.map(_write_job, jobs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deterministic synthetic expert corpus generator")
+    parser.add_argument("--cases", type=int, default=100000)
+    parser.add_argument("--output", required=True, help="directory to write corpus files into")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cases-per-file", type=int, default=10000)
+    parser.add_argument("--shapes", nargs="+", choices=SHAPES, default=list(SHAPES))
+    parser.add_argument("--workers", type=int, default=1, help="processes writing files in parallel")
+    parser.add_argument("--source", default=DEFAULT_SOURCE, help="real corpus to measure")
+    parser.add_argument("--profile", default=None, help="use a saved profile instead of measuring")
+    parser.add_argument("--save-profile", default=None, help="write the measured profile here")
+    args = parser.parse_args()
+
+    if args.profile:
+        with open(args.profile, "r", encoding="utf-8") as f:
+            profile = json.load(f)
+    else:
+        profile = measure_profile(args.source)
+    if args.save_profile:
+        with open(args.save_profile, "w", encoding="utf-8") as f:
+            json.dump(profile, f)
+
+    start = time.perf_counter()
+    paths = generate_corpus(args.output, args.cases, profile, args.seed, args.cases_per_file, args.shapes,
+                            args.workers)
+    elapsed = time.perf_counter() - start
+    size = sum(os.path.getsize(path) for path in paths)
+    print(f"🧬 Wrote {args.cases} cases in {len(paths)} files ({size / 2 ** 20:.1f} MB) "
+          f"to {args.output} in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
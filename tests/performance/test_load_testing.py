@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+📈 Open-Loop Load Test
+Drives /ask, /search and /health at target arrival rates described by a scenario
+file (tests/performance/scenarios/*.json) against the app running on a local
+provider simulator. Requests are sent on schedule whether or not earlier ones
+have finished, and latency is measured from the scheduled send time, so a slow
+server shows up as latency instead of as a lower request rate.
+
+Each scenario is a list of stages (arrival rate x duration); a stage that misses
+the scenario's SLO (p99, error rate) or cannot keep up with the offered rate
+(latency keeps growing while the stage runs) marks the saturation point. Results go to stdout as a text summary and, with
+--output, to a JSON report.
+
+Usage: python tests/performance/test_load_testing.py tests/performance/scenarios/mixed_ramp.json
+           [--server uvicorn|gunicorn | --base-url http://host:port] [--output report.json]
+           [--rate-scale 1.0] [--duration-scale 1.0]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import aiohttp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SCENARIO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scenarios")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_asgi_vs_wsgi import server_env, wait_until_healthy
+from stub_provider import start_stub_server
+
+# A stage is saturated when an endpoint's requests sent in its last third wait this
+# many times longer than those sent in its first third - the server is building a queue
+LATENCY_GROWTH_LIMIT = 2.0
+# Fewer successful requests than this in either third and the growth is not measured
+LATENCY_GROWTH_MIN_SAMPLES = 5
+
+SCENARIO_DEFAULTS = {
+    "description": "",
+    "arrival": "poisson",
+    "seed": None,
+    "timeout": 60,
+    "slo": {"p99_ms": 5000, "error_rate": 0.01},
+    "provider": {"latency_ms": 1000},
+    "server_env": {},
+    "queries": ["How do I troubleshoot BGP neighbor flapping?"]
+}
+
+
+def load_scenario(path: str) -> Dict:
+    """Read a scenario file and fill in defaults."""
+    with open(path, "r", encoding="utf-8") as f:
+        scenario = dict(SCENARIO_DEFAULTS, **json.load(f))
+    scenario.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+    if scenario["arrival"] not in ("poisson", "constant"):
+        raise ValueError(f"{path}: arrival must be 'poisson' or 'constant'")
+    if not scenario.get("stages") or not scenario.get("mix"):
+        raise ValueError(f"{path}: scenario needs 'stages' and 'mix'")
+    return scenario
+
+
+def render(template, query: str, n: int):
+    """Fill {query} and {n} in a request body template."""
+    if isinstance(template, str):
+        return template.replace("{query}", query).replace("{n}", str(n))
+    if isinstance(template, dict):
+        return {key: render(value, query, n) for key, value in template.items()}
+    if isinstance(template, list):
+        return [render(value, query, n) for value in template]
+    return template
+
+
+def arrival_offsets(rate: float, duration: float, arrival: str, rng: random.Random) -> List[float]:
+    """Send times (seconds from stage start) for one stage."""
+    if rate <= 0:
+        return []
+    if arrival == "constant":
+        return [i / rate for i in range(int(rate * duration))]
+    offsets, t = [], rng.expovariate(rate)
+    while t < duration:
+        offsets.append(t)
+        t += rng.expovariate(rate)
+    return offsets
+
+
+def percentile(ordered: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered) + 0.5)) - 1))]
+
+
+def summarize(records: List[Dict], elapsed: float) -> Dict:
+    """Throughput, latency percentiles and errors for a set of request records."""
+    latencies = sorted(record["latency"] for record in records if record["outcome"] == "ok")
+    errors = Counter(record["outcome"] for record in records if record["outcome"] != "ok")
+    to_ms = lambda seconds: round(seconds * 1000, 1) if seconds is not None else None
+    return {
+        "requests": len(records),
+        "ok": len(latencies),
+        "errors": dict(errors),
+        "error_rate": round(sum(errors.values()) / len(records), 4) if records else 0.0,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": to_ms(percentile(latencies, 0.50)),
+        "p95_ms": to_ms(percentile(latencies, 0.95)),
+        "p99_ms": to_ms(percentile(latencies, 0.99)),
+        "max_ms": to_ms(latencies[-1] if latencies else None)
+    }
+
+
+def latency_growth(records: List[Dict], start: float, duration: float) -> Optional[float]:
+    """Median latency of the stage's last third over its first third (None if either has too few samples)."""
+    thirds = defaultdict(list)
+    for record in records:
+        if record["outcome"] == "ok":
+            thirds[min(2, int(3 * (record["scheduled"] - start) / duration))].append(record["latency"])
+    if min(len(thirds[0]), len(thirds[2])) < LATENCY_GROWTH_MIN_SAMPLES:
+        return None
+    first, last = (percentile(sorted(thirds[part]), 0.5) for part in (0, 2))
+    return round(last / first, 2) if first else None
+
+
+async def send(session: aiohttp.ClientSession, base_url: str, request: Dict, scheduled: float,
+               timeout: float) -> Dict:
+    """One request; latency runs from the scheduled send time, not the actual one."""
+    loop = asyncio.get_running_loop()
+    lag = loop.time() - scheduled
+    try:
+        async with session.request(
+            request["method"], f"{base_url}{request['path']}", json=request.get("body"),
+            timeout=aiohttp.ClientTimeout(total=timeout)
+        ) as response:
+            await response.read()
+            outcome = "ok" if response.status == 200 else f"http_{response.status}"
+    except asyncio.TimeoutError:
+        outcome = "timeout"
+    except aiohttp.ClientError:
+        outcome = "connection"
+    return {"name": request["name"], "outcome": outcome, "latency": loop.time() - scheduled, "lag": lag,
+            "scheduled": scheduled}
+
+
+async def run_stage(session: aiohttp.ClientSession, base_url: str, scenario: Dict, stage: Dict,
+                    rng: random.Random, counter) -> Dict:
+    """Offer one stage's arrival rate, then wait for its stragglers."""
+    loop = asyncio.get_running_loop()
+    mix = scenario["mix"]
+    weights = [entry.get("weight", 1) for entry in mix]
+    offsets = arrival_offsets(stage["rate"], stage["duration"], scenario["arrival"], rng)
+
+    tasks = []
+    in_flight = peak_in_flight = 0
+
+    def finished(_):
+        nonlocal in_flight
+        in_flight -= 1
+
+    start = loop.time()
+    for offset in offsets:
+        delay = start + offset - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        entry = rng.choices(mix, weights)[0]
+        request = {
+            "name": entry.get("name", entry["path"]),
+            "method": entry.get("method", "POST"),
+            "path": entry["path"],
+            "body": render(entry.get("body"), rng.choice(scenario["queries"]), next(counter))
+        }
+        task = asyncio.ensure_future(send(session, base_url, request, start + offset, scenario["timeout"]))
+        task.add_done_callback(finished)
+        tasks.append(task)
+        in_flight += 1
+        peak_in_flight = max(peak_in_flight, in_flight)
+
+    records = list(await asyncio.gather(*tasks)) if tasks else []
+    elapsed = max(stage["duration"], loop.time() - start)
+
+    by_endpoint = defaultdict(list)
+    for record in records:
+        by_endpoint[record["name"]].append(record)
+
+    lags = sorted(record["lag"] for record in records)
+    endpoints = {}
+    for name, group in sorted(by_endpoint.items()):
+        endpoints[name] = summarize(group, elapsed)
+        endpoints[name]["latency_growth"] = latency_growth(group, start, stage["duration"])
+    growths = [endpoint["latency_growth"] for endpoint in endpoints.values() if endpoint["latency_growth"]]
+    result = {
+        "rate": stage["rate"],
+        "duration": stage["duration"],
+        "offered_rps": round(len(offsets) / stage["duration"], 2),
+        "elapsed_s": round(elapsed, 2),
+        "peak_in_flight": peak_in_flight,
+        "send_lag_p99_ms": round(percentile(lags, 0.99) * 1000, 1) if lags else None,
+        "latency_growth": max(growths) if growths else None
+    }
+    result.update(summarize(records, elapsed))
+    result["endpoints"] = endpoints
+    return result
+
+
+def saturation_reasons(stage: Dict, slo: Dict) -> List[str]:
+    """Why a stage counts as saturated (empty if it kept up within the SLO)."""
+    reasons = []
+    for name, endpoint in stage["endpoints"].items():
+        if endpoint["latency_growth"] is not None and endpoint["latency_growth"] > LATENCY_GROWTH_LIMIT:
+            reasons.append(f"{name} latency grew {endpoint['latency_growth']}x during the stage")
+    if stage["error_rate"] > slo.get("error_rate", 1.0):
+        reasons.append(f"error rate {stage['error_rate']:.2%} > {slo['error_rate']:.2%}")
+    if slo.get("p99_ms") is not None and (stage["p99_ms"] is None or stage["p99_ms"] > slo["p99_ms"]):
+        reasons.append(f"p99 {stage['p99_ms']}ms > {slo['p99_ms']}ms")
+    return reasons
+
+
+async def run_scenario(scenario: Dict, base_url: str) -> Dict:
+    """Run every stage in order and locate the saturation point."""
+    rng = random.Random(scenario["seed"])
+    counter = iter(range(10 ** 12))
+    stages = []
+
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        for stage in scenario["stages"]:
+            result = await run_stage(session, base_url, scenario, stage, rng, counter)
+            result["saturated_by"] = saturation_reasons(result, scenario["slo"])
+            stages.append(result)
+
+    saturated = next((stage for stage in stages if stage["saturated_by"]), None)
+    sustained = [stage["rate"] for stage in stages[:stages.index(saturated) if saturated else len(stages)]]
+    return {
+        "scenario": scenario["name"],
+        "description": scenario["description"],
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "base_url": base_url,
+        "arrival": scenario["arrival"],
+        "slo": scenario["slo"],
+        "provider": scenario["provider"],
+        "stages": stages,
+        "saturation": {"rate": saturated["rate"], "reasons": saturated["saturated_by"]} if saturated else None,
+        "max_sustained_rate": max(sustained) if sustained else None
+    }
+
+
+def format_report(report: Dict) -> str:
+    """Human-readable summary of a report."""
+    lines = [
+        f"📈 LOAD TEST: {report['scenario']} ({report['arrival']} arrivals against {report['base_url']})",
+        "=" * 100,
+        f"{'rate':>7} {'offered':>8} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} "
+        f"{'errors':>7} {'peak':>6}  status"
+    ]
+    for stage in report["stages"]:
+        lines.append(
+            f"{stage['rate']:>7} {stage['offered_rps']:>8} {stage['throughput_rps']:>8} "
+            f"{str(stage['p50_ms']):>9} {str(stage['p95_ms']):>9} {str(stage['p99_ms']):>9} "
+            f"{str(stage['max_ms']):>9} {stage['error_rate']:>7.2%} {stage['peak_in_flight']:>6}  "
+            + ("❌ " + "; ".join(stage["saturated_by"]) if stage["saturated_by"] else "✅")
+        )
+        for name, endpoint in stage["endpoints"].items():
+            lines.append(
+                f"{'':>7} {name:>8} {endpoint['throughput_rps']:>8} {str(endpoint['p50_ms']):>9} "
+                f"{str(endpoint['p95_ms']):>9} {str(endpoint['p99_ms']):>9} {str(endpoint['max_ms']):>9} "
+                f"{endpoint['error_rate']:>7.2%}" + (f"  {endpoint['errors']}" if endpoint["errors"] else "")
+            )
+    lines.append("-" * 100)
+    if report["saturation"]:
+        lines.append(f"Saturation at {report['saturation']['rate']} req/s; "
+                     f"max sustained rate {report['max_sustained_rate']} req/s")
+    else:
+        lines.append(f"No saturation up to {report['max_sustained_rate']} req/s")
+    return "\n".join(lines)
+
+
+SERVER_COMMANDS = {
+    "uvicorn": lambda port: [
+        sys.executable, "-m", "uvicorn", "global_asgi:app",
+        "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"
+    ],
+    "gunicorn": lambda port: [
+        sys.executable, "-m", "gunicorn", "--bind", f"127.0.0.1:{port}", "--workers", "2",
+        "--threads", "16", "--worker-class", "gthread", "--timeout", "120", "global_api:app"
+    ]
+}
+
+
+def start_provider(provider: Dict):
+    """Local provider simulator configured from a scenario's `provider` block (times in ms)."""
+    options = dict(provider)
+    latency = options.pop("latency_ms", 0) / 1000
+    handshake = options.pop("handshake_ms", 0) / 1000
+    if options.get("latency_p99_ms") is not None:
+        options["latency_p99"] = options.pop("latency_p99_ms") / 1000
+    return start_stub_server(handshake_delay=handshake, latency=latency, **options)
+
+
+def run(scenario: Dict, server: str = "uvicorn", port: int = 8765, base_url: Optional[str] = None) -> Dict:
+    """Run a scenario against `base_url`, or against the app started locally on the simulator."""
+    if base_url:
+        return asyncio.run(run_scenario(scenario, base_url))
+
+    stub = start_provider(scenario["provider"])
+    env = server_env(f"http://127.0.0.1:{stub.server_address[1]}", pool_size=1000)
+    env.update({"GROQ_FAST_KEY": "load-test", "GROQ_CODING_KEY": "load-test",
+                "DEEPSEEK_KEY": "load-test", "QWEN_KEY": "load-test"})
+    env.update({key: str(value) for key, value in scenario["server_env"].items()})
+
+    base_url = f"http://127.0.0.1:{port}"
+    process = subprocess.Popen(SERVER_COMMANDS[server](port), cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        asyncio.run(wait_until_healthy(base_url, timeout=120))
+        report = asyncio.run(run_scenario(scenario, base_url))
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+        stub.shutdown()
+
+    report["server"] = server
+    report["provider_stats"] = stub.simulator.snapshot()
+    return report
+
+
+def test_smoke_scenario():
+    """The smoke scenario runs end to end against the ASGI app without errors."""
+    scenario = load_scenario(os.path.join(SCENARIO_DIR, "smoke.json"))
+    report = run(scenario, server="uvicorn", port=8791)
+
+    stage = report["stages"][0]
+    assert stage["requests"] == 10
+    assert stage["error_rate"] == 0
+    assert set(stage["endpoints"]) <= {"ask", "search", "health"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-loop load test driven by scenario files")
+    parser.add_argument("scenarios", nargs="+", help="scenario JSON files")
+    parser.add_argument("--server", choices=sorted(SERVER_COMMANDS), default="uvicorn",
+                        help="how to start the app locally on the provider simulator")
+    parser.add_argument("--base-url", default=None, help="test an already running app instead")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rate-scale", type=float, default=1.0, help="multiply every stage's rate")
+    parser.add_argument("--duration-scale", type=float, default=1.0, help="multiply every stage's duration")
+    parser.add_argument("--output", default=None, help="write the JSON report here")
+    args = parser.parse_args()
+
+    reports = []
+    for path in args.scenarios:
+        scenario = load_scenario(path)
+        scenario["stages"] = [
+            {"rate": stage["rate"] * args.rate_scale, "duration": stage["duration"] * args.duration_scale}
+            for stage in scenario["stages"]
+        ]
+        report = run(scenario, args.server, args.port, args.base_url)
+        print(format_report(report))
+        print()
+        reports.append(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(reports if len(reports) > 1 else reports[0], f, indent=2)
+        print(f"💾 Report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Admission control tests - per-lane shedding and slots held until streamed bodies finish.
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT)
+
+import admission
+from admission import AdmissionController, ASGIAdmissionMiddleware, WSGIAdmissionMiddleware
+
+LANES = {
+    "chat": {"max_in_flight": 2, "latency_target": 1.0},
+    "cheap": {"max_in_flight": 10, "latency_target": None}
+}
+
+
+@pytest.fixture(autouse=True)
+def enabled(monkeypatch):
+    monkeypatch.setattr(admission, "ADMISSION_ENABLED", True)
+    monkeypatch.setattr(admission, "ADMISSION_MIN_IN_FLIGHT", 1)
+
+
+def test_concurrency_limit_per_lane():
+    controller = AdmissionController(LANES)
+    assert controller.try_admit("chat") is None
+    assert controller.try_admit("chat") is None
+    assert controller.try_admit("chat") == 1.0
+    assert controller.try_admit("cheap") is None  # other lanes keep serving
+
+    controller.release("chat", 0.1)
+    assert controller.try_admit("chat") is None
+
+
+def test_latency_over_target_sheds_until_it_recovers():
+    controller = AdmissionController(LANES)
+    controller.try_admit("chat")
+    controller.release("chat", 4.0)
+
+    assert controller.try_admit("chat") is None  # below ADMISSION_MIN_IN_FLIGHT it still admits
+    assert controller.try_admit("chat") == 4.0
+    for _ in range(20):
+        controller.release("chat", 0.1)
+        controller.try_admit("chat")
+    assert controller.stats()["lanes"]["chat"]["ewma_latency"] < 1.0
+
+
+def test_long_proxy_queue_wait_is_shed():
+    controller = AdmissionController(LANES)
+    assert controller.try_admit("cheap", queue_wait=admission.ADMISSION_MAX_QUEUE_WAIT + 1) is not None
+    assert controller.try_admit("cheap", queue_wait=0.1) is None
+
+
+def test_wsgi_slot_is_held_until_the_streamed_body_is_closed():
+    controller = AdmissionController(LANES)
+
+    def app(environ, start_response):
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return iter([b"one", b"two"])
+
+    middleware = WSGIAdmissionMiddleware(app, controller, {"/ask": "chat"})
+    statuses = []
+    start_response = lambda status, headers, exc_info=None: statuses.append(status)
+
+    first = middleware({"PATH_INFO": "/ask", "REQUEST_METHOD": "POST"}, start_response)
+    middleware({"PATH_INFO": "/ask", "REQUEST_METHOD": "POST"}, start_response)
+    rejected = middleware({"PATH_INFO": "/ask", "REQUEST_METHOD": "POST"}, start_response)
+
+    assert statuses[-1].startswith("503") and b"overloaded" in b"".join(rejected)
+    assert list(first) == [b"one", b"two"]
+    assert controller.stats()["lanes"]["chat"]["in_flight"] == 2  # sent, but not closed yet
+    first.close()
+    assert controller.stats()["lanes"]["chat"]["in_flight"] == 1
+
+
+def test_asgi_slot_is_released_after_the_response_even_on_error():
+    controller = AdmissionController(LANES)
+    sent = []
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        assert controller.stats()["lanes"]["chat"]["in_flight"] == 1
+        raise RuntimeError("handler failed")
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = ASGIAdmissionMiddleware(app, controller, {"/ask": "chat"})
+    with pytest.raises(RuntimeError):
+        asyncio.run(middleware({"type": "http", "path": "/ask", "method": "POST", "headers": []}, None, send))
+
+    assert sent[0]["status"] == 200
+    assert controller.stats()["lanes"]["chat"]["in_flight"] == 0
@@ -0,0 +1,39 @@
+"""
+ASGI streaming tests - a stalled /ask/stream ends with the same timeout event as the Flask app.
+"""
+
+import asyncio
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT)
+
+import global_asgi
+
+
+def test_stalled_stream_times_out_and_is_closed(monkeypatch):
+    closed = []
+
+    async def stalled_stream(message, session_id=None, max_tokens=1000):
+        try:
+            yield "start", {"session_id": "stalled"}
+            await asyncio.sleep(5)
+            yield "done", {}
+        finally:
+            closed.append(True)
+
+    monkeypatch.setattr(global_asgi, "process_message_stream", stalled_stream)
+    monkeypatch.setattr(global_asgi, "REQUEST_TIMEOUT", 0.05)
+
+    async def scenario():
+        client = global_asgi.app.test_client()
+        response = await client.post("/ask/stream", json={"query": "OSPF stuck?"})
+        return await response.get_data(as_text=True)
+
+    body = asyncio.run(scenario())
+
+    assert body.startswith("event: start")
+    assert "event: error" in body and "Operation timed out after 0.05s" in body
+    assert "event: done" not in body
+    assert closed == [True]
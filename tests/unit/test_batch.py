@@ -0,0 +1,113 @@
+"""
+Batch isolation tests - batch items never share executions or admission state with interactive chat.
+"""
+
+import asyncio
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT)
+
+import global_api
+from admission import LANES, AdmissionController
+from rate_limiter import PRIORITY_BATCH
+from singleflight import SingleFlight
+
+
+def test_interactive_turn_does_not_join_a_batch_execution():
+    messages = [{"role": "system", "content": "sys"}, {"role": "user", "content": "What is BGP?"}]
+    batch_key = global_api.coalescing_key("What is BGP?", "groq_fast", 1000, messages, PRIORITY_BATCH)
+    interactive_key = global_api.coalescing_key("what is  bgp?", "groq_fast", 1000, messages)
+    assert batch_key != interactive_key
+    assert interactive_key == global_api.coalescing_key("What is BGP?", "groq_fast", 1000, messages)
+
+    async def scenario():
+        flight = SingleFlight("test")
+        gate = asyncio.Event()
+
+        async def answer(source):
+            await gate.wait()
+            return source
+
+        batch = asyncio.ensure_future(flight.do(batch_key, lambda: answer("batch")))
+        await asyncio.sleep(0)
+        interactive = asyncio.ensure_future(flight.do(interactive_key, lambda: answer("interactive")))
+        await asyncio.sleep(0)
+        gate.set()
+        return await batch, await interactive
+
+    assert asyncio.run(scenario()) == (("batch", False), ("interactive", False))
+
+
+def test_long_batches_do_not_shed_chat():
+    assert global_api.ADMISSION_ROUTES["/ask/batch"] == "batch"
+    assert LANES["batch"]["latency_target"] is None
+
+    controller = AdmissionController()
+    for _ in range(4):
+        assert controller.try_admit("chat") is None
+    assert controller.try_admit("batch") is None
+    controller.release("batch", 90.0)
+
+    assert controller.try_admit("chat") is None
+    assert controller.stats()["lanes"]["chat"]["ewma_latency"] is None
+
+
+def test_cancelled_batch_leaves_no_upstream_calls_running(monkeypatch):
+    running = []
+
+    async def fake_generate(message, messages, provider_key, max_tokens, retrieval=None, priority=None):
+        running.append(message)
+        try:
+            await asyncio.sleep(5)
+        finally:
+            running.remove(message)
+
+    monkeypatch.setattr(global_api, "generate_answer", fake_generate)
+    monkeypatch.setattr(global_api, "RAG_AVAILABLE", False)
+    items = [{"index": index, "id": index, "query": f"question {index}"} for index in range(20)]
+
+    async def scenario():
+        async def consume():
+            async for _ in global_api.process_batch(items):
+                pass
+
+        consumer = asyncio.ensure_future(consume())
+        await asyncio.sleep(0.1)
+        peak = len(running)
+        consumer.cancel()
+        await asyncio.gather(consumer, return_exceptions=True)
+        return peak, len(running), global_api.chat_flight.in_flight()
+
+    peak, still_running, in_flight = asyncio.run(scenario())
+
+    assert peak == global_api.BATCH_CONCURRENCY
+    assert still_running == 0
+    assert in_flight == 0
+
+
+def test_timed_out_items_stop_before_freeing_their_slot(monkeypatch):
+    running, peaks = [], []
+
+    async def fake_generate(message, messages, provider_key, max_tokens, retrieval=None, priority=None):
+        running.append(message)
+        peaks.append(len(running))
+        try:
+            await asyncio.sleep(5)
+        finally:
+            running.remove(message)
+
+    monkeypatch.setattr(global_api, "generate_answer", fake_generate)
+    monkeypatch.setattr(global_api, "RAG_AVAILABLE", False)
+    monkeypatch.setattr(global_api, "BATCH_ITEM_TIMEOUT", 0.02)
+    items = [{"index": index, "id": index, "query": f"question {index}"} for index in range(20)]
+
+    async def scenario():
+        return [result async for result in global_api.process_batch(items)]
+
+    results = asyncio.run(scenario())
+
+    assert results[-1]["timeout"] == 20
+    assert max(peaks) <= global_api.BATCH_CONCURRENCY
+    assert not running
@@ -0,0 +1,81 @@
+"""
+Conversation history tests - compaction to a token budget, summaries and expert-section stripping.
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT)
+
+from conversation_history import (
+    ENHANCED_RESPONSE_HEADER, EXPERT_SECTION_MARKER, SummaryCache,
+    compact_history, extractive_summary, message_tokens, strip_expert_boilerplate
+)
+
+LONG_ANSWER = " ".join(
+    f"Step {step}: check the BGP neighbor state and the interface MTU on router {step}." for step in range(40)
+)
+
+
+def conversation(turns):
+    history = []
+    for turn in range(turns):
+        history.append({"role": "user", "content": f"Question {turn} about BGP neighbors flapping?"})
+        history.append({"role": "assistant", "content": LONG_ANSWER})
+    history.append({"role": "user", "content": "And what about OSPF?"})
+    return history
+
+
+def test_short_history_is_sent_unchanged():
+    history = conversation(1)
+    messages, stats = compact_history(history, token_budget=5000)
+
+    assert messages == history
+    assert stats["messages_summarized"] == stats["messages_dropped"] == 0
+    assert stats["history_tokens"] == message_tokens(history)
+
+
+def test_long_history_is_compacted_to_the_budget():
+    history = conversation(10)
+    messages, stats = compact_history(history, token_budget=1000, recent_messages=4)
+
+    assert stats["history_tokens"] <= 1000 < stats["history_tokens_original"]
+    assert message_tokens(messages) == stats["history_tokens"]
+    assert messages[-1] == history[-1]
+    assert messages[-2] == history[-2]  # recent turns stay verbatim
+    assert any(message["content"].startswith("(earlier, summarized)") for message in messages)
+    assert stats["messages_dropped"] == len(history) - len(messages) > 0
+
+
+def test_current_question_is_always_sent():
+    history = [{"role": "user", "content": "x" * 8000}]
+    messages, stats = compact_history(history, token_budget=100)
+
+    assert messages == history
+    assert stats["history_tokens"] > 100
+
+
+def test_expert_sections_are_left_out():
+    answer = f"{ENHANCED_RESPONSE_HEADER}Match the MTU.{EXPERT_SECTION_MARKER}\nLong expert appendix"
+    assert strip_expert_boilerplate(answer) == "Match the MTU."
+
+    messages, _ = compact_history([
+        {"role": "user", "content": "OSPF stuck?"},
+        {"role": "assistant", "content": answer},
+        {"role": "user", "content": "Thanks"}
+    ])
+    assert messages[1]["content"] == "Match the MTU."
+
+
+def test_summaries_are_extractive_and_cached():
+    summary = extractive_summary(LONG_ANSWER, sentences=2)
+    sentences = summary.split(". ")
+    assert len(sentences) == 2 and all(sentence.rstrip(".") in LONG_ANSWER for sentence in sentences)
+
+    cache = SummaryCache(max_entries=1)
+    cache.summarize(LONG_ANSWER)
+    cache.summarize(LONG_ANSWER)
+    cache.summarize("Another answer. With a few sentences of its own here. And one more sentence.")
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert len(cache._entries) == 1
@@ -0,0 +1,86 @@
+"""
+Hedged request tests - hedge timing, the hedge budget and cancelling the losing call.
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT)
+
+import hedging
+from hedging import HedgeBudget, LatencyTracker, call_hedged
+
+
+@pytest.fixture(autouse=True)
+def fast_hedges(monkeypatch):
+    monkeypatch.setattr(hedging, "HEDGING_ENABLED", True)
+    monkeypatch.setattr(hedging, "HEDGE_DEFAULT_DELAY", 0.05)
+    monkeypatch.setattr(hedging, "HEDGE_MIN_DELAY", 0.01)
+    monkeypatch.setattr(hedging, "latency_tracker", LatencyTracker())
+    monkeypatch.setattr(hedging, "hedge_budget", HedgeBudget(ratio=0.1, burst=1))
+
+
+def provider(name, seconds, events, success=True):
+    async def call():
+        events.append(f"{name} started")
+        try:
+            await asyncio.sleep(seconds)
+        except asyncio.CancelledError:
+            events.append(f"{name} cancelled")
+            raise
+        return {"success": success, "provider": name}
+    return call
+
+
+def test_fast_primary_is_not_hedged():
+    events = []
+    result, hedged = asyncio.run(call_hedged("primary", provider("primary", 0, events), "backup",
+                                             provider("backup", 0, events)))
+
+    assert (result["provider"], hedged) == ("primary", False)
+    assert events == ["primary started"]
+
+
+def test_slow_primary_is_hedged_and_the_loser_cancelled():
+    events = []
+    result, hedged = asyncio.run(call_hedged("primary", provider("primary", 5, events), "backup",
+                                             provider("backup", 0, events)))
+
+    assert (result["provider"], hedged) == ("backup", True)
+    assert events == ["primary started", "backup started", "primary cancelled"]
+
+
+def test_failed_backup_waits_for_the_primary():
+    events = []
+    result, hedged = asyncio.run(call_hedged("primary", provider("primary", 0.1, events), "backup",
+                                             provider("backup", 0, events, success=False)))
+
+    assert (result["provider"], hedged) == ("primary", True)
+
+
+def test_exhausted_budget_skips_the_hedge():
+    events = []
+
+    async def scenario():
+        await call_hedged("primary", provider("primary", 0.1, events), "backup", provider("backup", 0, events))
+        events.clear()
+        return await call_hedged("primary", provider("primary", 0.1, events), "backup", provider("backup", 0, events))
+
+    result, hedged = asyncio.run(scenario())
+
+    assert (result["provider"], hedged) == ("primary", False)
+    assert events == ["primary started"]
+
+
+def test_hedge_delay_follows_the_latency_percentile(monkeypatch):
+    monkeypatch.setattr(hedging, "HEDGE_MIN_SAMPLES", 10)
+    assert hedging.hedge_delay("primary") == 0.05  # too few samples - the default
+
+    for sample in range(1, 21):
+        hedging.latency_tracker.record("primary", sample / 10)
+
+    assert hedging.hedge_delay("primary") == pytest.approx(2.0)
@@ -0,0 +1,72 @@
+"""
+Metrics tests - per-thread recording, merging and the Prometheus text format.
+"""
+
+import os
+import sys
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT)
+
+import pytest
+
+import metrics
+
+
+@pytest.fixture
+def private_registry(monkeypatch):
+    """Metrics and collectors registered by a test disappear with it."""
+    monkeypatch.setattr(metrics, "_registry", {})
+    monkeypatch.setattr(metrics, "_collectors", [])
+
+
+def test_counts_from_finished_threads_are_kept():
+    counter = metrics.Counter("test_calls_total", "Calls")
+    histogram = metrics.Histogram("test_seconds", "Latency", buckets=(0.1, 1.0))
+
+    def record():
+        for _ in range(1000):
+            counter.inc(route="/ask")
+            histogram.observe(0.5, route="/ask")
+
+    threads = [threading.Thread(target=record) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    record()
+
+    assert counter.value(route="/ask") == 9000
+    assert histogram.snapshot() == {"route=/ask": {"count": 9000, "sum": 4500.0, "avg": 0.5}}
+    # Finished threads were folded into the retired total
+    assert len(counter._shards._shards) == 1
+
+
+def test_prometheus_exposition():
+    histogram = metrics.Histogram("request_seconds", "Request latency", buckets=(0.1, 1.0))
+    histogram.observe(0.05, route="/ask")
+    histogram.observe(0.1, route="/ask")
+    histogram.observe(3, route="/ask")
+    counter = metrics.Counter("errors_total", "Errors")
+    counter.inc(reason='say "hi"')
+
+    assert histogram.exposition("app_request_seconds") == [
+        'app_request_seconds_bucket{route="/ask",le="0.1"} 2',
+        'app_request_seconds_bucket{route="/ask",le="1.0"} 2',
+        'app_request_seconds_bucket{route="/ask",le="+Inf"} 3',
+        'app_request_seconds_sum{route="/ask"} 3.15',
+        'app_request_seconds_count{route="/ask"} 3'
+    ]
+    assert counter.exposition("errors_total") == ['errors_total{reason="say \\"hi\\""} 1']
+
+
+def test_render_runs_collectors_and_lists_every_metric(private_registry):
+    gauge = metrics.gauge("test_queue_depth", "Queued work")
+    metrics.on_collect(lambda: gauge.set(7))
+
+    text = metrics.render_prometheus()
+
+    name = f"{metrics.METRICS_NAMESPACE}_test_queue_depth" if metrics.METRICS_NAMESPACE else "test_queue_depth"
+    assert f"# TYPE {name} gauge\n{name} 7\n" in text
+    assert text.endswith("\n")
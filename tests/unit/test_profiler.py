@@ -0,0 +1,64 @@
+"""
+Sampling profiler tests - access control, limits and collapsed-stack output.
+"""
+
+import os
+import sys
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT)
+
+import profiler
+
+AUTH = "Bearer test-token"
+
+
+def test_disabled_by_default_and_token_required(monkeypatch):
+    assert profiler.handle_profile_request({}, AUTH)[1] == 404
+
+    monkeypatch.setattr(profiler, "PROFILER_ENABLED", True)
+    assert profiler.handle_profile_request({}, AUTH)[1] == 401  # no PROFILER_TOKEN configured
+
+    monkeypatch.setattr(profiler, "PROFILER_TOKEN", "test-token")
+    assert profiler.handle_profile_request({}, "Bearer wrong")[1] == 401
+    assert profiler.handle_profile_request({}, None)[1] == 401
+    assert profiler.handle_profile_request({"seconds": "1000"}, AUTH)[1] == 400
+    assert profiler.handle_profile_request({"seconds": "1", "hz": "abc"}, AUTH)[1] == 400
+
+
+def test_profile_reports_busy_thread_stacks(monkeypatch):
+    monkeypatch.setattr(profiler, "PROFILER_ENABLED", True)
+    monkeypatch.setattr(profiler, "PROFILER_TOKEN", "test-token")
+    stop = threading.Event()
+
+    def spin():
+        while not stop.is_set():
+            sum(range(1000))
+
+    worker = threading.Thread(target=spin, name="busy worker")
+    worker.start()
+    try:
+        body, status, headers = profiler.handle_profile_request({"seconds": "0.3", "hz": "50"}, AUTH)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert status == 200
+    assert headers["Content-Type"].startswith("text/plain")
+    assert 5 <= int(headers["X-Profile-Samples"]) <= 16
+    lines = body.splitlines()
+    stack, count = next(line for line in lines if line.startswith("busy_worker;")).rsplit(" ", 1)
+    assert stack.startswith("busy_worker;threading.py:_bootstrap;")
+    assert stack.endswith("test_profiler.py:spin")
+    assert int(count) > 0
+    # Idle (parked) threads are left out unless idle=1
+    assert not any(line.split(" ")[0].endswith("threading.py:wait") for line in lines)
+
+
+def test_one_profile_at_a_time(monkeypatch):
+    monkeypatch.setattr(profiler, "PROFILER_ENABLED", True)
+    monkeypatch.setattr(profiler, "PROFILER_TOKEN", "test-token")
+
+    with profiler._profile_lock:
+        assert profiler.handle_profile_request({"seconds": "0.1"}, AUTH)[1] == 409
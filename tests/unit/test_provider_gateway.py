@@ -0,0 +1,39 @@
+"""
+Provider gateway tests - ordered fallback and parallel races within one deadline.
+"""
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT)
+
+from provider_gateway import Deadline, ProviderAttemptError, call_with_fallback
+
+
+def failing(timeout):
+    raise ProviderAttemptError("HTTP 400: bad request")
+
+
+def test_fallback_reports_the_provider_that_answered():
+    result, winner, log = call_with_fallback([("first", failing), ("second", lambda timeout: "answer")], Deadline(30))
+
+    assert (result, winner) == ("answer", "second")
+    assert [(entry["provider"], entry["status"]) for entry in log] == [("first", "error"), ("second", "success")]
+
+
+def test_race_reports_the_winner_even_when_a_loser_also_succeeds():
+    def slow(timeout):
+        time.sleep(0.05)
+        return "slow answer"
+
+    # Under FALLBACK_PARALLEL_BELOW, so the providers are raced
+    result, winner, log = call_with_fallback([("slow", slow), ("fast", lambda timeout: "fast answer")], Deadline(5))
+
+    assert (result, winner) == ("fast answer", "fast")
+    assert all(entry["parallel"] for entry in log)
+
+
+def test_nothing_answers():
+    assert call_with_fallback([("only", failing)], Deadline(30))[:2] == (None, None)
@@ -0,0 +1,85 @@
+"""
+Provider router tests - EWMA health scoring and the open / half-open / closed circuit breaker.
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT)
+
+import provider_router
+from provider_router import CLOSED, HALF_OPEN, OPEN, ProviderRouter
+
+
+def fail(router, provider_key, times):
+    for _ in range(times):
+        router.record_failure(provider_key, "HTTP 500")
+
+
+def test_circuit_opens_after_a_failure_streak(monkeypatch):
+    monkeypatch.setattr(provider_router, "ROUTER_FAILURE_THRESHOLD", 3)
+    router = ProviderRouter({"primary": 1.0, "backup": 2.0})
+
+    fail(router, "primary", 2)
+    router.record_success("primary", 1.0)
+    fail(router, "primary", 2)
+    assert router.scores()["primary"]["status"] == CLOSED  # the success reset the streak
+
+    fail(router, "primary", 1)
+    assert router.scores()["primary"]["status"] == OPEN
+    assert not router.is_available("primary")
+    assert router.select(["primary", "backup"], latency_target=5) == "backup"
+
+
+def test_half_open_admits_one_probe_and_closes_on_success(monkeypatch):
+    monkeypatch.setattr(provider_router, "ROUTER_FAILURE_THRESHOLD", 1)
+    router = ProviderRouter({"primary": 1.0, "backup": 2.0})
+    fail(router, "primary", 1)
+
+    monkeypatch.setattr(provider_router, "ROUTER_OPEN_SECONDS", 0)
+    assert router.select(["primary", "backup"], latency_target=5) == "primary"  # the probe
+    assert router.scores()["primary"]["status"] == HALF_OPEN
+
+    monkeypatch.setattr(provider_router, "ROUTER_OPEN_SECONDS", 60)
+    assert router.select(["primary", "backup"], latency_target=5) == "backup"  # probe still in flight
+
+    router.record_success("primary", 1.0)
+    assert router.scores()["primary"]["status"] == CLOSED
+    assert router.select(["primary", "backup"], latency_target=5) == "primary"
+
+
+def test_failed_probe_reopens_immediately(monkeypatch):
+    monkeypatch.setattr(provider_router, "ROUTER_FAILURE_THRESHOLD", 5)
+    router = ProviderRouter({"primary": 1.0})
+    fail(router, "primary", 5)
+
+    monkeypatch.setattr(provider_router, "ROUTER_OPEN_SECONDS", 0)
+    router.select(["primary"], latency_target=5)
+    monkeypatch.setattr(provider_router, "ROUTER_OPEN_SECONDS", 60)
+    fail(router, "primary", 1)
+
+    assert router.scores()["primary"]["status"] == OPEN
+
+
+def test_routes_to_the_first_provider_meeting_the_latency_target():
+    router = ProviderRouter({"preferred": 1.0, "fast": 1.0})
+    for _ in range(20):
+        router.record_success("preferred", 10.0)
+
+    assert router.scores()["preferred"]["ewma_latency"] > 9
+    assert router.select(["preferred", "fast"], latency_target=3) == "fast"
+    assert router.select(["preferred", "fast"], latency_target=30) == "preferred"
+
+    # Errors inflate expected latency even when the successes are quick
+    router.record_failure("fast", "HTTP 500")
+    assert router.scores()["fast"]["expected_latency"] > router.scores()["fast"]["ewma_latency"]
+
+
+def test_every_circuit_open_falls_back_to_the_preferred_provider(monkeypatch):
+    monkeypatch.setattr(provider_router, "ROUTER_FAILURE_THRESHOLD", 1)
+    router = ProviderRouter({"primary": 1.0, "backup": 1.0})
+    fail(router, "primary", 1)
+    fail(router, "backup", 1)
+
+    assert router.select(["primary", "backup"], latency_target=5) == "primary"
@@ -0,0 +1,156 @@
+"""
+Expert RAG engine tests - retrieval stages on small on-disk corpora, real-shaped and synthetic.
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "tests", "performance"))
+
+from eval_retrieval import configure, evaluate
+from expert_rag_system import ExpertRAGSystem
+from synthetic_corpus import SHAPES, generate_corpus, measure_profile
+
+CASES = [
+    {"case_id": "bgp", "title": "BGP neighbor flapping", "category": "networking", "quality_score": 90,
+     "content": "BGP sessions flap when hold timers expire. Check interface errors and MTU on the path."},
+    {"case_id": "ospf", "title": "OSPF adjacency stuck", "category": "networking", "quality_score": 80,
+     "content": "OSPF neighbors stuck in EXSTART usually have an MTU mismatch. Best practice is to match MTU."},
+    {"case_id": "vpn", "title": "IPsec VPN tunnel down", "category": "cybersecurity", "quality_score": 85,
+     "content": "An IPsec tunnel that will not come up often has mismatched proposals. Verify the firewall allows IKE."},
+    {"case_id": "dns", "title": "DNS resolution failures", "category": "networking", "quality_score": 70,
+     "content": "Intermittent DNS failures are often caused by an unreachable resolver. Monitoring should alert on it."}
+]
+
+
+@pytest.fixture(scope="module")
+def rag(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("corpus")
+    with open(directory / "cases.json", "w", encoding="utf-8") as f:
+        json.dump({"expert_training_cases": CASES}, f)
+    return ExpertRAGSystem(str(directory))
+
+
+def test_corpus_is_indexed(rag):
+    assert [case["id"] for case in rag.knowledge_base] == ["bgp", "ospf", "vpn", "dns"]
+    assert rag.tfidf_matrix.shape[0] == len(CASES)
+
+
+def test_batch_search_matches_single_searches(rag):
+    queries = ["bgp neighbor flapping", "ipsec vpn firewall", "dns monitoring", "nothing relevant here"]
+    batch = rag.search_expert_knowledge_batch(queries, top_k=3)
+
+    assert len(batch) == len(queries)
+    for query, results in zip(queries, batch):
+        single = rag.search_expert_knowledge(query, top_k=3)
+        assert [(case["id"], case["relevance_score"]) for case in results] == \
+               [(case["id"], case["relevance_score"]) for case in single]
+    assert batch[0][0]["id"] == "bgp"
+
+
+def test_fusion_keeps_first_method_and_ranks(rag):
+    low = dict(rag.knowledge_base[3], relevance_score=0.2, search_method="tfidf")
+    high = dict(rag.knowledge_base[0], relevance_score=0.9, search_method="tfidf")
+    duplicate = dict(rag.knowledge_base[0], relevance_score=1.0, search_method="keywords")
+
+    fused = rag._fuse_results([low, high, duplicate], top_k=5)
+
+    assert [case["id"] for case in fused] == ["bgp", "dns"]
+    assert fused[0]["search_method"] == "tfidf"
+    assert len(rag._fuse_results([low, high], top_k=1)) == 1
+
+
+def test_profile_explains_the_same_ranking(rag):
+    plain = rag.search_expert_knowledge("bgp session over ipsec firewall", top_k=2)
+    results, explanation = rag.search_expert_knowledge("bgp session over ipsec firewall", top_k=2, profile=True)
+
+    assert [(case["id"], case["relevance_score"]) for case in results] == \
+           [(case["id"], case["relevance_score"]) for case in plain]
+    assert set(explanation["timings_ms"]) == {"tfidf", "semantic", "keywords", "fusion", "total"}
+    assert explanation["methods"]["semantic"] == {"available": False, "candidates": 0, "top_score": 0.0}
+    assert explanation["methods"]["keywords"]["candidates"] == 2
+
+    dedup = explanation["dedup"]
+    assert dedup["candidates"] == sum(method["candidates"] for method in explanation["methods"].values())
+    assert dedup["duplicates_dropped"] == dedup["candidates"] - dedup["unique"]
+    assert explanation["below_cutoff"] == dedup["unique"] - 2
+
+    top = explanation["ranking"][0]
+    assert [entry["id"] for entry in explanation["ranking"]] == [case["id"] for case in results]
+    assert top["final_score"] == pytest.approx(top["relevance_part"] + top["quality_part"], abs=1e-3)
+    assert top["search_method"] in top["matched_by"]
+
+
+def test_keyword_matches_score_by_shared_keywords(rag):
+    matches = rag._keyword_matches("bgp session over ipsec", min_score=0.1)
+    assert {case["id"] for case in matches} == {"bgp", "vpn"}
+    assert all(case["search_method"] == "keywords" for case in matches)
+
+
+def test_enhance_uses_supplied_cases_without_searching(rag, monkeypatch):
+    cases = rag.search_expert_knowledge("ospf mtu mismatch", top_k=2)
+    monkeypatch.setattr(rag, "search_expert_knowledge", lambda *args, **kwargs: pytest.fail("searched again"))
+
+    enhancement = rag.enhance_ai_response("ospf mtu mismatch", "Check the MTU.", "test", cases)
+
+    assert enhancement["expert_enhancement"]
+    assert enhancement["expert_sources"] == len(cases)
+    assert enhancement["enhanced_response"].startswith("📋 **Enhanced Expert Response:**")
+
+
+@pytest.fixture(scope="module")
+def profile():
+    return measure_profile()
+
+
+def test_synthetic_corpus_loads_in_every_shape(profile, tmp_path):
+    paths = generate_corpus(str(tmp_path), 600, profile, seed=3, cases_per_file=100)
+
+    assert sorted(path.rsplit("_", 1)[1][:-5] for path in paths) == sorted(SHAPES)
+    rag = ExpertRAGSystem(str(tmp_path))
+    assert len(rag.knowledge_base) == 600
+    assert len({case["id"] for case in rag.knowledge_base}) == 600
+    assert rag.search_expert_knowledge("bgp neighbor routing", top_k=3)
+
+
+def test_synthetic_corpus_is_deterministic(profile, tmp_path):
+    first = generate_corpus(str(tmp_path / "a"), 300, profile, seed=5, cases_per_file=100)
+    second = generate_corpus(str(tmp_path / "b"), 300, profile, seed=5, cases_per_file=100, workers=2)
+    other = generate_corpus(str(tmp_path / "c"), 300, profile, seed=6, cases_per_file=100)
+
+    read = lambda path: open(path, "rb").read()
+    assert [read(path) for path in first] == [read(path) for path in second]
+    assert [read(path) for path in first] != [read(path) for path in other]
+
+
+def test_evaluation_scores_golden_coverage(rag):
+    suite = [
+        {"id": 1, "query": "bgp neighbor flapping",
+         "golden": {"root_causes": ["hold timers expire"], "commands": ["show interface errors", "show crypto isakmp sa"]}},
+        {"id": 2, "query": "quantum teleportation", "golden": {"root_causes": ["entangled photons"], "commands": []}}
+    ]
+
+    result = evaluate(rag, suite, {}, repeats=1)
+
+    assert result["recall"]["root_causes"]["@1"] == 0.5
+    assert result["recall"]["commands"]["@10"] == 0.5
+    assert result["recall"]["all"]["@10"] == 0.5
+    assert result["mrr"] == 0.5
+    assert [query["first_relevant_rank"] for query in result["per_query"]] == [1, None]
+
+
+def test_evaluation_configuration_rebuilds_index(tmp_path):
+    with open(tmp_path / "cases.json", "w", encoding="utf-8") as f:
+        json.dump({"expert_training_cases": CASES}, f)
+    system = ExpertRAGSystem(str(tmp_path))
+
+    configure(system, {"ngram_range": [1, 2], "semantic": False})
+
+    assert system.embeddings_model is None
+    assert any(" " in term for term in system.tfidf_vectorizer.get_feature_names_out())
+    assert system.search_expert_knowledge("bgp neighbor flapping", top_k=1)[0]["id"] == "bgp"
@@ -0,0 +1,142 @@
+"""
+Provider rate limiter tests - priority queueing, wait budgets, Retry-After pauses and token refunds.
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT)
+
+import global_api
+from provider_router import ProviderRouter
+from rate_limiter import (
+    PRIORITY_BACKGROUND, PRIORITY_BATCH, PRIORITY_INTERACTIVE,
+    ProviderLimiter, RateLimitExceeded, RateLimiterRegistry
+)
+
+
+def test_waiters_are_served_by_priority():
+    async def scenario():
+        limiter = ProviderLimiter("test", rpm=6000, tpm=1e6, concurrency=1)
+        await limiter.acquire(10)
+        order = []
+
+        async def waiter(name, priority):
+            await limiter.acquire(10, priority)
+            order.append(name)
+            limiter.release(10, 10)
+
+        tasks = [asyncio.create_task(waiter(name, priority)) for name, priority in
+                 [("background", PRIORITY_BACKGROUND), ("batch", PRIORITY_BATCH), ("interactive", PRIORITY_INTERACTIVE)]]
+        await asyncio.sleep(0.01)
+        assert limiter.stats()["queue_depth"] == 3
+
+        limiter.release(10, 10)
+        await asyncio.wait_for(asyncio.gather(*tasks), 2)
+        return order
+
+    assert asyncio.run(scenario()) == ["interactive", "batch", "background"]
+
+
+def test_rejects_at_once_when_the_wait_exceeds_the_budget():
+    async def scenario():
+        limiter = ProviderLimiter("test", rpm=6000, tpm=600, concurrency=4)  # 10 tokens/s
+        await limiter.acquire(600)
+        start = time.monotonic()
+        with pytest.raises(RateLimitExceeded) as exc_info:
+            await limiter.acquire(100, max_wait=1)
+        return time.monotonic() - start, exc_info.value, limiter.stats()
+
+    elapsed, error, stats = asyncio.run(scenario())
+    assert elapsed < 0.1
+    assert error.reason == "over wait budget"
+    assert error.retry_after == pytest.approx(10, abs=0.5)
+    assert stats["queue_depth"] == 0
+
+
+def test_upstream_429_pauses_new_requests_for_retry_after():
+    async def scenario():
+        limiter = ProviderLimiter("test", rpm=6000, tpm=1e6, concurrency=4)
+        limiter.penalize(0.2)
+        start = time.monotonic()
+        await limiter.acquire(10)
+        waited = time.monotonic() - start
+        limiter.release(10, 10)
+
+        limiter.penalize(5)
+        with pytest.raises(RateLimitExceeded):
+            await limiter.acquire(10, max_wait=0.5)
+        return waited
+
+    assert 0.15 <= asyncio.run(scenario()) < 1
+
+
+def test_release_reconciles_or_refunds_the_token_estimate():
+    async def scenario():
+        limiter = ProviderLimiter("test", rpm=6000, tpm=1000, concurrency=4)
+        await limiter.acquire(500)
+        limiter.release(500, 0)
+        refunded = limiter.stats()["tokens_available"]
+        await limiter.acquire(500)
+        limiter.release(500, 100)
+        return refunded, limiter.stats()["tokens_available"]
+
+    refunded, reconciled = asyncio.run(scenario())
+    assert refunded == pytest.approx(1000, abs=5)
+    assert reconciled == pytest.approx(900, abs=5)
+
+
+@pytest.fixture
+def isolated_provider(monkeypatch):
+    """Fresh limiter and router for groq_fast, with the upstream call replaced by `responses`."""
+    responses = []
+
+    async def fake_post(provider, headers, payload):
+        return responses.pop(0)
+
+    monkeypatch.setattr(global_api, "_post_chat_completion", fake_post)
+    monkeypatch.setattr(global_api, "RATE_LIMIT_RETRIES", 0)
+    monkeypatch.setattr(global_api, "rate_limiters", RateLimiterRegistry({
+        "groq_fast": {"rpm": 6000, "tpm": 3000, "concurrency": 4}
+    }))
+    monkeypatch.setattr(global_api, "provider_router", ProviderRouter({"groq_fast": 1.0}))
+    return responses
+
+
+def test_failed_calls_refund_tokens_and_upstream_429_counts_against_the_provider(isolated_provider):
+    messages = [{"role": "user", "content": "x" * 400}]
+    isolated_provider.extend([
+        {"success": False, "error": "API Error 429", "provider": "Groq", "status": 429, "retry_after": 0.0},
+        {"success": False, "error": "API Error 500", "provider": "Groq", "status": 500, "retry_after": 0.0}
+    ])
+
+    async def scenario():
+        first = await global_api._attempt_provider("groq_fast", messages, 1000)
+        second = await global_api._attempt_provider("groq_fast", messages, 1000)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert first["rate_limited"] and not first.get("locally_throttled")
+    assert not second["success"]
+    assert global_api.rate_limiters.get("groq_fast").stats()["tokens_available"] == pytest.approx(3000, abs=5)
+    assert global_api.provider_router.scores()["groq_fast"]["errors"] == 2
+
+
+def test_local_throttling_does_not_count_against_the_provider(isolated_provider):
+    messages = [{"role": "user", "content": "hello"}]
+
+    async def scenario():
+        # Drain the token bucket so the next call cannot fit in the wait budget
+        await global_api.rate_limiters.get("groq_fast").acquire(3000)
+        return await global_api._attempt_provider("groq_fast", messages, 1000)
+
+    result = asyncio.run(scenario())
+
+    assert result["locally_throttled"] and result["rate_limited"]
+    assert global_api.provider_router.scores()["groq_fast"]["errors"] == 0
@@ -0,0 +1,70 @@
+"""
+Response cache tests - freshness states, throttled LRU touches and cache I/O kept off the event loop.
+"""
+
+import asyncio
+import os
+import sqlite3
+import sys
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT)
+
+import global_api
+from response_cache import FRESH, STALE, ResponseCache
+
+
+def accessed_at(path, key):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT accessed_at FROM response_cache WHERE key = ?", (key,)).fetchone()[0]
+
+
+def test_hits_touch_lru_order_at_most_once_per_interval(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = ResponseCache(path, ttl=60, touch_interval=60)
+    cache.set("key", {"response": "cached"})
+    stored = accessed_at(path, "key")
+
+    assert cache.get("key")["state"] == FRESH
+    assert accessed_at(path, "key") == stored  # recent enough - the hit stayed read-only
+
+    cache.touch_interval = 0
+    cache.get("key")
+    assert accessed_at(path, "key") > stored
+
+
+def test_entries_go_stale_after_ttl(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), ttl=0, stale_while_revalidate=60)
+    cache.set("key", {"response": "cached"})
+
+    entry = cache.get("key")
+    assert entry["state"] == STALE
+    assert entry["value"] == {"response": "cached"}
+    assert cache.get("missing") is None
+
+
+def test_cache_lookups_and_stores_run_off_the_event_loop(monkeypatch):
+    threads = []
+    stored = threading.Event()
+
+    class RecordingCache:
+        def get(self, key):
+            threads.append(threading.current_thread().name)
+            return None
+
+        def set(self, key, value):
+            threads.append(threading.current_thread().name)
+            stored.set()
+
+    async def fake_hedged(*args, **kwargs):
+        return {"success": True, "response": "answer"}, False
+
+    monkeypatch.setattr(global_api, "get_response_cache", lambda: RecordingCache())
+    monkeypatch.setattr(global_api, "call_hedged", fake_hedged)
+
+    result = asyncio.run(global_api.call_ai_provider("groq_fast", [{"role": "user", "content": "hi"}]))
+    assert stored.wait(5)
+
+    assert result["response"] == "answer"
+    assert len(threads) == 2 and all(name.startswith("cache") for name in threads)
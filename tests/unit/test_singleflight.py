@@ -0,0 +1,112 @@
+"""
+Singleflight tests - sharing one execution, error propagation and callers leaving early.
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT)
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_execution():
+    calls = []
+
+    async def scenario():
+        flight = SingleFlight("test")
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "answer"
+
+        results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)))
+        other = await flight.do("other", fetch)
+        return results, other, flight.in_flight()
+
+    results, other, in_flight = asyncio.run(scenario())
+
+    assert results == [("answer", False)] + [("answer", True)] * 4
+    assert other == ("answer", False)
+    assert len(calls) == 2
+    assert in_flight == 0
+
+
+def test_errors_reach_every_caller_and_are_not_cached():
+    async def scenario():
+        flight = SingleFlight("test")
+
+        async def broken():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+
+        outcomes = await asyncio.gather(*(flight.do("key", broken) for _ in range(3)), return_exceptions=True)
+        retry = await flight.do("key", lambda: asyncio.sleep(0, result="recovered"))
+        return outcomes, retry
+
+    outcomes, retry = asyncio.run(scenario())
+
+    assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+    assert retry == ("recovered", False)
+
+
+def test_leader_leaving_does_not_cancel_the_shared_execution():
+    async def scenario():
+        flight = SingleFlight("test")
+        finished = []
+
+        async def fetch():
+            await asyncio.sleep(0.05)
+            finished.append(True)
+            return "answer"
+
+        leader = asyncio.ensure_future(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("key", fetch))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower, finished
+
+    result, finished = asyncio.run(scenario())
+
+    assert result == ("answer", True)
+    assert finished == [True]
+
+
+def test_execution_is_cancelled_once_every_waiter_has_left():
+    async def scenario():
+        flight = SingleFlight("test")
+        events = []
+
+        async def fetch():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                events.append("cancelled")
+                raise
+
+        waiters = [asyncio.ensure_future(flight.do("key", fetch)) for _ in range(3)]
+        await asyncio.sleep(0)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+        in_flight = flight.in_flight()
+
+        # The key is free again for a fresh execution
+        retry = await flight.do("key", lambda: asyncio.sleep(0, result="fresh"))
+        return events, in_flight, retry
+
+    events, in_flight, retry = asyncio.run(scenario())
+
+    assert events == ["cancelled"]
+    assert in_flight == 0
+    assert retry == ("fresh", False)
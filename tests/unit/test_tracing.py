@@ -0,0 +1,102 @@
+"""
+Tracing tests - spans, Server-Timing, sampled JSONL export and context propagation.
+"""
+
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT)
+
+import tracing
+from background_loop import get_background_loop
+
+
+def test_spans_are_noops_outside_a_trace():
+    with tracing.span("session") as span:
+        span.set(ignored=True)
+    tracing.record("provider", 0.5)
+
+    assert tracing.current() is None
+
+
+def test_server_timing_sums_repeated_stages():
+    trace = tracing.Trace("/ask", "POST")
+    trace.add("upstream", 0.0, 0.25, {"provider": "groq_fast"})
+    trace.add("upstream", 0.0, 0.5, {"provider": "groq_coding"})
+    trace.add("session", 0.0, 0.001)
+
+    timing = trace.server_timing()
+
+    assert timing.startswith("upstream;dur=750.0, session;dur=1.0, total;dur=")
+    assert [span["provider"] for span in trace.to_dict()["spans"] if span["name"] == "upstream"] == \
+           ["groq_fast", "groq_coding"]
+
+
+def test_wsgi_middleware_sets_header_and_writes_sampled_trace(tmp_path, monkeypatch):
+    path = str(tmp_path / "traces.jsonl")
+    monkeypatch.setattr(tracing, "TRACE_FILE", path)
+    monkeypatch.setattr(tracing, "TRACE_SAMPLE_RATE", 1.0)
+
+    def app(environ, start_response):
+        with tracing.span("provider", provider="groq_fast"):
+            pass
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return [b"ok"]
+
+    middleware = tracing.WSGITracingMiddleware(app, ["/ask"])
+    captured = {}
+    body = middleware({"PATH_INFO": "/ask", "REQUEST_METHOD": "POST"},
+                      lambda status, headers, exc_info=None: captured.update(headers))
+    assert list(body) == [b"ok"]
+    body.close()
+    tracing.get_writer(path).flush()
+
+    assert captured["Server-Timing"].startswith("provider;dur=")
+    record = json.loads(open(path).read())
+    assert record["trace_id"] == captured["X-Trace-Id"]
+    assert (record["path"], record["status"]) == ("/ask", 200)
+    assert [span["name"] for span in record["spans"]] == ["provider"]
+    assert tracing.current() is None
+
+    # Untraced routes pass straight through
+    middleware({"PATH_INFO": "/health", "REQUEST_METHOD": "GET"},
+               lambda status, headers, exc_info=None: captured.update(health=headers))
+    assert captured["health"] == [("Content-Type", "text/plain")]
+
+
+def test_unsampled_traces_get_no_trace_id(tmp_path, monkeypatch):
+    path = str(tmp_path / "traces.jsonl")
+    monkeypatch.setattr(tracing, "TRACE_FILE", path)
+    monkeypatch.setattr(tracing, "TRACE_SAMPLE_RATE", 0.0)
+
+    trace = tracing.Trace("/ask", "POST")
+    assert "X-Trace-Id" not in dict(trace.headers())
+    tracing.finish(trace)
+    assert not os.path.exists(path)
+
+    # A trace already over TRACE_SLOW_SECONDS when headers go out is promised, and written
+    monkeypatch.setattr(tracing, "TRACE_SLOW_SECONDS", 0.001)
+    trace = tracing.Trace("/ask", "POST")
+    trace.started -= 1
+    assert dict(trace.headers())["X-Trace-Id"] == trace.trace_id
+    tracing.finish(trace)
+    tracing.get_writer(path).flush()
+    assert json.loads(open(path).read())["trace_id"] == trace.trace_id
+
+
+def test_background_loop_carries_the_callers_trace():
+    trace = tracing.Trace("/ask", "POST")
+    token = tracing._current.set(trace)
+    try:
+        async def stage():
+            with tracing.span("on_loop"):
+                pass
+            return tracing.current()
+
+        assert get_background_loop().run(stage(), timeout=5) is trace
+    finally:
+        tracing._current.reset(token)
+
+    assert [span[0] for span in trace.spans] == ["on_loop"]
@@ -0,0 +1,278 @@
+"""
+OpenGenNet AI - Request Tracing
+Per-request stage timing. A trace is started by the WSGI/ASGI middleware and held
+in a contextvar; span() and record() add stage durations to it from anywhere in
+the request (event loop tasks and RAG pool threads included, as long as the
+context is carried over). Stage totals go back to the client in a Server-Timing
+header, and a sample of full traces is appended to TRACE_FILE as JSON lines.
+
+Outside a traced request span() returns a shared no-op and record() does nothing.
+"""
+
+import contextvars
+import json
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import metrics
+from admission import ClosingIterator
+
+# Tracing configuration - override through environment variables
+SERVER_TIMING_ENABLED = os.environ.get("SERVER_TIMING_ENABLED", "true").lower() == "true"
+TRACE_FILE = os.environ.get("TRACE_FILE", "")
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", 0.01))
+TRACE_SLOW_SECONDS = float(os.environ.get("TRACE_SLOW_SECONDS", 0))  # slower traces are always written (0 = off)
+TRACE_QUEUE_SIZE = int(os.environ.get("TRACE_QUEUE_SIZE", 1000))
+
+TRACES_DROPPED = metrics.counter("traces_dropped_total", "Sampled traces dropped because the trace writer fell behind")
+
+_current = contextvars.ContextVar("opengennet_trace", default=None)
+
+
+class Trace:
+    """Spans recorded for one request; appends are safe from any thread."""
+
+    def __init__(self, path: str, method: str):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.path = path
+        self.method = method
+        self.status = None
+        self.timestamp = time.time()
+        self.started = time.perf_counter()
+        self.spans = []
+        # Sampling is decided up front so X-Trace-Id is only sent for traces that get written
+        self.sampled = bool(TRACE_FILE) and random.random() < TRACE_SAMPLE_RATE
+
+    def add(self, name: str, start: float, duration: float, attrs: Optional[Dict] = None) -> None:
+        self.spans.append((name, start, duration, attrs))
+
+    def duration(self) -> float:
+        return time.perf_counter() - self.started
+
+    def slow(self) -> bool:
+        return TRACE_SLOW_SECONDS > 0 and self.duration() >= TRACE_SLOW_SECONDS
+
+    def server_timing(self) -> str:
+        """Server-Timing value: milliseconds per stage name (summed over repeats) plus the total so far."""
+        totals = {}
+        for name, _, duration, _ in list(self.spans):
+            totals[name] = totals.get(name, 0.0) + duration
+        totals["total"] = self.duration()
+        return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in totals.items())
+
+    def headers(self) -> List[Tuple[str, str]]:
+        headers = []
+        if SERVER_TIMING_ENABLED:
+            headers += [("Server-Timing", self.server_timing()), ("Timing-Allow-Origin", "*")]
+        if TRACE_FILE and (self.sampled or self.slow()):
+            # Already slow at the headers means it will be slow at the end too
+            self.sampled = True
+            headers.append(("X-Trace-Id", self.trace_id))
+        return headers
+
+    def to_dict(self) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "timestamp": datetime.fromtimestamp(self.timestamp, timezone.utc).isoformat(),
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "duration_ms": round(self.duration() * 1000, 2),
+            "spans": [
+                dict({
+                    "name": name,
+                    "start_ms": round((start - self.started) * 1000, 2),
+                    "duration_ms": round(duration * 1000, 2)
+                }, **(attrs or {}))
+                for name, start, duration, attrs in sorted(list(self.spans), key=lambda span: span[1])
+            ]
+        }
+
+
+class Span:
+    """Times a `with` block into a trace; set() adds attributes known only inside the block."""
+
+    __slots__ = ("trace", "name", "attrs", "start")
+
+    def __init__(self, trace: Trace, name: str, attrs: Dict):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self) -> "Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.trace.add(self.name, self.start, time.perf_counter() - self.start, self.attrs)
+        return False
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+    def set(self, **attrs) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def current() -> Optional[Trace]:
+    """The trace of the request being handled, if any."""
+    return _current.get()
+
+
+def span(name: str, **attrs):
+    """Context manager timing a stage of the current request (no-op when untraced)."""
+    trace = _current.get()
+    if trace is None:
+        return _NOOP_SPAN
+    return Span(trace, name, attrs)
+
+
+def record(name: str, seconds: float, **attrs) -> None:
+    """Add a stage that was already timed and has just finished."""
+    trace = _current.get()
+    if trace is not None:
+        trace.add(name, time.perf_counter() - seconds, seconds, attrs or None)
+
+
+class _TraceWriter:
+    """Appends traces to TRACE_FILE from a daemon thread so requests never wait on disk."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._queue = queue.Queue(maxsize=TRACE_QUEUE_SIZE)
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict) -> None:
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    # First trace in this process (or after a fork) - the writer thread isn't running yet
+                    self._queue = queue.Queue(maxsize=TRACE_QUEUE_SIZE)
+                    threading.Thread(target=self._run, args=(self._queue,), name="trace-writer", daemon=True).start()
+                    self._pid = os.getpid()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            TRACES_DROPPED.inc()
+
+    def _run(self, records: queue.Queue) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                record = records.get()
+                try:
+                    f.write(json.dumps(record, default=str) + "\n")
+                    if records.empty():
+                        f.flush()
+                except (OSError, ValueError) as e:
+                    print(f"⚠️ Trace write failed: {e}")
+                finally:
+                    records.task_done()
+
+    def flush(self) -> None:
+        """Block until every queued trace is on disk."""
+        self._queue.join()
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(path: str = None) -> Optional[_TraceWriter]:
+    path = path or TRACE_FILE
+    if not path:
+        return None
+    with _writers_lock:
+        if path not in _writers:
+            _writers[path] = _TraceWriter(path)
+        return _writers[path]
+
+
+def finish(trace: Trace) -> None:
+    """Write a finished trace if it is sampled (TRACE_SAMPLE_RATE) or slower than TRACE_SLOW_SECONDS."""
+    writer = get_writer()
+    if writer is None:
+        return
+    if trace.sampled or trace.slow():
+        writer.write(trace.to_dict())
+
+
+class WSGITracingMiddleware:
+    """Traces requests to `routes` for a WSGI app; the trace stays current until the body is closed."""
+
+    def __init__(self, app: Callable, routes: Iterable[str]):
+        self.app = app
+        self.routes = frozenset(routes)
+
+    def __call__(self, environ, start_response):
+        if environ.get("PATH_INFO", "") not in self.routes or environ.get("REQUEST_METHOD") == "OPTIONS":
+            return self.app(environ, start_response)
+
+        trace = Trace(environ.get("PATH_INFO", ""), environ.get("REQUEST_METHOD", ""))
+        _current.set(trace)
+
+        def traced_start_response(status, headers, exc_info=None):
+            trace.status = int(status.split(" ", 1)[0])
+            return start_response(status, list(headers) + trace.headers(), exc_info)
+
+        def close():
+            # Threads are reused across requests, so clear rather than leave it for the next one
+            _current.set(None)
+            finish(trace)
+
+        try:
+            body = self.app(environ, traced_start_response)
+        except BaseException:
+            close()
+            raise
+        return ClosingIterator(body, close)
+
+
+class ASGITracingMiddleware:
+    """Traces requests to `routes` for an ASGI app, until the response has been sent."""
+
+    def __init__(self, app: Callable, routes: Iterable[str]):
+        self.app = app
+        self.routes = frozenset(routes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("path") not in self.routes or scope.get("method") == "OPTIONS":
+            return await self.app(scope, receive, send)
+
+        trace = Trace(scope["path"], scope.get("method", ""))
+        token = _current.set(trace)
+
+        async def traced_send(message):
+            if message["type"] == "http.response.start":
+                trace.status = message["status"]
+                message = dict(message, headers=list(message.get("headers") or []) + [
+                    (name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in trace.headers()
+                ])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, traced_send)
+        finally:
+            _current.reset(token)
+            finish(trace)